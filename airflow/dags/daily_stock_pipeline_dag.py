@@ -3,6 +3,35 @@
 from airflow.decorators import dag, task
 from pendulum import timezone, datetime
 
+
+def dbt_command(dbt_args, stage, run_id, dbt_vars=None):
+    """
+    Bash for one dbt stage.
+
+    Queries are tagged with the stage and Airflow run_id, and node timings from
+    run_results.json are recorded even when dbt fails; the task still exits
+    with dbt's status. The stage's workload profile picks the warehouse
+    (--full-refresh runs use the full_refresh profile).
+    """
+    import json
+    import shlex
+    from src.config import SNOWFLAKE
+    from src.query_tags import build_query_tag
+    from src.workload_profiles import profile_for, resolve_profiles
+
+    profile = resolve_profiles()[profile_for("dbt", "full_refresh" if "--full-refresh" in dbt_args else stage)]
+    warehouse = shlex.quote(profile.warehouse or SNOWFLAKE["warehouse"])
+    query_tag = shlex.quote(build_query_tag("dbt", stage=stage, profile=profile.name, run_id=run_id))
+    if dbt_vars is not None:
+        dbt_args += f" --vars {shlex.quote(json.dumps(dbt_vars))}"
+    return f"""cd /opt/airflow/dbt/stock_analytics && \
+        export DBT_QUERY_TAG={query_tag} DBT_WAREHOUSE={warehouse} && \
+        dbt {dbt_args} --profiles-dir .; status=$?; \
+        (cd /opt/airflow && python -m src.dbt_telemetry record --stage {stage} \
+            || echo "dbt telemetry failed"); \
+        exit $status
+    """
+
 # DAG for daily Polygon → Snowflake ingestion and dbt transformations.
 @dag(
     dag_id="market_data_pipeline",
@@ -10,48 +39,152 @@ from pendulum import timezone, datetime
     start_date=datetime(2025, 8, 1, tz=timezone("America/New_York")),
     catchup=False,
     tags=["etl", "snowflake", "polygon", "dbt"],
+    # Trigger with {"profile": true} to capture CPU/memory profiles of the extract task
+    params={"profile": False},
 )
 def market_data_pipeline():
     """
     Daily ETL/ELT pipeline for Polygon → Snowflake → dbt.
     Steps:
-      1) Extract + load grouped daily aggregates into RAW.DAILY_STOCKS
+      1) Extract + load unadjusted grouped daily aggregates into RAW.DAILY_STOCKS
+         and splits/dividends into RAW.CORPORATE_ACTIONS
       2) Run dbt models (staging → intermediate → marts)
       3) Run dbt tests
+      4) Refresh the local momentum store, cross-asset statistics and dashboard bundle
+      5) Aggregate warehouse cost per query tag
     """
     @task()
-    def extract():
+    def extract(params=None):
         # src/ is on PYTHONPATH inside the container (mapped to /opt/airflow/)
         from src.extract_load_stocks import extract_load_data
-        # For a daily schedule, only process the most recent date
-        extract_load_data(days_back_override=1)
+        # For a daily schedule, only process the most recent date;
+        # profiling falls back to the PIPELINE_PROFILE Variable when not requested
+        profile = True if (params or {}).get("profile") else None
+        # Returned dates (loaded or revised, not yet processed by dbt) go to XCom
+        return extract_load_data(days_back_override=1, profile=profile)
+
+    @task(multiple_outputs=True)
+    def pending_adjustments():
+        from src.corporate_actions import get_pending_adjustments
+        # Securities with new split factors: dbt and the momentum store reprocess only their history
+        return get_pending_adjustments()
 
     # dbt is run layer-by-layer so failures surface at the correct stage
     @task.bash
-    def run_dbt_staging():
-        return """cd /opt/airflow/dbt/stock_analytics && \
-            dbt run --select staging --profiles-dir .
-        """
+    def run_dbt_staging(run_id=None):
+        return dbt_command("run --select staging", stage="staging", run_id=run_id)
 
+    # Incremental models only reprocess from the earliest changed date,
+    # plus the whole history of securities re-adjusted for a split
     @task.bash
-    def run_dbt_intermediate():
-        return """cd /opt/airflow/dbt/stock_analytics && \
-            dbt run --select intermediate --profiles-dir .
-        """
+    def run_dbt_intermediate(changed_dates, adjusted_security_ids, run_id=None):
+        return dbt_command(
+            "run --select intermediate", stage="intermediate", run_id=run_id,
+            dbt_vars={
+                "changed_dates": changed_dates or [],
+                "adjusted_security_ids": adjusted_security_ids or [],
+            },
+        )
 
     @task.bash
-    def run_dbt_marts():
-        return """cd /opt/airflow/dbt/stock_analytics && \
-            dbt run --select marts --profiles-dir .
-        """
+    def run_dbt_marts(changed_dates, adjusted_security_ids, run_id=None):
+        return dbt_command(
+            "run --select marts", stage="marts", run_id=run_id,
+            dbt_vars={
+                "changed_dates": changed_dates or [],
+                "adjusted_security_ids": adjusted_security_ids or [],
+            },
+        )
 
+    # Singular tests only check the changed dates (plus re-adjusted securities);
+    # weekly_full_test_sweep covers all history
     @task.bash
-    def run_dbt_tests():
-        return """cd /opt/airflow/dbt/stock_analytics && \
-            dbt test --profiles-dir .
-        """
-    
-    # Enforce the ELT order: extract → dbt layers → dbt tests
-    extract() >> run_dbt_staging() >> run_dbt_intermediate() >> run_dbt_marts() >> run_dbt_tests()
-
-market_data_pipeline()
\ No newline at end of file
+    def run_dbt_tests(changed_dates, adjusted_security_ids, run_id=None):
+        return dbt_command(
+            "test", stage="tests", run_id=run_id,
+            dbt_vars={
+                "changed_dates": changed_dates or [],
+                "adjusted_security_ids": adjusted_security_ids or [],
+            },
+        )
+
+    @task()
+    def refresh_momentum_store(changed_dates, adjusted_security_ids):
+        from src.momentum_store import refresh_store
+        # Only reached after tests pass, so the dashboard never maps untested data
+        refresh_store(changed_dates=changed_dates, adjusted_security_ids=adjusted_security_ids)
+
+    @task()
+    def refresh_cross_asset_stats(changed_dates, split_dates):
+        from src.cross_asset import refresh_cross_asset_stats
+        # Rolls new sessions into the rolling sums; revised sessions trigger a batched recompute.
+        # A split only changes the log return of its ex-date session
+        refresh_cross_asset_stats(changed_dates=sorted(set(changed_dates or []) | set(split_dates or [])))
+
+    @task()
+    def publish_dashboard_bundle():
+        from src.dashboard_bundle import export_bundle
+        # Snapshot of the freshly built marts so dashboard cold starts skip the warehouse
+        export_bundle()
+
+    @task()
+    def mark_changes_processed(changed_dates, adjusted_security_ids):
+        from src.extract_load_stocks import mark_changes_processed
+        # Only after tests pass and every downstream artifact is refreshed; otherwise the
+        # dates and splits stay pending and the next run rebuilds them
+        mark_changes_processed(changed_dates, adjusted_security_ids)
+
+    @task(trigger_rule="all_done")
+    def report_warehouse_costs():
+        from src.cost_report import run_cost_report
+        # Recomputes the last few days of per-tag warehouse usage, including failed runs
+        run_cost_report()
+
+    # Enforce the ELT order: extract → dbt layers → dbt tests → dashboard artifacts → ledger
+    changed_dates = extract()
+    adjustments = pending_adjustments()
+    adjusted_security_ids = adjustments["security_ids"]
+    (
+        changed_dates
+        >> adjustments
+        >> run_dbt_staging()
+        >> run_dbt_intermediate(changed_dates, adjusted_security_ids)
+        >> run_dbt_marts(changed_dates, adjusted_security_ids)
+        >> run_dbt_tests(changed_dates, adjusted_security_ids)
+        >> [
+            refresh_momentum_store(changed_dates, adjusted_security_ids),
+            refresh_cross_asset_stats(changed_dates, adjustments["ex_dates"]),
+            publish_dashboard_bundle(),
+        ]
+        >> mark_changes_processed(changed_dates, adjusted_security_ids)
+        >> report_warehouse_costs()
+    )
+
+market_data_pipeline()
+
+
+# Weekly sweep: the same data tests over every row, so scoping the daily run
+# to changed dates never leaves older history unchecked.
+@dag(
+    dag_id="weekly_full_test_sweep",
+    schedule="0 6 * * 6", # Saturdays at 6am ET, after the week's last daily run
+    start_date=datetime(2025, 8, 1, tz=timezone("America/New_York")),
+    catchup=False,
+    tags=["dbt", "data-quality"],
+)
+def weekly_full_test_sweep():
+    """Run every dbt test over full history (test_scope=full)."""
+    @task.bash
+    def run_dbt_tests_full(run_id=None):
+        return dbt_command(
+            "test", stage="full_test_sweep", run_id=run_id, dbt_vars={"test_scope": "full"},
+        )
+
+    @task(trigger_rule="all_done")
+    def report_warehouse_costs():
+        from src.cost_report import run_cost_report
+        run_cost_report()
+
+    run_dbt_tests_full() >> report_warehouse_costs()
+
+weekly_full_test_sweep()
@@ -0,0 +1,55 @@
+# benchmarks/indicators.py
+# pandas reference implementation of the fct_trading_momentum indicators for rebuild benchmarks.
+
+import numpy as np
+import pandas as pd
+
+
+def _rolling_when_full(grouped, window, how):
+    """Rolling aggregate that stays NULL until `window` rows exist (matches the SQL CASE)."""
+    rolled = grouped.rolling(window, min_periods=window)
+    return getattr(rolled, how)().reset_index(level=0, drop=True)
+
+
+def build_momentum(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recompute SMA-20/50/200, 52-week high/low, RSI-14, rel_vol and cross flags.
+
+    Args:
+        daily (pd.DataFrame): ticker, trade_date, close, volume rows.
+
+    Returns:
+        pd.DataFrame: Input rows plus indicator columns, sorted by ticker/date.
+    """
+    df = daily.sort_values(["ticker", "trade_date"]).reset_index(drop=True)
+    by_ticker = df.groupby("ticker", sort=False)
+
+    df["yesterday_close"] = by_ticker["close"].shift(1)
+    close = by_ticker["close"]
+    for window in (20, 50, 200):
+        df[f"sma_{window}"] = _rolling_when_full(close, window, "mean")
+    df["high_52week"] = _rolling_when_full(close, 252, "max")
+    df["low_52week"] = _rolling_when_full(close, 252, "min")
+
+    change = df["close"] - df["yesterday_close"]
+    df["gain"] = change.clip(lower=0).fillna(0)
+    df["loss"] = (-change).clip(lower=0).fillna(0)
+    by_ticker = df.groupby("ticker", sort=False)
+    avg_gain = _rolling_when_full(by_ticker["gain"], 14, "sum") / 14
+    avg_loss = _rolling_when_full(by_ticker["loss"], 14, "sum") / 14
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = rsi.where(avg_loss != 0, 100.0)
+    rsi = rsi.where(~((avg_gain == 0) & (avg_loss == 0)), 50.0)
+    df["rsi"] = rsi.where(avg_gain.notna())
+
+    avg_volume = _rolling_when_full(by_ticker["volume"], 20, "mean")
+    df["rel_vol"] = df["volume"] / avg_volume
+
+    prev_sma_20 = by_ticker["sma_20"].shift(1)
+    df["bullish_crossover"] = ((df["close"] > df["sma_20"]) & (df["yesterday_close"] <= prev_sma_20)).astype(int)
+    prev_sma_50 = by_ticker["sma_50"].shift(1)
+    prev_sma_200 = by_ticker["sma_200"].shift(1)
+    df["golden_cross"] = ((df["sma_50"] > df["sma_200"]) & (prev_sma_50 <= prev_sma_200)).astype(int)
+    df["death_cross"] = ((df["sma_50"] < df["sma_200"]) & (prev_sma_50 >= prev_sma_200)).astype(int)
+    return df.drop(columns=["gain", "loss"])
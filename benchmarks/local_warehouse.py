@@ -0,0 +1,125 @@
+# benchmarks/local_warehouse.py
+# In-memory stand-in for SnowflakeClient used by the benchmark scenarios.
+
+import threading
+
+import pandas as pd
+import pendulum
+from src.instrumentation import incr, span
+
+
+class LocalWarehouse:
+    """
+    Implements the SnowflakeClient methods the ingest path calls, in memory.
+
+    Args:
+        write_latency_seconds (float): Simulated round trip added to each write.
+        keep_rows (bool): Keep written frames (memory grows with the scenario).
+    """
+
+    def __init__(self, write_latency_seconds=0.0, keep_rows=False):
+        self.write_latency_seconds = write_latency_seconds
+        self.keep_rows = keep_rows
+        self.tables = {}
+        self.row_counts = {}
+        self.checkpoints = []
+        self.ledger = {}
+        self.security_master = {}
+        self.next_security_id = 1
+
+    def write_dataframe(self, df: pd.DataFrame, table_name: str):
+        if df is None or df.empty:
+            return False, 0
+        with span("snowflake.write_pandas", table=table_name, rows=len(df)):
+            # Serializing to Parquet approximates the client-side cost of write_pandas
+            payload = df.to_parquet(index=False)
+            threading.Event().wait(self.write_latency_seconds)
+        incr("rows_written", len(df))
+        incr("bytes_written", len(payload))
+        self.row_counts[table_name] = self.row_counts.get(table_name, 0) + len(df)
+        if self.keep_rows:
+            self.tables.setdefault(table_name, []).append(df)
+        return True, len(df)
+
+    def record_checkpoint(self, run_id, api_date, status, total_tickers=None,
+                          rows_inserted=None, error_message=None, **extra):
+        with span("snowflake.checkpoint", status=status):
+            self.checkpoints.append({
+                "run_id": run_id,
+                "api_date": api_date,
+                "status": status,
+                "total_tickers": total_tickers,
+                "rows_inserted": rows_inserted,
+                "recorded_at": pendulum.now(),
+                "error_message": error_message,
+                **extra,
+            })
+        incr("checkpoints_written")
+
+    def record_checkpoints(self, run_id, entries):
+        with span("snowflake.checkpoint", status="batch", rows=len(entries)):
+            now = pendulum.now()
+            self.checkpoints.extend({"run_id": run_id, "recorded_at": now, **e} for e in entries)
+        incr("checkpoints_written", len(entries))
+
+    def bulk_load_parquet(self, table_name, local_dir, stage_prefix, file_names):
+        import pyarrow.parquet as pq
+
+        with span("snowflake.bulk_load", table=table_name, files=len(file_names)):
+            # Row counts come from the Parquet footers, as COPY INTO reports them
+            rows = sum(pq.ParquetFile(f"{local_dir}/{name}").metadata.num_rows for name in file_names)
+            threading.Event().wait(self.write_latency_seconds)
+        incr("rows_written", rows)
+        self.row_counts[table_name] = self.row_counts.get(table_name, 0) + rows
+        return rows
+
+    def delete_date(self, table_name, api_date):
+        with span("snowflake.delete_date", table=table_name):
+            pass
+        return 0
+
+    def get_ledger_rows(self):
+        return list(self.ledger.values())
+
+    def merge_ledger_rows(self, rows):
+        for row in rows:
+            self.ledger[row["API_DATE"]] = dict(row)
+
+    def get_security_master(self, tickers=None):
+        return [
+            {k: v for k, v in row.items() if k != "IS_NEW"}
+            for row in self.security_master.values()
+            if tickers is None or row["TICKER"] in tickers
+        ]
+
+    def allocate_security_ids(self, count):
+        ids = list(range(self.next_security_id, self.next_security_id + count))
+        self.next_security_id += count
+        return ids
+
+    def get_ticker_first_seen(self):
+        return {}
+
+    def merge_security_master(self, rows):
+        with span("snowflake.security_master_sync", rows=len(rows)):
+            for row in rows:
+                key = (row["TICKER"], row["VALID_FROM"])
+                # Like the MERGE: a new registration never replaces an existing mapping
+                if row.get("IS_NEW") and key in self.security_master:
+                    continue
+                self.security_master[key] = dict(row)
+
+    def assign_security_ids(self, start=None, end=None, tickers=None, missing_only=False):
+        with span("snowflake.assign_security_ids"):
+            pass
+        return 0
+
+    def get_completed_dates(self):
+        return {
+            pendulum.instance(c["api_date"]).strftime("%Y-%m-%d")
+            for c in self.checkpoints
+            if c["status"] == "completed"
+        }
+
+    def close(self):
+        pass
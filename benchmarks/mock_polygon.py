@@ -0,0 +1,110 @@
+# benchmarks/mock_polygon.py
+# Local HTTP stand-in for the Polygon grouped daily endpoint with configurable latency and 429s.
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+GROUPED_DAILY_PATH = re.compile(r"^/v2/aggs/grouped/locale/us/market/stocks/(\d{4}-\d{2}-\d{2})")
+
+
+class MockPolygonServer:
+    """
+    Serves SyntheticMarket payloads over HTTP on localhost.
+
+    Args:
+        market (SyntheticMarket): Source of grouped-daily payloads.
+        latency_seconds (float): Delay added to every response.
+        rate_limit_ratio (float): Fraction of requests answered with 429.
+        server_error_ratio (float): Fraction of requests answered with 503.
+        seed (int): RNG seed for the error injection.
+    """
+
+    def __init__(self, market, latency_seconds=0.0, rate_limit_ratio=0.0,
+                 server_error_ratio=0.0, seed=7):
+        self.market = market
+        self.latency_seconds = latency_seconds
+        self.rate_limit_ratio = rate_limit_ratio
+        self.server_error_ratio = server_error_ratio
+        self.rng = np.random.default_rng(seed)
+        self.requests = 0
+        self.status_counts = {}
+        # Retries re-request the same date, so keep the last few bodies
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def _body_for(self, date_str):
+        with self._lock:
+            if date_str not in self._bodies:
+                payload = self.market.grouped_daily_payload(date_str)
+                self._bodies[date_str] = json.dumps(payload).encode("utf-8")
+                while len(self._bodies) > 4:
+                    self._bodies.popitem(last=False)
+            return self._bodies[date_str]
+
+    def _pick_status(self):
+        with self._lock:
+            self.requests += 1
+            draw = self.rng.random()
+        if draw < self.rate_limit_ratio:
+            return 429
+        if draw < self.rate_limit_ratio + self.server_error_ratio:
+            return 503
+        return 200
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = GROUPED_DAILY_PATH.match(self.path)
+                if not match:
+                    self.send_error(404)
+                    return
+
+                # Event.wait instead of time.sleep: benchmarks patch time.sleep
+                threading.Event().wait(server.latency_seconds)
+                status = server._pick_status()
+                body = server._body_for(match.group(1)) if status == 200 else b"{}"
+
+                with server._lock:
+                    server.status_counts[status] = server.status_counts.get(status, 0) + 1
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
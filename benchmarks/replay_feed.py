@@ -0,0 +1,205 @@
+# benchmarks/replay_feed.py
+# Local websocket stand-in for the Polygon stocks feed, replaying recorded or synthetic messages.
+#
+# Usage:
+#   python -m benchmarks.replay_feed data/stream/session.jsonl --port 8765
+#   python -m src.streaming --url ws://127.0.0.1:8765
+
+import argparse
+import base64
+import hashlib
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+
+# RFC 6455 handshake constant
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def load_recording(path):
+    """Read a file written by `python -m src.streaming --record` (one raw message per line)."""
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def _frame(payload, opcode=0x1):
+    """Encode an unmasked, unfragmented server frame."""
+    header = bytes([0x80 | opcode])
+    size = len(payload)
+    if size < 126:
+        header += bytes([size])
+    elif size < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", size)
+    else:
+        header += bytes([127]) + struct.pack("!Q", size)
+    return header + payload
+
+
+def _read_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("client disconnected")
+        data += chunk
+    return data
+
+
+def _read_client_frame(conn):
+    """Read one masked client frame; returns (opcode, payload)."""
+    first, second = _read_exact(conn, 2)
+    size = second & 0x7F
+    if size == 126:
+        size = struct.unpack("!H", _read_exact(conn, 2))[0]
+    elif size == 127:
+        size = struct.unpack("!Q", _read_exact(conn, 8))[0]
+    mask = _read_exact(conn, 4) if second & 0x80 else b"\x00" * 4
+    payload = _read_exact(conn, size)
+    return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+class ReplayFeedServer:
+    """
+    Serves a fixed message sequence to each websocket client, then closes.
+
+    Messages are encoded to frames up front so replaying costs the client
+    process almost nothing beyond socket writes.
+
+    Args:
+        messages (Iterable[list | str]): Event lists or raw JSON messages.
+        messages_per_second (float | None): Pace of the replay; None replays
+            as fast as the client reads (throughput benchmarks).
+        port (int): Listen port; 0 picks a free one.
+    """
+
+    def __init__(self, messages, messages_per_second=None, port=0):
+        self.frames = [
+            _frame((m if isinstance(m, str) else json.dumps(m, separators=(",", ":"))).encode("utf-8"))
+            for m in messages
+        ]
+        self.messages_per_second = messages_per_second
+        self.port = port
+        self.clients = 0
+        self._sock = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def url(self):
+        host, port = self._sock.getsockname()
+        return f"ws://{host}:{port}"
+
+    def _handshake(self, conn):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                raise ConnectionError("client disconnected during handshake")
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()
+        ).decode()
+        conn.sendall(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+
+    def _status(self, status, message):
+        return _frame(json.dumps([{"ev": "status", "status": status, "message": message}]).encode())
+
+    def _serve(self, conn):
+        with conn:
+            self._handshake(conn)
+            conn.sendall(self._status("connected", "Connected Successfully"))
+            # Polygon expects auth then subscribe before any data flows
+            for expected in ("auth", "subscribe"):
+                _, payload = _read_client_frame(conn)
+                action = json.loads(payload).get("action")
+                if action != expected:
+                    raise ConnectionError(f"expected {expected}, got {action}")
+                conn.sendall(self._status(f"{expected}_success", expected))
+
+            interval = 1 / self.messages_per_second if self.messages_per_second else 0
+            next_send = time.monotonic()
+            for frame in self.frames:
+                if self._stopped.is_set():
+                    break
+                if interval:
+                    next_send += interval
+                    self._stopped.wait(max(0.0, next_send - time.monotonic()))
+                conn.sendall(frame)
+            conn.sendall(_frame(struct.pack("!H", 1000), opcode=0x8))
+            # Wait for the client's close reply so it never writes to a closed socket
+            conn.settimeout(5)
+            _read_client_frame(conn)
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.clients += 1
+            try:
+                self._serve(conn)
+            except (ConnectionError, OSError) as e:
+                print(f"Replay client dropped: {e}")
+
+    def start(self):
+        self._sock = socket.create_server(("127.0.0.1", self.port))
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._sock is not None:
+            self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded feed over a local websocket")
+    parser.add_argument("recording", nargs="?", help="JSON-lines recording (default: synthetic session)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=1.0, help="Messages per second (0 = as fast as possible)")
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--seconds", type=int, default=600)
+    args = parser.parse_args(argv)
+
+    if args.recording:
+        messages = load_recording(args.recording)
+    else:
+        from benchmarks.synthetic import SyntheticMarket
+
+        market = SyntheticMarket(n_tickers=args.tickers, gap_rate=0.0, invalid_rate=0.0)
+        messages = market.intraday_messages(time.strftime("%Y-%m-%d"), args.seconds)
+
+    with ReplayFeedServer(messages, messages_per_second=args.rate or None, port=args.port) as server:
+        print(f"Replaying {len(server.frames)} messages on {server.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,458 @@
+# benchmarks/run.py
+# End-to-end benchmark scenarios with baseline storage and regression checks.
+#
+# Usage:
+#   python -m benchmarks.run                          # run all scenarios, compare to baselines
+#   python -m benchmarks.run --scenario daily_run     # run one scenario
+#   python -m benchmarks.run --update-baseline        # store current results as the baseline
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+DEFAULT_THRESHOLD = 0.20
+
+# name -> scenario parameters
+SCENARIOS = {
+    "daily_run": {
+        "kind": "ingest",
+        "tickers": 11000,
+        "days": 1,
+        "latency_seconds": 0.25,
+    },
+    "backfill_2y": {
+        "kind": "ingest",
+        "tickers": 6000,
+        "days": 504,
+        "latency_seconds": 0.05,
+    },
+    "retry_storm": {
+        "kind": "ingest",
+        "tickers": 3000,
+        "days": 20,
+        "latency_seconds": 0.05,
+        "rate_limit_ratio": 0.4,
+        "server_error_ratio": 0.1,
+    },
+    "indicator_rebuild": {
+        "kind": "indicators",
+        "tickers": 3000,
+        "days": 504,
+    },
+    # Ten minutes of per-second aggregates for the whole Russell 3000, replayed
+    # over a local websocket as fast as the streaming consumer reads them
+    "intraday_stream": {
+        "kind": "stream",
+        "tickers": 3000,
+        "seconds": 600,
+        "flush_seconds": 5,
+    },
+    # A year of flat files parsed across every core and bulk loaded as Parquet
+    "bulk_import": {
+        "kind": "bulk",
+        "tickers": 6000,
+        "days": 252,
+        "workers": None,
+    },
+    # Parameter sweep of momentum signal rules over a 3000-ticker, 750-session panel
+    "backtest_sweep": {
+        "kind": "backtest",
+        "tickers": 3000,
+        "days": 750,
+        "grid": {
+            "entry": ["golden_cross", "bullish_crossover"],
+            "exit": ["death_cross", None],
+            "hold_days": [5, 20, 60, None],
+            "rsi_max": [None, 70],
+        },
+        "workers": None,
+    },
+    # Fresh-interpreter import and calendar cost of an Airflow task before it does any work
+    "task_startup": {
+        "kind": "startup",
+        "repeats": 5,
+    },
+}
+
+# name -> snippet timed in a fresh interpreter ("legacy_*" reproduce the pre-cache behaviour)
+STARTUP_PROBES = {
+    "import_extract_load_stocks": "import src.extract_load_stocks",
+    "import_snowflake_client": "import src.snowflake_client",
+    "trading_days_cached": (
+        "import pendulum\n"
+        "from src.trading_calendar import get_trading_days, previous_session\n"
+        "today = pendulum.today('America/New_York').date()\n"
+        "previous_session(today)\n"
+        "get_trading_days(today.subtract(years=2), today)"
+    ),
+    "legacy_trading_days_mcal": (
+        "import pendulum\n"
+        "import pandas_market_calendars as mcal\n"
+        "today = pendulum.today('America/New_York').date()\n"
+        "mcal.get_calendar('NYSE').schedule(start_date=today.subtract(days=10), end_date=today)\n"
+        "mcal.get_calendar('NYSE').schedule(start_date=today.subtract(years=2), end_date=today)"
+    ),
+}
+
+# Metrics compared against the baseline: (path, direction where "higher" means better)
+CHECKED_METRICS = [
+    ("rows_per_second", "higher"),
+    ("peak_rss_mb", "lower"),
+    ("startup_seconds", "lower"),
+]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_ingest(params):
+    """Drive fetch_grouped_daily -> load_data against the mock server and local warehouse."""
+    from benchmarks.local_warehouse import LocalWarehouse
+    from benchmarks.mock_polygon import MockPolygonServer
+    from benchmarks.synthetic import SyntheticMarket
+    from src import extraction, instrumentation, load
+    from src.rate_limiter import UnlimitedBucket
+
+    market = SyntheticMarket(n_tickers=params["tickers"])
+    dates = market.sessions("2023-01-03", params["days"])
+    warehouse = LocalWarehouse()
+    load.snowflake_client = warehouse
+
+    server = MockPolygonServer(
+        market,
+        latency_seconds=params.get("latency_seconds", 0.0),
+        rate_limit_ratio=params.get("rate_limit_ratio", 0.0),
+        server_error_ratio=params.get("server_error_ratio", 0.0),
+    )
+    run_id = f"bench_{int(time.time())}"
+
+    # Sleeps are counted by the instrumentation but not actually waited out; the
+    # shared quota is bypassed so runs never drain the real bucket's state file
+    with server, mock.patch.object(extraction, "API_BASE_URL", server.url), \
+            mock.patch.object(extraction, "get_rate_limiter", UnlimitedBucket), \
+            mock.patch("time.sleep"):
+        instrumentation.start_run(run_id, enabled=True)
+        started = time.perf_counter()
+        for date_str in dates:
+            with instrumentation.span("pipeline.date", date=date_str):
+                df = extraction.fetch_grouped_daily(date_str)
+                load.load_data(df, date_str, run_id)
+        elapsed = time.perf_counter() - started
+        summary = instrumentation.finish_run(metrics_dir=Path("data/benchmarks/metrics"))
+
+    rows = warehouse.row_counts.get("DAILY_STOCKS", 0)
+    return {
+        "rows": rows,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+        "stages": summary["stages"],
+        "counters": summary["counters"],
+        "http_status_counts": {str(k): v for k, v in server.status_counts.items()},
+    }
+
+
+def _run_indicators(params):
+    """Full rebuild of the momentum indicators over a synthetic panel."""
+    import pandas as pd
+    from benchmarks.indicators import build_momentum
+    from benchmarks.synthetic import SyntheticMarket
+
+    market = SyntheticMarket(n_tickers=params["tickers"], gap_rate=0.0, invalid_rate=0.0)
+    frames = []
+    for date_str in market.sessions("2023-01-03", params["days"]):
+        day = market.next_day(date_str)[["T", "c", "v"]]
+        day.columns = ["ticker", "close", "volume"]
+        day["trade_date"] = date_str
+        frames.append(day)
+    daily = pd.concat(frames, ignore_index=True)
+
+    started = time.perf_counter()
+    result = build_momentum(daily)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": len(result),
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(len(result) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _run_stream(params):
+    """Replay a synthetic session through websocket -> IntradaySession -> local warehouse."""
+    import numpy as np
+    from benchmarks.local_warehouse import LocalWarehouse
+    from benchmarks.replay_feed import ReplayFeedServer
+    from benchmarks.synthetic import SyntheticMarket
+    from src import instrumentation
+    from src.streaming import SMA_WINDOW, IntradaySession, run_stream, websocket_messages
+
+    market = SyntheticMarket(n_tickers=params["tickers"], gap_rate=0.0, invalid_rate=0.0)
+    sessions = market.sessions("2023-01-03", SMA_WINDOW)
+    closes = np.stack([market.next_day(d)["c"].to_numpy() for d in sessions[:-1]])
+    session = IntradaySession(sessions[-1], market.tickers, closes[-1], closes[-(SMA_WINDOW - 1):].sum(axis=0))
+    messages = list(market.intraday_messages(sessions[-1], params["seconds"]))
+    events = sum(len(m) for m in messages)
+    warehouse = LocalWarehouse()
+
+    with ReplayFeedServer(messages) as server:
+        feed = websocket_messages(server.url, "bench", "A.*")
+        instrumentation.start_run(f"bench_stream_{int(time.time())}", enabled=True)
+        started = time.perf_counter()
+        stats = run_stream(session, feed, warehouse, flush_seconds=params["flush_seconds"])
+        elapsed = time.perf_counter() - started
+        summary = instrumentation.finish_run(metrics_dir=Path("data/benchmarks/metrics"))
+
+    events_per_second = stats["events"] / elapsed if elapsed else 0.0
+    return {
+        "rows": stats["events"],
+        "events_generated": events,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(events_per_second, 1),
+        # Multiple of the live rate (one event per ticker per second) sustained on one core
+        "realtime_factor": round(events_per_second / params["tickers"], 1),
+        "flushes": stats["flushes"],
+        "bars_written": stats["bars"],
+        "stages": summary["stages"],
+        "counters": summary["counters"],
+    }
+
+
+def _run_bulk(params):
+    """Flat files -> parallel parse -> Parquet -> local warehouse; files are generated untimed."""
+    import shutil
+
+    from benchmarks.local_warehouse import LocalWarehouse
+    from benchmarks.synthetic import SyntheticMarket
+    from src.bulk_import import import_flat_files
+
+    work_dir = PROJECT_ROOT / "data" / "benchmarks" / "bulk_import"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    flat_dir = work_dir / "flat_files"
+    market = SyntheticMarket(n_tickers=params["tickers"])
+    for date_str in market.sessions("2023-01-03", params["days"]):
+        day_dir = flat_dir / date_str[:4] / date_str[5:7]
+        day_dir.mkdir(parents=True, exist_ok=True)
+        market.write_flat_file(date_str, day_dir / f"{date_str}.csv.gz")
+
+    workers = params["workers"] or os.cpu_count() or 1
+    warehouse = LocalWarehouse()
+    started = time.perf_counter()
+    summary = import_flat_files(
+        flat_dir, workers=workers, client=warehouse,
+        out_dir=work_dir / "parquet", ledger_path=work_dir / "ledger.sqlite",
+        run_id=f"bench_bulk_{int(time.time())}",
+    )
+    elapsed = time.perf_counter() - started
+
+    rows = warehouse.row_counts.get("DAILY_STOCKS", 0)
+    rows_per_second = rows / elapsed if elapsed else 0.0
+    return {
+        "rows": rows,
+        "dates": summary["dates"],
+        "failed_dates": len(summary["failed"]),
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_per_second, 1),
+        "rows_per_second_per_core": round(rows_per_second / workers, 1),
+        "checkpoints": len(warehouse.checkpoints),
+    }
+
+
+def _run_backtest(params):
+    """Sweep a rule grid over a synthetic momentum panel; the panel is built untimed."""
+    import numpy as np
+    import pandas as pd
+    from benchmarks.indicators import build_momentum
+    from benchmarks.synthetic import SyntheticMarket
+    from src.backtest import PANEL_FIELDS, expand_grid, sweep
+    from src.panel import Panel
+
+    market = SyntheticMarket(n_tickers=params["tickers"], gap_rate=0.0, invalid_rate=0.0)
+    frames = []
+    for date_str in market.sessions("2021-01-04", params["days"]):
+        day = market.next_day(date_str)[["T", "c", "v"]]
+        day.columns = ["ticker", "close", "volume"]
+        day["trade_date"] = date_str
+        frames.append(day)
+    momentum = build_momentum(pd.concat(frames, ignore_index=True))
+    values = {
+        field: momentum.pivot(index="trade_date", columns="ticker", values=field).to_numpy(dtype=np.float64)
+        for field in PANEL_FIELDS
+    }
+    dates = np.array(sorted(momentum["trade_date"].unique()), dtype="datetime64[D]")
+
+    # Point-in-time membership: a fifth of the universe joins late, another fifth leaves early
+    rng = np.random.default_rng(7)
+    n_dates, n_tickers = values["close"].shape
+    joined = np.where(rng.random(n_tickers) < 0.2, rng.integers(0, n_dates, n_tickers), 0)
+    left = np.where(rng.random(n_tickers) < 0.2, rng.integers(0, n_dates, n_tickers), n_dates)
+    day = np.arange(n_dates)[:, None]
+    outside = (day < joined) | (day >= left)
+    for matrix in values.values():
+        matrix[outside] = np.nan
+    panel = Panel(dates, list(market.tickers), values)
+
+    rules = expand_grid(params["grid"])
+    workers = params["workers"] or os.cpu_count() or 1
+    started = time.perf_counter()
+    results = sweep(panel, rules, workers)
+    elapsed = time.perf_counter() - started
+
+    cells = n_dates * n_tickers * len(rules)
+    return {
+        "rows": cells,
+        "rules": len(rules),
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        # Ticker-sessions evaluated per second across all rules
+        "rows_per_second": round(cells / elapsed, 1) if elapsed else 0.0,
+        "seconds_per_rule": round(elapsed / len(rules), 4),
+        "trades": sum(r["summary"]["trades"]["count"] for r in results),
+    }
+
+
+def _run_startup(params):
+    """Median wall time of each startup probe, each in a fresh interpreter."""
+    env = dict(
+        os.environ,
+        TRADING_CALENDAR_PATH=str(PROJECT_ROOT / "data" / "benchmarks" / "nyse_calendar.npz"),
+    )
+
+    def timed(snippet):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", snippet], cwd=PROJECT_ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - started
+
+    # Build the calendar cache once so the cached probe measures a warm worker
+    timed(STARTUP_PROBES["trading_days_cached"])
+    baseline = statistics.median(timed("pass") for _ in range(params["repeats"]))
+
+    probes = {}
+    for name, snippet in STARTUP_PROBES.items():
+        elapsed = statistics.median(timed(snippet) for _ in range(params["repeats"]))
+        # Interpreter start-up is common to every probe; report only the snippet's cost
+        probes[name] = round(elapsed - baseline, 3)
+
+    return {
+        "interpreter_seconds": round(baseline, 3),
+        "probes": probes,
+        # What the extract task pays before its first request
+        "startup_seconds": round(probes["import_extract_load_stocks"] + probes["trading_days_cached"], 3),
+    }
+
+
+RUNNERS = {
+    "ingest": _run_ingest,
+    "indicators": _run_indicators,
+    "stream": _run_stream,
+    "bulk": _run_bulk,
+    "backtest": _run_backtest,
+    "startup": _run_startup,
+}
+
+
+def run_scenario(name):
+    """Run a scenario in the current process and return its result record."""
+    params = SCENARIOS[name]
+    result = RUNNERS[params["kind"]](params)
+    result["scenario"] = name
+    result["params"] = params
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return result
+
+
+def run_isolated(name):
+    """Run a scenario in a fresh interpreter so peak RSS is per scenario."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_scenario, name).result()
+
+
+def check_regressions(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results against stored baselines.
+
+    Returns:
+        list[str]: Human-readable regression messages (empty if none).
+    """
+    failures = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            print(f"[{name}] no baseline stored; skipping regression check")
+            continue
+        for metric, better in CHECKED_METRICS:
+            current, previous = result.get(metric), baseline.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            regressed = change < -threshold if better == "higher" else change > threshold
+            if regressed:
+                failures.append(
+                    f"[{name}] {metric} regressed {change:+.1%} "
+                    f"(baseline {previous}, current {current}, threshold {threshold:.0%})"
+                )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, default=Path("data/benchmarks/results.json"))
+    args = parser.parse_args(argv)
+
+    names = args.scenario or list(SCENARIOS)
+    results = {}
+    for name in names:
+        print(f"Running scenario {name}...")
+        results[name] = run_isolated(name)
+        r = results[name]
+        if "probes" in r:
+            print(f"  task startup {r['startup_seconds']}s (interpreter {r['interpreter_seconds']}s excluded)")
+            for probe, seconds in r["probes"].items():
+                print(f"    {probe:<28} {seconds * 1000:.0f}ms")
+            continue
+        print(
+            f"  {r['rows']:,} rows in {r['elapsed_seconds']}s "
+            f"({r['rows_per_second']:,.0f} rows/s), peak RSS {r['peak_rss_mb']} MB"
+        )
+        for stage, stats in sorted(r.get("stages", {}).items()):
+            print(
+                f"    {stage:<28} n={stats['count']:<6} "
+                f"p50={stats['p50_seconds'] * 1000:.1f}ms p99={stats['p99_seconds'] * 1000:.1f}ms"
+            )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2))
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    if args.update_baseline:
+        baselines.update(results)
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Baselines updated in {BASELINE_FILE}")
+        return 0
+
+    failures = check_regressions(results, baselines, args.threshold)
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# benchmarks/synthetic.py
+# Synthetic grouped-daily market generator producing Polygon-shaped payloads.
+
+import string
+
+import numpy as np
+import pandas as pd
+
+
+def make_tickers(count, seed=0):
+    """Return `count` unique, deterministic 1–5 letter ticker symbols."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(string.ascii_uppercase))
+    tickers = set()
+    while len(tickers) < count:
+        length = rng.integers(1, 6)
+        tickers.add("".join(rng.choice(letters, size=length)))
+    return sorted(tickers)
+
+
+class SyntheticMarket:
+    """
+    Random-walk market that emits one grouped-daily payload per session.
+
+    Args:
+        n_tickers (int): Universe size (Polygon grouped daily is ~11k symbols).
+        gap_rate (float): Probability a ticker is missing on a given day.
+        split_rate (float): Probability a ticker splits on a given day.
+        invalid_rate (float): Probability a row has inconsistent OHLC / zero volume.
+        seed (int): RNG seed so scenarios are reproducible.
+    """
+
+    def __init__(self, n_tickers=3000, gap_rate=0.01, split_rate=0.0005,
+                 invalid_rate=0.002, seed=42):
+        self.rng = np.random.default_rng(seed)
+        self.tickers = np.array(make_tickers(n_tickers, seed))
+        self.gap_rate = gap_rate
+        self.split_rate = split_rate
+        self.invalid_rate = invalid_rate
+        self.close = self.rng.lognormal(mean=3.5, sigma=1.0, size=n_tickers)
+        self.volume = self.rng.lognormal(mean=13.0, sigma=1.5, size=n_tickers)
+
+    def sessions(self, start, days):
+        """Return `days` business days starting at `start` as YYYY-MM-DD strings."""
+        return [d.strftime("%Y-%m-%d") for d in pd.bdate_range(start, periods=days)]
+
+    def next_day(self, date_str):
+        """Advance the market one session and return the rows as a DataFrame."""
+        n = len(self.tickers)
+        rng = self.rng
+
+        prev_close = self.close
+        returns = rng.normal(0.0003, 0.02, size=n)
+        split_mask = rng.random(n) < self.split_rate
+        split_ratio = np.where(split_mask, rng.choice([2.0, 3.0, 4.0], size=n), 1.0)
+
+        close = prev_close * np.exp(returns) / split_ratio
+        open_ = prev_close / split_ratio * np.exp(rng.normal(0, 0.005, size=n))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, size=n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, size=n)))
+        volume = np.round(self.volume * rng.lognormal(0, 0.4, size=n) * split_ratio)
+        self.close = close
+
+        # Corrupt a few rows the way real feeds do: close outside range, zero volume
+        invalid = rng.random(n) < self.invalid_rate
+        close = np.where(invalid, high * 1.05, close)
+        volume = np.where(invalid & (rng.random(n) < 0.5), 0, volume)
+
+        ts = int(pd.Timestamp(date_str, tz="America/New_York").replace(hour=16).timestamp() * 1000)
+        df = pd.DataFrame({
+            "T": self.tickers,
+            "v": volume,
+            "vw": (high + low + close) / 3,
+            "o": open_,
+            "c": close,
+            "h": high,
+            "l": low,
+            "t": ts,
+            "n": np.maximum(volume // 100, 1).astype(np.int64),
+        })
+        present = rng.random(n) >= self.gap_rate
+        return df[present].reset_index(drop=True)
+
+    def grouped_daily_payload(self, date_str):
+        """Return the Polygon JSON body for one session."""
+        df = self.next_day(date_str)
+        return {
+            "status": "OK",
+            "queryCount": len(df),
+            "resultsCount": len(df),
+            "adjusted": True,
+            "results": df.to_dict(orient="records"),
+        }
+
+    def write_flat_file(self, date_str, path):
+        """Write one session as a Polygon day-aggregate flat file (gzip CSV)."""
+        df = self.next_day(date_str)
+        flat = pd.DataFrame({
+            "ticker": df["T"],
+            "volume": df["v"],
+            "open": df["o"],
+            "close": df["c"],
+            "high": df["h"],
+            "low": df["l"],
+            "window_start": df["t"] * 1_000_000,
+            "transactions": df["n"],
+        })
+        flat.to_csv(path, index=False, compression="gzip")
+        return len(flat)
+
+    def intraday_messages(self, date_str, seconds, active_ratio=0.8):
+        """
+        Yield one websocket message per second of a session: a list of
+        per-second aggregate ("A") events walking from the last close.
+
+        Args:
+            date_str (str): Session date; events start at the 09:30 open.
+            seconds (int): Seconds of the session to generate.
+            active_ratio (float): Probability a ticker trades in a given second.
+        """
+        n = len(self.tickers)
+        rng = self.rng
+        price = self.close.copy()
+        volume_per_second = self.volume / 23400
+        open_ms = int(
+            pd.Timestamp(date_str, tz="America/New_York").replace(hour=9, minute=30).timestamp() * 1000
+        )
+
+        for second in range(seconds):
+            active = np.flatnonzero(rng.random(n) < active_ratio)
+            k = len(active)
+            open_ = price[active]
+            close = open_ * np.exp(rng.normal(0, 0.0005, size=k))
+            high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.0002, size=k)))
+            low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.0002, size=k)))
+            volume = np.maximum(np.round(volume_per_second[active] * rng.lognormal(0, 0.5, size=k)), 1)
+            price[active] = close
+
+            start = open_ms + second * 1000
+            yield [
+                {"ev": "A", "sym": sym, "v": v, "o": o, "h": h, "l": l, "c": c,
+                 "vw": round((h + l + c) / 3, 4), "s": start, "e": start + 1000}
+                for sym, v, o, h, l, c in zip(
+                    self.tickers[active].tolist(), volume.tolist(),
+                    np.round(open_, 4).tolist(), np.round(high, 4).tolist(),
+                    np.round(low, 4).tolist(), np.round(close, 4).tolist(),
+                )
+            ]
@@ -10,7 +10,12 @@ from utilities.dashboard_helpers import (
     render_data_freshness,
     render_page_intro,
 )
-from utilities.snowflake_helper import query_snowflake
+from utilities.dashboard_bundle import get_dashboard_bundle
+from utilities.downsampling import DEFAULT_CHART_POINTS, downsample_frame
+from utilities.snowflake_helper import build_select, query_arrow, render_query_stats
+
+PAGE = "Market Breadth"
+BREADTH_TABLE = "MARKET.RAW_MARTS.AGG_DAILY_MARKET_BREADTH"
 
 st.set_page_config(page_title="Market Breadth", layout="wide")
 
@@ -21,20 +26,58 @@ render_page_intro(
     "Aggregated market signals from the daily breadth mart.",
 )
 
-query = """
-    SELECT *
-    FROM MARKET.RAW_MARTS.AGG_DAILY_MARKET_BREADTH
-    ORDER BY TRADE_DATE DESC
-    LIMIT 30
-"""
+st.sidebar.header("Filters")
+
+# Trading-day windows for the trend charts; None plots the full history
+trend_windows = {
+    "30 Days": 30,
+    "1 Year": 252,
+    "3 Years": 756,
+    "All History": None,
+}
+trend_window = st.sidebar.selectbox("Trend History", options=list(trend_windows))
+trend_days = trend_windows[trend_window]
+
+# The signals, trends, and table below only render these columns
+display_columns = [
+    "trade_date",
+    "stocks_traded",
+    "advances",
+    "declines",
+    "unchanged_stocks",
+    "pct_market_over_sma20",
+    "pct_market_over_sma50",
+    "pct_market_over_sma200",
+    "market_rsi",
+    "ad_line",
+    "ad_ratio",
+    "ad_percentage",
+    "up_down_volume_ratio",
+    "new_highs",
+    "new_lows",
+    "record_high_pct",
+    "high_low_index",
+    "market_momentum",
+]
 
-df = query_snowflake(query)
+bundle = get_dashboard_bundle()
 
-if df.empty:
+if bundle is not None and bundle.covers("breadth"):
+    result = bundle.breadth(display_columns, limit=30, page=PAGE)
+else:
+    query = build_select(
+        BREADTH_TABLE,
+        display_columns,
+        order_by="TRADE_DATE DESC",
+        limit=30,
+    )
+    result = query_arrow(query, page=PAGE)
+
+if result.empty:
     st.warning("No market breadth rows returned.")
     st.stop()
 
-df.columns = df.columns.str.lower()
+df = result.to_pandas(display_columns)
 
 latest = df.iloc[0]
 prev = df.iloc[1] if len(df) > 1 else None
@@ -91,43 +134,45 @@ col8.metric(
 st.markdown("---")
 st.markdown("**Signal Trends**")
 
-trend_df = df.sort_values("trade_date").copy()
+if trend_days is not None and trend_days <= len(df):
+    trend_df = df.head(trend_days).copy()
+elif bundle is not None and bundle.covers("breadth"):
+    # The bundle carries the full breadth history, so any window is served locally
+    trend_df = bundle.breadth(
+        ["trade_date", "pct_market_over_sma50", "ad_line"],
+        limit=trend_days,
+        page=PAGE,
+    ).to_pandas()
+else:
+    trend_query = build_select(
+        BREADTH_TABLE,
+        ["trade_date", "pct_market_over_sma50", "ad_line"],
+        order_by="TRADE_DATE DESC",
+        limit=trend_days,
+    )
+    trend_df = query_arrow(trend_query, page=PAGE).to_pandas()
+
+trend_df = trend_df.sort_values("trade_date")
 trend_df["pct_market_over_sma50"] = trend_df["pct_market_over_sma50"] * 100
 trend_df = trend_df.set_index("trade_date")
 
+# Multi-year ranges are reduced to roughly the (half-width) chart's pixel width
+half_width = DEFAULT_CHART_POINTS // 2
+sma50_trend = downsample_frame(trend_df, ["pct_market_over_sma50"], target_points=half_width)
+ad_line_trend = downsample_frame(trend_df, ["ad_line"], target_points=half_width)
+
 col_trend_1, col_trend_2 = st.columns(2)
 with col_trend_1:
-    st.line_chart(trend_df[["pct_market_over_sma50"]])
+    st.line_chart(sma50_trend[["pct_market_over_sma50"]])
     st.caption("% Market Over SMA50")
 
 with col_trend_2:
-    st.line_chart(trend_df[["ad_line"]])
+    st.line_chart(ad_line_trend[["ad_line"]])
     st.caption("Advance/Decline Line")
 
 st.markdown("---")
 st.markdown("**Latest Rows**")
 
-display_columns = [
-    "trade_date",
-    "stocks_traded",
-    "advances",
-    "declines",
-    "unchanged_stocks",
-    "pct_market_over_sma20",
-    "pct_market_over_sma50",
-    "pct_market_over_sma200",
-    "market_rsi",
-    "ad_line",
-    "ad_ratio",
-    "ad_percentage",
-    "up_down_volume_ratio",
-    "new_highs",
-    "new_lows",
-    "record_high_pct",
-    "high_low_index",
-    "market_momentum",
-]
-
 format_map = {
     "trade_date": "{:%Y-%m-%d}",
     "stocks_traded": "{:,.0f}",
@@ -155,3 +200,4 @@ st.dataframe(
 
 render_data_freshness(data_through=latest["trade_date"])
 st.caption("Returns and percent metrics are stored as decimals in the marts.")
+render_query_stats(PAGE)
@@ -7,7 +7,10 @@ from utilities.dashboard_helpers import (
     render_data_freshness,
     render_page_intro,
 )
-from utilities.snowflake_helper import query_snowflake
+from utilities.dashboard_bundle import get_dashboard_bundle
+from utilities.snowflake_helper import build_select, query_arrow, render_query_stats
+
+PAGE = "Universe Screener"
 
 st.set_page_config(page_title="Universe Screener", layout="wide")
 
@@ -18,13 +21,48 @@ render_page_intro(
     "Latest snapshot across tickers from the current securities mart.",
 )
 
-sector_query = """
-    SELECT DISTINCT SECTOR
-    FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
-    ORDER BY SECTOR
-"""
-sectors_df = query_snowflake(sector_query)
-sectors = sectors_df["SECTOR"].dropna().tolist()
+# Columns rendered by the snapshot table and summary metrics
+display_columns = [
+    "ticker",
+    "company",
+    "sector",
+    "latest_trade_date",
+    "latest_close",
+    "price_change_1d",
+    "return_1d",
+    "return_1w",
+    "return_1m",
+    "return_3m",
+    "return_ytd",
+    "return_wtd",
+    "return_mtd",
+    "latest_rsi",
+    "latest_sma20",
+    "latest_sma50",
+    "latest_sma200",
+    "over_sma50",
+    "has_golden_cross_active",
+    "days_since_last_golden_cross",
+    "pct_distance_from_52week_high",
+    "pct_distance_from_52week_low",
+    "avg_volume_20d",
+    "volatility_20d",
+]
+
+bundle = get_dashboard_bundle()
+
+if bundle is not None:
+    # The bundle holds the whole (~3000 row) dimension, so filters run locally
+    snapshot_df = bundle.securities(display_columns, page=PAGE).to_pandas()
+    sectors = sorted(snapshot_df["sector"].dropna().unique().tolist())
+else:
+    sector_query = """
+        SELECT DISTINCT SECTOR
+        FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
+        ORDER BY SECTOR
+    """
+    sectors_df = query_arrow(sector_query, page=PAGE).to_pandas()
+    sectors = sectors_df["sector"].dropna().tolist()
 
 st.sidebar.header("Filters")
 
@@ -55,65 +93,58 @@ row_limit = st.sidebar.number_input(
     step=100,
 )
 
-conditions = [f"LATEST_RSI BETWEEN {rsi_min} AND {rsi_max}"]
-
-if selected_sectors:
-    sector_list = ", ".join(f"'{s}'" for s in selected_sectors)
-    conditions.append(f"SECTOR IN ({sector_list})")
-
-if apply_return_filter:
-    conditions.append(f"RETURN_1M >= {min_return_1m_pct / 100}")
-
-if only_over_sma50:
-    conditions.append("OVER_SMA50 = 1")
-
-if only_golden_cross:
-    conditions.append("HAS_GOLDEN_CROSS_ACTIVE = 1")
-
-if ticker_search.strip():
-    safe_search = ticker_search.replace("'", "''")
-    conditions.append(f"TICKER ILIKE '%{safe_search}%'")
-
-where_clause = "WHERE " + " AND ".join(conditions)
-
-query = f"""
-    SELECT
-        TICKER,
-        COMPANY,
-        SECTOR,
-        LATEST_TRADE_DATE,
-        LATEST_CLOSE,
-        PRICE_CHANGE_1D,
-        RETURN_1D,
-        RETURN_1W,
-        RETURN_1M,
-        RETURN_3M,
-        RETURN_YTD,
-        LATEST_RSI,
-        LATEST_SMA20,
-        LATEST_SMA50,
-        LATEST_SMA200,
-        OVER_SMA50,
-        HAS_GOLDEN_CROSS_ACTIVE,
-        DAYS_SINCE_LAST_GOLDEN_CROSS,
-        PCT_DISTANCE_FROM_52WEEK_HIGH,
-        PCT_DISTANCE_FROM_52WEEK_LOW,
-        AVG_VOLUME_20D,
-        VOLATILITY_20D
-    FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
-    {where_clause}
-    ORDER BY RETURN_1M DESC
-    LIMIT {row_limit}
-"""
-
-df = query_snowflake(query)
+if bundle is not None:
+    # Mirrors the SQL filters below, including Snowflake's NULLS FIRST on DESC
+    mask = snapshot_df["latest_rsi"].between(rsi_min, rsi_max)
+    if selected_sectors:
+        mask &= snapshot_df["sector"].isin(selected_sectors)
+    if apply_return_filter:
+        mask &= snapshot_df["return_1m"] >= min_return_1m_pct / 100
+    if only_over_sma50:
+        mask &= snapshot_df["over_sma50"] == 1
+    if only_golden_cross:
+        mask &= snapshot_df["has_golden_cross_active"] == 1
+    if ticker_search.strip():
+        mask &= snapshot_df["ticker"].str.contains(ticker_search, case=False, regex=False)
+
+    df = (
+        snapshot_df[mask]
+        .sort_values("return_1m", ascending=False, na_position="first")
+        .head(row_limit)
+    )
+else:
+    conditions = [f"LATEST_RSI BETWEEN {rsi_min} AND {rsi_max}"]
+
+    if selected_sectors:
+        sector_list = ", ".join(f"'{s}'" for s in selected_sectors)
+        conditions.append(f"SECTOR IN ({sector_list})")
+
+    if apply_return_filter:
+        conditions.append(f"RETURN_1M >= {min_return_1m_pct / 100}")
+
+    if only_over_sma50:
+        conditions.append("OVER_SMA50 = 1")
+
+    if only_golden_cross:
+        conditions.append("HAS_GOLDEN_CROSS_ACTIVE = 1")
+
+    if ticker_search.strip():
+        safe_search = ticker_search.replace("'", "''")
+        conditions.append(f"TICKER ILIKE '%{safe_search}%'")
+
+    query = build_select(
+        "MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT",
+        display_columns,
+        where=" AND ".join(conditions),
+        order_by="RETURN_1M DESC",
+        limit=row_limit,
+    )
+    df = query_arrow(query, page=PAGE).to_pandas()
 
 if df.empty:
     st.warning("No rows match the current filters.")
     st.stop()
 
-df.columns = df.columns.str.lower()
-
 st.markdown("**Summary**")
 summary_col1, summary_col2, summary_col3 = st.columns(3)
 summary_col1.metric("Rows Returned", format_count(len(df)))
@@ -129,31 +160,6 @@ summary_col3.metric(
 st.markdown("---")
 st.markdown("**Latest Snapshot**")
 
-display_columns = [
-    "ticker",
-    "company",
-    "sector",
-    "latest_trade_date",
-    "latest_close",
-    "price_change_1d",
-    "return_1d",
-    "return_1w",
-    "return_1m",
-    "return_3m",
-    "return_ytd",
-    "latest_rsi",
-    "latest_sma20",
-    "latest_sma50",
-    "latest_sma200",
-    "over_sma50",
-    "has_golden_cross_active",
-    "days_since_last_golden_cross",
-    "pct_distance_from_52week_high",
-    "pct_distance_from_52week_low",
-    "avg_volume_20d",
-    "volatility_20d",
-]
-
 format_map = {
     "latest_trade_date": "{:%Y-%m-%d}",
     "latest_close": "${:,.2f}",
@@ -163,6 +169,8 @@ format_map = {
     "return_1m": "{:.2%}",
     "return_3m": "{:.2%}",
     "return_ytd": "{:.2%}",
+    "return_wtd": "{:.2%}",
+    "return_mtd": "{:.2%}",
     "latest_rsi": "{:.1f}",
     "latest_sma20": "${:,.2f}",
     "latest_sma50": "${:,.2f}",
@@ -181,3 +189,4 @@ st.dataframe(
 
 render_data_freshness()
 st.caption("Returns and percent fields are stored as decimals in the marts.")
+render_query_stats(PAGE)
@@ -10,7 +10,12 @@ from utilities.dashboard_helpers import (
     render_data_freshness,
     render_page_intro,
 )
-from utilities.snowflake_helper import query_snowflake
+from utilities.dashboard_bundle import get_dashboard_bundle
+from utilities.downsampling import downsample_frame
+from utilities.momentum_store import get_momentum_store
+from utilities.snowflake_helper import query_arrow, render_query_stats
+
+PAGE = "Ticker Momentum"
 
 st.set_page_config(page_title="Ticker Momentum", layout="wide")
 
@@ -21,27 +26,45 @@ render_page_intro(
     "Time-series signals for a single ticker from the trading momentum mart.",
 )
 
-ticker_query = """
-    SELECT DISTINCT TICKER
-    FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
-    ORDER BY TICKER
-"""
-date_query = """
-    SELECT MIN(TRADE_DATE) AS MIN_DATE, MAX(TRADE_DATE) AS MAX_DATE
-    FROM MARKET.RAW_MARTS.FCT_TRADING_MOMENTUM
-"""
+store = get_momentum_store()
+bundle = get_dashboard_bundle()
+
+if store is not None:
+    # Ticker list and date bounds come from the local memory-mapped store
+    tickers = store.tickers()
+    min_date, max_date = store.date_bounds()
+    if min_date is None:
+        st.warning("No momentum data available in the marts yet.")
+        st.stop()
+elif bundle is not None and bundle.covers("momentum"):
+    # Cold start from the published bundle; older ranges still fall back to live queries
+    tickers = sorted(
+        bundle.securities(["ticker"], page=PAGE).to_pandas()["ticker"].dropna().tolist()
+    )
+    min_date = bundle.datasets["momentum"]["history_min_date"]
+    max_date = bundle.datasets["momentum"]["max_date"]
+else:
+    ticker_query = """
+        SELECT DISTINCT TICKER
+        FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
+        ORDER BY TICKER
+    """
+    date_query = """
+        SELECT MIN(TRADE_DATE) AS MIN_DATE, MAX(TRADE_DATE) AS MAX_DATE
+        FROM MARKET.RAW_MARTS.FCT_TRADING_MOMENTUM
+    """
 
-tickers_df = query_snowflake(ticker_query)
-dates_df = query_snowflake(date_query)
+    tickers_df = query_arrow(ticker_query, page=PAGE).to_pandas()
+    dates_df = query_arrow(date_query, page=PAGE).to_pandas()
 
-tickers = tickers_df["TICKER"].dropna().tolist()
+    tickers = tickers_df["ticker"].dropna().tolist()
 
-if dates_df.empty:
-    st.warning("No momentum data available in the marts yet.")
-    st.stop()
+    if dates_df.empty:
+        st.warning("No momentum data available in the marts yet.")
+        st.stop()
 
-min_date = dates_df.iloc[0]["MIN_DATE"]
-max_date = dates_df.iloc[0]["MAX_DATE"]
+    min_date = dates_df.iloc[0]["min_date"]
+    max_date = dates_df.iloc[0]["max_date"]
 
 st.sidebar.header("Filters")
 
@@ -69,41 +92,48 @@ row_limit = st.sidebar.number_input(
     step=50,
 )
 
-query = f"""
-    SELECT
-        TICKER,
-        TRADE_DATE,
-        OPEN,
-        HIGH,
-        LOW,
-        CLOSE,
-        YESTERDAY_CLOSE,
-        VOLUME,
-        SMA_20,
-        SMA_50,
-        SMA_200,
-        RSI,
-        REL_VOL,
-        HIGH_52WEEK,
-        LOW_52WEEK,
-        BULLISH_CROSSOVER,
-        GOLDEN_CROSS,
-        DEATH_CROSS
-    FROM MARKET.RAW_MARTS.FCT_TRADING_MOMENTUM
-    WHERE TICKER = '{selected_ticker}'
-      AND TRADE_DATE BETWEEN '{start_date}' AND '{end_date}'
-    ORDER BY TRADE_DATE DESC
-    LIMIT {row_limit}
-"""
-
-df = query_snowflake(query)
+if store is not None:
+    # Zero-copy slice of the mapped file; only the selected range becomes pandas
+    range_df = store.get_slice(selected_ticker, start_date, end_date).to_pandas()
+    df = range_df.sort_values("trade_date", ascending=False).head(row_limit)
+elif bundle is not None and bundle.covers("momentum", start_date, end_date):
+    range_df = bundle.momentum(selected_ticker, start_date, end_date, page=PAGE).to_pandas()
+    df = range_df.sort_values("trade_date", ascending=False).head(row_limit)
+else:
+    range_df = None
+    query = f"""
+        SELECT
+            TICKER,
+            TRADE_DATE,
+            OPEN,
+            HIGH,
+            LOW,
+            CLOSE,
+            YESTERDAY_CLOSE,
+            VOLUME,
+            SMA_20,
+            SMA_50,
+            SMA_200,
+            RSI,
+            REL_VOL,
+            HIGH_52WEEK,
+            LOW_52WEEK,
+            BULLISH_CROSSOVER,
+            GOLDEN_CROSS,
+            DEATH_CROSS
+        FROM MARKET.RAW_MARTS.FCT_TRADING_MOMENTUM
+        WHERE TICKER = '{selected_ticker}'
+          AND TRADE_DATE BETWEEN '{start_date}' AND '{end_date}'
+        ORDER BY TRADE_DATE DESC
+        LIMIT {row_limit}
+    """
+    
+    df = query_arrow(query, page=PAGE).to_pandas()
 
 if df.empty:
     st.warning("No rows returned for the selected ticker/date range.")
     st.stop()
 
-df.columns = df.columns.str.lower()
-
 latest = df.iloc[0]
 signal_label = "None"
 if pd.notna(latest["golden_cross"]) and latest["golden_cross"] == 1:
@@ -123,8 +153,15 @@ col5.metric("Signal", signal_label)
 st.markdown("---")
 st.markdown("**Price + SMA Trends**")
 
-trend_df = df.sort_values("trade_date").set_index("trade_date")
-st.line_chart(trend_df[["close", "sma_20", "sma_50", "sma_200"]])
+# Local sources hold the whole range, so chart all of it rather than the Max Rows window
+chart_df = df if range_df is None else range_df
+trend_columns = ["close", "sma_20", "sma_50", "sma_200"]
+trend_df = downsample_frame(
+    chart_df.sort_values("trade_date").set_index("trade_date"),
+    trend_columns,
+    cross_pairs=[("close", "sma_20"), ("close", "sma_50"), ("sma_50", "sma_200")],
+)
+st.line_chart(trend_df[trend_columns])
 
 st.markdown("---")
 st.markdown("**Latest Rows**")
@@ -149,3 +186,4 @@ format_map = {
 st.dataframe(df.style.format(format_map), use_container_width=True)
 render_data_freshness()
 st.caption("Returns and percent metrics are stored as decimals in the marts.")
+render_query_stats(PAGE)
@@ -9,7 +9,22 @@ from utilities.dashboard_helpers import (
     render_data_freshness,
     render_page_intro,
 )
-from utilities.snowflake_helper import query_snowflake
+from utilities.dashboard_bundle import get_dashboard_bundle
+from utilities.snowflake_helper import build_select, query_arrow, render_query_stats
+
+PAGE = "Home"
+
+# Columns rendered by the home page metrics; nothing else is fetched
+BREADTH_COLUMNS = [
+    "trade_date",
+    "stocks_traded",
+    "advances",
+    "declines",
+    "unchanged_stocks",
+    "market_rsi",
+    "pct_market_over_sma50",
+    "record_high_pct",
+]
 
 st.set_page_config(page_title="Home", layout="wide")
 
@@ -21,28 +36,35 @@ render_page_intro(
 )
 st.sidebar.success("Use the sidebar to navigate the marts")
 
-breadth_query = """
-    SELECT *
-    FROM MARKET.RAW_MARTS.AGG_DAILY_MARKET_BREADTH
-    ORDER BY TRADE_DATE DESC
-    LIMIT 1
-"""
-count_query = """
-    SELECT COUNT(*) AS TICKER_COUNT
-    FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
-"""
+bundle = get_dashboard_bundle()
+
+if bundle is not None:
+    # Served from the published snapshot; no warehouse resume on cold start
+    breadth = bundle.breadth(BREADTH_COLUMNS, limit=1, page=PAGE)
+    ticker_count = bundle.datasets["securities"]["rows"]
+else:
+    breadth_query = build_select(
+        "MARKET.RAW_MARTS.AGG_DAILY_MARKET_BREADTH",
+        BREADTH_COLUMNS,
+        order_by="TRADE_DATE DESC",
+        limit=1,
+    )
+    count_query = """
+        SELECT COUNT(*) AS TICKER_COUNT
+        FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
+    """
+
+    breadth = query_arrow(breadth_query, page=PAGE)
+    counts = query_arrow(count_query, page=PAGE)
 
-breadth_df = query_snowflake(breadth_query)
-count_df = query_snowflake(count_query)
+    ticker_count = None
+    if not counts.empty:
+        ticker_count = counts.to_pandas().iloc[0]["ticker_count"]
 
-if breadth_df.empty:
+if breadth.empty:
     st.warning("No market breadth data available in the marts yet.")
 else:
-    breadth_df.columns = breadth_df.columns.str.lower()
-    latest = breadth_df.iloc[0]
-    ticker_count = None
-    if not count_df.empty:
-        ticker_count = count_df.iloc[0]["TICKER_COUNT"]
+    latest = breadth.to_pandas().iloc[0]
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Latest Trade Date", format_date(latest["trade_date"]))
@@ -63,3 +85,4 @@ else:
     )
 
 st.caption("Returns and percent metrics are stored as decimals in the marts.")
+render_query_stats(PAGE)
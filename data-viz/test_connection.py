@@ -1,4 +1,4 @@
 from utilities.snowflake_helper import query_snowflake
 
-df = query_snowflake("SELECT CURRENT_USER(), CURRENT_ROLE(), CURRENT_WAREHOUSE(), CURRENT_DATABASE(), CURRENT_SCHEMA()")
+df = query_snowflake("SELECT CURRENT_USER(), CURRENT_ROLE(), CURRENT_WAREHOUSE(), CURRENT_DATABASE(), CURRENT_SCHEMA()", page="test_connection")
 print(df)
\ No newline at end of file
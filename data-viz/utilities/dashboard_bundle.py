@@ -0,0 +1,108 @@
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import streamlit as st
+
+from utilities.snowflake_helper import ArrowResult, record_query_stats
+
+# Published by src/dashboard_bundle.py after each marts run
+DEFAULT_BUNDLE_DIR = Path(__file__).resolve().parents[2] / "data" / "dashboard_bundle"
+LATEST_POINTER = "LATEST"
+MANIFEST_FILE = "manifest.json"
+
+
+def get_bundle_root() -> Path:
+    """Resolve the bundle directory (DASHBOARD_BUNDLE_DIR overrides the repo default)."""
+    return Path(os.getenv("DASHBOARD_BUNDLE_DIR", DEFAULT_BUNDLE_DIR))
+
+
+class DashboardBundle:
+    """Read-only view of one published marts snapshot."""
+
+    def __init__(self, bundle_dir: Path):
+        self.bundle_dir = bundle_dir
+        with open(bundle_dir / MANIFEST_FILE) as f:
+            self.manifest = json.load(f)
+        self.datasets = self.manifest["datasets"]
+        self._tables = {}
+
+    @property
+    def data_through(self):
+        value = self.manifest.get("data_through")
+        return date.fromisoformat(value) if value else None
+
+    def _table(self, name: str) -> pa.Table:
+        if name not in self._tables:
+            path = self.bundle_dir / self.datasets[name]["file"]
+            if path.suffix == ".parquet":
+                self._tables[name] = pq.read_table(path)
+            else:
+                self._tables[name] = feather.read_table(path, memory_map=True)
+        return self._tables[name]
+
+    def _result(self, table: pa.Table, page: str) -> ArrowResult:
+        # Bundle reads show up in the page stats as zero-query fetches
+        record_query_stats(page, queries=0)
+        return ArrowResult(table, page)
+
+    def covers(self, name: str, start_date: date = None, end_date: date = None) -> bool:
+        """True if the dataset exists and spans the requested date range."""
+        meta = self.datasets.get(name)
+        if meta is None:
+            return False
+        if start_date is not None and start_date < date.fromisoformat(meta["min_date"]):
+            return False
+        if end_date is not None and end_date > date.fromisoformat(meta["max_date"]):
+            return False
+        return True
+
+    def breadth(self, columns: list, limit: int = None, page: str = "") -> ArrowResult:
+        """Latest breadth rows (newest first), projected to the given columns."""
+        table = self._table("breadth").select(columns)
+        table = table.sort_by([("trade_date", "descending")])
+        if limit is not None:
+            table = table.slice(0, limit)
+        return self._result(table, page)
+
+    def securities(self, columns: list = None, page: str = "") -> ArrowResult:
+        table = self._table("securities")
+        if columns:
+            table = table.select(columns)
+        return self._result(table, page)
+
+    def momentum(self, ticker: str, start_date: date, end_date: date,
+                 page: str = "") -> ArrowResult:
+        """Momentum rows for one ticker in a date range (caller checks coverage)."""
+        table = self._table("momentum")
+        mask = pc.and_(
+            pc.equal(table.column("ticker"), ticker),
+            pc.and_(
+                pc.greater_equal(table.column("trade_date"), pa.scalar(start_date)),
+                pc.less_equal(table.column("trade_date"), pa.scalar(end_date)),
+            ),
+        )
+        return self._result(table.filter(mask), page)
+
+
+@st.cache_resource(show_spinner=False)
+def _open_bundle(bundle_dir: str) -> DashboardBundle:
+    # Keyed by the versioned directory, so a new bundle is picked up on the next rerun
+    return DashboardBundle(Path(bundle_dir))
+
+
+def get_dashboard_bundle():
+    """Return the newest published bundle, or None to fall back to live queries."""
+    root = get_bundle_root()
+    pointer = root / LATEST_POINTER
+    if not pointer.exists():
+        return None
+    bundle_dir = root / pointer.read_text().strip()
+    if not (bundle_dir / MANIFEST_FILE).exists():
+        return None
+    return _open_bundle(str(bundle_dir))
@@ -1,6 +1,7 @@
 import pandas as pd
 import streamlit as st
 
+from utilities.dashboard_bundle import get_dashboard_bundle
 from utilities.snowflake_helper import query_snowflake
 
 
@@ -72,6 +73,10 @@ def format_date(value):
 
 
 def get_data_freshness():
+    bundle = get_dashboard_bundle()
+    if bundle is not None:
+        return bundle.data_through, bundle.datasets["securities"]["rows"]
+
     date_query = """
         SELECT MAX(TRADE_DATE) AS DATA_THROUGH
         FROM MARKET.RAW_MARTS.AGG_DAILY_MARKET_BREADTH
@@ -81,8 +86,8 @@ def get_data_freshness():
         FROM MARKET.RAW_MARTS.DIM_SECURITIES_CURRENT
     """
 
-    date_df = query_snowflake(date_query)
-    count_df = query_snowflake(count_query)
+    date_df = query_snowflake(date_query, page="data_freshness")
+    count_df = query_snowflake(count_query, page="data_freshness")
 
     data_through = None
     if not date_df.empty:
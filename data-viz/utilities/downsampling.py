@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Roughly the pixel width of a wide-layout chart; more points than this are invisible
+DEFAULT_CHART_POINTS = 800
+
+# Share of the point budget reserved for the rows around series crosses
+CROSS_POINT_SHARE = 0.2
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets over an evenly spaced series.
+
+    Returns the positions of the points to keep. The first and last points
+    are always kept; NaNs must be removed by the caller.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    # Interior points are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[start:end] - y[prev])
+            - (x[prev] - x[start:end]) * (avg_y - y[prev])
+        )
+        prev = start + int(np.argmax(areas))
+        keep[i + 1] = prev
+
+    return keep
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Keep the minimum and maximum of each bucket (n_out // 2 buckets)."""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            bucket = y[start:end]
+            keep.extend([start + int(np.argmin(bucket)), start + int(np.argmax(bucket))])
+    return np.unique(keep)
+
+
+def cross_indices(a: pd.Series, b: pd.Series, max_crosses: int = None) -> np.ndarray:
+    """
+    Positions where series a crosses series b (sign of a - b changes).
+
+    With max_crosses, the series is split into that many buckets and only the
+    first cross in each is kept, so a choppy stretch cannot flood the chart.
+    """
+    sign = np.sign((a - b).to_numpy(dtype=float))
+    valid = ~np.isnan(sign)
+    changed = np.zeros(len(sign), dtype=bool)
+    changed[1:] = valid[1:] & valid[:-1] & (sign[1:] != sign[:-1])
+    positions = np.flatnonzero(changed)
+    if max_crosses is not None and len(positions) > max_crosses:
+        buckets = positions * max_crosses // len(sign)
+        positions = positions[np.unique(buckets, return_index=True)[1]]
+    # Keep both sides of the cross so the lines visibly intersect
+    return np.unique(np.concatenate([positions - 1, positions]))
+
+
+def downsample_frame(
+    df: pd.DataFrame,
+    columns: list,
+    target_points: int = DEFAULT_CHART_POINTS,
+    method: str = "lttb",
+    cross_pairs: list = None,
+) -> pd.DataFrame:
+    """
+    Reduce a time-indexed frame to about target_points rows before charting.
+
+    Each column gets an equal share of the point budget; the union of the
+    selected rows is returned so every series stays aligned on one index.
+    Global extremes of each column are always kept. Crosses between the given
+    column pairs share CROSS_POINT_SHARE of the budget, at most one per bucket,
+    so the output never exceeds target_points however often the lines cross.
+
+    Args:
+        df (pd.DataFrame): Frame sorted by its (date) index.
+        columns (list): Columns that will be plotted.
+        target_points (int): Maximum output size (chart pixel width).
+        method (str): "lttb" or "minmax".
+        cross_pairs (list): (column_a, column_b) pairs whose crossings must survive.
+
+    Returns:
+        pd.DataFrame: Subset of df rows, in the original order.
+    """
+    if len(df) <= target_points:
+        return df
+
+    select = lttb_indices if method == "lttb" else minmax_indices
+    cross_pairs = cross_pairs or []
+    # Two rows per kept cross, split evenly across the pairs
+    cross_budget = int(target_points * CROSS_POINT_SHARE) if cross_pairs else 0
+    max_crosses = max(cross_budget // (2 * len(cross_pairs)), 1) if cross_pairs else 0
+    # First/last rows and each column's extremes come out of the budget too
+    series_budget = target_points - cross_budget - 2 - 2 * len(columns)
+    budget = max(series_budget // max(len(columns), 1), 3)
+    keep = [np.array([0, len(df) - 1])]
+
+    for column in columns:
+        values = df[column].to_numpy(dtype=float)
+        present = np.flatnonzero(~np.isnan(values))
+        if len(present) == 0:
+            continue
+        chosen = present[select(values[present], budget)]
+        extremes = present[[np.argmin(values[present]), np.argmax(values[present])]]
+        keep.extend([chosen, extremes])
+
+    for a, b in cross_pairs:
+        keep.append(cross_indices(df[a], df[b], max_crosses))
+
+    positions = np.unique(np.concatenate(keep))
+    positions = positions[(positions >= 0) & (positions < len(df))]
+    return df.iloc[positions]
@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import streamlit as st
+
+# Written by src/momentum_store.py after each successful DAG run
+STORE_FILE = "fct_trading_momentum.arrow"
+DEFAULT_STORE_DIR = Path(__file__).resolve().parents[2] / "data" / "momentum_store"
+EPOCH = date(1970, 1, 1)
+
+
+def get_store_path() -> Path:
+    """Resolve the shared momentum store file (MOMENTUM_STORE_DIR overrides the repo default)."""
+    return Path(os.getenv("MOMENTUM_STORE_DIR", DEFAULT_STORE_DIR)) / STORE_FILE
+
+
+def _date32_days(array: pa.Array) -> np.ndarray:
+    """View a date32 array as int32 days since epoch without copying."""
+    return np.frombuffer(
+        array.buffers()[1],
+        dtype=np.int32,
+        count=len(array),
+        offset=array.offset * 4,
+    )
+
+
+class MomentumStore:
+    """Memory-mapped, security-sorted view of FCT_TRADING_MOMENTUM."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Pages of the mapped file live in the OS page cache, so every
+        # Streamlit process reading the same file shares one copy.
+        self._source = pa.memory_map(str(path), "r")
+        self.table = pa.ipc.open_file(self._source).read_all()
+        self.index = json.loads(self.table.schema.metadata[b"ticker_index"])
+
+    def tickers(self) -> list:
+        return sorted(self.index)
+
+    def date_bounds(self):
+        dates = self.table.column("trade_date")
+        if len(dates) == 0:
+            return None, None
+        days = np.concatenate([_date32_days(chunk) for chunk in dates.chunks])
+        return (
+            EPOCH + timedelta(days=int(days.min())),
+            EPOCH + timedelta(days=int(days.max())),
+        )
+
+    def get_slice(self, ticker: str, start_date: date, end_date: date) -> pa.Table:
+        """Return the rows for one ticker between two dates as a zero-copy slice."""
+        if ticker not in self.index:
+            return self.table.slice(0, 0)
+
+        offset, length = self.index[ticker]
+        rows = self.table.slice(offset, length)
+
+        # Rows are date-sorted within each security, so the range is two binary searches
+        chunks = rows.column("trade_date").chunks
+        days = _date32_days(chunks[0]) if len(chunks) == 1 else np.concatenate(
+            [_date32_days(chunk) for chunk in chunks]
+        )
+        lo = np.searchsorted(days, (start_date - EPOCH).days, side="left")
+        hi = np.searchsorted(days, (end_date - EPOCH).days, side="right")
+        return rows.slice(int(lo), int(hi - lo))
+
+
+@st.cache_resource(show_spinner=False)
+def _open_store(path: str, mtime: float) -> MomentumStore:
+    # mtime is part of the cache key so a refreshed file is re-mapped
+    return MomentumStore(Path(path))
+
+
+def get_momentum_store():
+    """Return the shared momentum store, or None if it has not been materialized."""
+    path = get_store_path()
+    if not path.exists():
+        return None
+    return _open_store(str(path), path.stat().st_mtime)
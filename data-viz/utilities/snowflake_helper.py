@@ -1,5 +1,9 @@
+import json
+import time
+
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
 import snowflake.connector
 from cryptography.hazmat.primitives import serialization
 
@@ -24,7 +28,12 @@ def _load_private_key():
     return private_key_der
 
 
-def get_snowflake_connection():
+def _query_tag(page: str) -> str:
+    """Structured QUERY_TAG so dashboard reads can be attributed per page."""
+    return json.dumps({"component": "dashboard", "profile": "dashboard", "page": page}, separators=(",", ":"))
+
+
+def get_snowflake_connection(page: str = "app"):
     """Create a Snowflake connection using private-key authentication."""
     private_key_der = _load_private_key()
 
@@ -32,16 +41,18 @@ def get_snowflake_connection():
         account=st.secrets["snowflake"]["account"],
         user=st.secrets["snowflake"]["user"],
         role=st.secrets["snowflake"]["role"],
-        warehouse=st.secrets["snowflake"]["warehouse"],
+        # Dashboard reads can run on their own small, slow-to-suspend warehouse
+        warehouse=st.secrets["snowflake"].get("dashboard_warehouse", st.secrets["snowflake"]["warehouse"]),
         database=st.secrets["snowflake"]["database"],
         schema=st.secrets["snowflake"]["schema"],
         private_key=private_key_der,
+        session_parameters={"QUERY_TAG": _query_tag(page)},
     )
 
 
-def query_snowflake(sql: str) -> pd.DataFrame:
+def query_snowflake(sql: str, page: str = "app") -> pd.DataFrame:
     """Run SQL query against Snowflake and return pandas DataFrame."""
-    conn = get_snowflake_connection()
+    conn = get_snowflake_connection(page)
     cur = conn.cursor()
     try:
         cur.execute(sql)
@@ -49,3 +60,111 @@ def query_snowflake(sql: str) -> pd.DataFrame:
     finally:
         cur.close()
         conn.close()
+
+
+class ArrowResult:
+    """Query result held as Arrow; pandas frames are built lazily per column set."""
+
+    def __init__(self, table: pa.Table, page: str):
+        # Renaming only rewrites the schema; column buffers are not copied
+        self.table = table.rename_columns([name.lower() for name in table.column_names])
+        self.page = page
+        self._frames = {}
+
+    @property
+    def empty(self) -> bool:
+        return self.table.num_rows == 0
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def to_pandas(self, columns=None) -> pd.DataFrame:
+        """Convert the requested columns (all by default) to pandas, once per column set."""
+        key = tuple(columns) if columns else tuple(self.table.column_names)
+        if key not in self._frames:
+            start = time.perf_counter()
+            self._frames[key] = self.table.select(list(key)).to_pandas()
+            record_query_stats(self.page, convert_seconds=time.perf_counter() - start)
+        return self._frames[key]
+
+
+def build_select(table: str, columns: list, where: str = None,
+                 order_by: str = None, limit: int = None) -> str:
+    """Build a projected SELECT so only the columns a view renders are transferred."""
+    sql = f"SELECT {', '.join(column.upper() for column in columns)} FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit is not None:
+        sql += f" LIMIT {limit}"
+    return sql
+
+
+# Snowflake column types -> Arrow types for results without any batches
+_EMPTY_TYPES = {
+    "REAL": pa.float64(),
+    "TEXT": pa.string(),
+    "DATE": pa.date32(),
+    "TIMESTAMP_NTZ": pa.timestamp("ns"),
+    "TIMESTAMP_LTZ": pa.timestamp("ns", tz="UTC"),
+    "TIMESTAMP_TZ": pa.timestamp("ns", tz="UTC"),
+    "BOOLEAN": pa.bool_(),
+}
+
+
+def _empty_table(description) -> pa.Table:
+    """Zero-row table with the result's columns, so pages can still index them."""
+    from snowflake.connector.constants import FIELD_ID_TO_NAME
+
+    fields = []
+    for column in description:
+        type_name = FIELD_ID_TO_NAME.get(column.type_code)
+        if type_name == "FIXED":
+            arrow_type = pa.int64() if not column.scale else pa.float64()
+        else:
+            arrow_type = _EMPTY_TYPES.get(type_name, pa.string())
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields).empty_table()
+
+
+def query_arrow(sql: str, page: str) -> ArrowResult:
+    """Run SQL against Snowflake and return the result as Arrow record batches."""
+    conn = get_snowflake_connection(page)
+    cur = conn.cursor()
+    try:
+        start = time.perf_counter()
+        cur.execute(sql)
+        batches = list(cur.fetch_arrow_batches())
+        fetch_seconds = time.perf_counter() - start
+        # An empty result yields no batches; keep its columns and types
+        table = pa.Table.from_batches(batches) if batches else _empty_table(cur.description)
+    finally:
+        cur.close()
+        conn.close()
+
+    # nbytes is the decoded in-memory size; the compressed download is smaller
+    record_query_stats(page, arrow_memory_bytes=table.nbytes, fetch_seconds=fetch_seconds, queries=1)
+    return ArrowResult(table, page)
+
+
+def record_query_stats(page: str, **values):
+    """Accumulate per-page transfer and conversion measurements for this session."""
+    stats = st.session_state.setdefault("query_stats", {}).setdefault(
+        page,
+        {"queries": 0, "arrow_memory_bytes": 0, "fetch_seconds": 0.0, "convert_seconds": 0.0},
+    )
+    for key, value in values.items():
+        stats[key] += value
+
+
+def render_query_stats(page: str):
+    """Show the last rerun's query measurements for a page in the sidebar."""
+    stats = st.session_state.get("query_stats", {}).pop(page, None)
+    if not stats:
+        return
+    with st.sidebar.expander("Query stats"):
+        st.write(f"Queries: {stats['queries']}")
+        st.write(f"Arrow result size (in memory): {stats['arrow_memory_bytes'] / 1024:,.1f} KiB")
+        st.write(f"Fetch time: {stats['fetch_seconds'] * 1000:,.0f} ms")
+        st.write(f"Pandas conversion: {stats['convert_seconds'] * 1000:,.1f} ms")
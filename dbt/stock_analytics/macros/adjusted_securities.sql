@@ -0,0 +1,15 @@
+-- Matches the securities whose split factors changed since the last run.
+-- adjusted_security_ids var (list or comma-separated string) comes from the DAG's
+-- pending_adjustments task; incremental models OR this with incremental_window so a split
+-- reprocesses one security's whole history instead of a full refresh. Empty: matches nothing.
+{% macro adjusted_securities(column='security_id') -%}
+    {%- set ids = var('adjusted_security_ids', []) -%}
+    {%- if ids is string -%}
+        {%- set ids = ids.split(',') | map('trim') | reject('equalto', '') | list -%}
+    {%- endif -%}
+    {%- if ids | length == 0 -%}
+        1 = 0
+    {%- else -%}
+        {{ column }} IN ({{ ids | map('int') | join(', ') }})
+    {%- endif -%}
+{%- endmacro %}
@@ -1,13 +1,13 @@
 -- Computes a simple moving average over the given number of periods.
-{% macro calculate_sma(periods) %}
+{% macro calculate_sma(periods, partition_by='security_id') %}
     CASE 
         WHEN COUNT(close) OVER (
-            PARTITION BY ticker
+            PARTITION BY {{ partition_by }}
             ORDER BY trade_date
             ROWS BETWEEN {{ periods - 1 }} PRECEDING AND CURRENT ROW
         ) >= {{ periods }}
         THEN AVG(close) OVER (
-            PARTITION BY ticker
+            PARTITION BY {{ partition_by }}
             ORDER BY trade_date
             ROWS BETWEEN {{ periods - 1 }} PRECEDING AND CURRENT ROW
         )
@@ -0,0 +1,23 @@
+-- Filters an incremental model's slice to the dates the ingestion ledger reported as changed.
+-- changed_dates var (list or comma-separated string) comes from the extract task. Window
+-- functions in later rows depend on every revised day, so the slice starts at the earliest
+-- changed date. Without the var, falls back to the original trailing 4-day window.
+-- extra_days widens the start for callers that need preceding rows as context (see test_window);
+-- relation replaces {{ this }} for the fallback outside incremental models.
+{% macro incremental_window(column='trade_date', lookback_days=4, extra_days=0, relation=none) -%}
+    {%- set changed = var('changed_dates', none) -%}
+    {%- if changed is string -%}
+        {%- set changed = changed.split(',') | map('trim') | reject('equalto', '') | list -%}
+    {%- endif -%}
+    {%- if changed is none -%}
+        {{ column }} >= (
+            SELECT DATEADD(day, -{{ lookback_days + extra_days }}, MAX(trade_date)) FROM {{ relation or this }}
+        )
+    {%- elif changed | length == 0 -%}
+        1 = 0
+    {%- elif extra_days -%}
+        {{ column }} >= DATEADD(day, -{{ extra_days }}, '{{ changed | min }}'::DATE)
+    {%- else -%}
+        {{ column }} >= '{{ changed | min }}'::DATE
+    {%- endif -%}
+{%- endmacro %}
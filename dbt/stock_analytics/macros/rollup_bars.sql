@@ -0,0 +1,139 @@
+-- Body of the weekly/monthly bar rollups: folds int_russell3000__daily into one OHLCV + VWAP bar
+-- per security per NYSE period (period='week' or 'month', boundaries from stg_trading_sessions).
+-- Incremental runs rebuild only the periods containing a changed date (normally just the open
+-- week and month), plus the full history of securities re-adjusted for a split.
+{% macro rollup_bars(period) -%}
+WITH sessions AS (
+    SELECT
+        session_date,
+        {{ period }}_first_session AS period_start,
+        {{ period }}_last_session AS period_end
+    FROM {{ ref('stg_trading_sessions') }}
+),
+
+{% if is_incremental() %}
+changed_periods AS (
+    -- Periods holding a date the ledger reported as loaded or revised
+    SELECT DISTINCT period_start
+    FROM sessions
+    WHERE {{ incremental_window('session_date') }}
+),
+{% endif %}
+
+daily AS (
+    SELECT
+        d.security_id,
+        d.ticker,
+        d.company,
+        d.sector,
+        d.trade_date,
+        d.open,
+        d.high,
+        d.low,
+        d.close,
+        d.volume,
+        d.volume_weighted_avg,
+        d.num_transactions,
+        s.period_start,
+        s.period_end
+    FROM {{ ref('int_russell3000__daily') }} AS d
+    INNER JOIN sessions AS s
+        ON d.trade_date = s.session_date
+    WHERE d.is_valid_record = 1
+    {% if is_incremental() %}
+      -- Whole periods only: a bar's open comes from the period's first session
+      AND (
+          s.period_start IN (SELECT period_start FROM changed_periods)
+          OR {{ adjusted_securities('d.security_id') }}
+      )
+    {% endif %}
+),
+
+bars AS (
+    SELECT
+        security_id,
+        period_start,
+        MAX(period_end)                             AS period_end,
+        MAX(trade_date)                             AS trade_date,
+        MAX_BY(ticker, trade_date)                  AS ticker,
+        MAX_BY(company, trade_date)                 AS company,
+        MAX_BY(sector, trade_date)                  AS sector,
+        MIN_BY(open, trade_date)                    AS open,
+        MAX(high)                                   AS high,
+        MIN(low)                                    AS low,
+        MAX_BY(close, trade_date)                   AS close,
+        SUM(volume)                                 AS volume,
+        -- Volume-weighted over the sessions that report a VWAP
+        SUM(volume_weighted_avg * volume)
+            / NULLIF(SUM(IFF(volume_weighted_avg IS NOT NULL, volume, 0)), 0) AS vwap,
+        SUM(num_transactions)                       AS num_transactions,
+        COUNT(*)                                    AS sessions_traded
+    FROM daily
+    GROUP BY security_id, period_start
+),
+
+{% if is_incremental() %}
+-- Close of each security's latest bar before the slice, from the already-built table;
+-- the same row LAG picks in a full build, even when the security skipped periods
+slice_start AS (
+    SELECT
+        security_id,
+        MIN(period_start) AS first_period_start
+    FROM bars
+    GROUP BY security_id
+),
+
+prior_bar AS (
+    SELECT
+        t.security_id,
+        t.close AS prev_close
+    FROM {{ this }} AS t
+    INNER JOIN slice_start AS s
+        ON t.security_id = s.security_id
+        AND t.period_start < s.first_period_start
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY t.security_id
+        ORDER BY t.period_start DESC
+    ) = 1
+),
+{% endif %}
+
+final AS (
+    SELECT
+        b.*,
+
+        {% if is_incremental() %}
+        COALESCE(
+            LAG(b.close) OVER (
+                PARTITION BY b.security_id
+                ORDER BY b.period_start
+            ),
+            p.prev_close
+        ) AS prev_period_close,
+        {% else %}
+        LAG(b.close) OVER (
+            PARTITION BY b.security_id
+            ORDER BY b.period_start
+        ) AS prev_period_close,
+        {% endif %}
+
+        -- The period's last session has been loaded; until then the bar is rewritten each run
+        CASE
+            WHEN b.period_end <= (SELECT MAX(trade_date) FROM {{ ref('int_russell3000__daily') }})
+            THEN 1
+            ELSE 0
+        END AS is_complete
+
+    FROM bars AS b
+
+    {% if is_incremental() %}
+    LEFT JOIN prior_bar AS p
+        ON b.security_id = p.security_id
+    {% endif %}
+)
+
+SELECT
+    *,
+    IFF(prev_period_close != 0, close / prev_period_close - 1, NULL) AS period_return
+FROM final
+{%- endmacro %}
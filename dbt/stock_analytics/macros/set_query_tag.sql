@@ -0,0 +1,12 @@
+-- Tags each model's queries with the DBT_QUERY_TAG fields (stage, run_id) plus the model name.
+-- Overrides dbt-snowflake's default, which only applies a static query_tag config.
+{% macro snowflake__set_query_tag() -%}
+    {%- set tag = fromjson(env_var('DBT_QUERY_TAG', '{}'), {}) -%}
+    {%- if 'component' not in tag -%}
+        {%- do tag.update({'component': 'dbt'}) -%}
+    {%- endif -%}
+    {%- do tag.update({'model': model.name}) -%}
+    {%- set original_query_tag = get_current_query_tag() -%}
+    {%- do run_query("alter session set query_tag = '{}'".format(tojson(tag))) -%}
+    {{ return(original_query_tag) }}
+{%- endmacro %}
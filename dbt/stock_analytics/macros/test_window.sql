@@ -0,0 +1,15 @@
+-- Scopes a singular data test to what the last run changed: the incremental slice (changed_dates),
+-- plus the full history of securities re-adjusted for a split when id_column is given.
+-- context_days also admits that many earlier calendar days, for tests whose window functions
+-- look back (report rows with context_days=0, compute over the wider window).
+-- The weekly sweep passes test_scope='full', which checks every row.
+{% macro test_window(relation, column='trade_date', context_days=0, id_column=none) -%}
+    {%- if var('test_scope', 'changed') == 'full' -%}
+        1 = 1
+    {%- else -%}
+        ({{ incremental_window(column, lookback_days=7, extra_days=context_days, relation=relation) }}
+        {%- if id_column %}
+        OR {{ adjusted_securities(id_column) }}
+        {%- endif -%})
+    {%- endif -%}
+{%- endmacro %}
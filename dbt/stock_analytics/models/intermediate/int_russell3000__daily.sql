@@ -1,28 +1,41 @@
 -- Builds daily market data enriched with Russell 3000 attributes (incremental model).
+-- Keyed on the integer security_id so renamed tickers continue one series.
 
 {{ config(
     materialized = 'incremental',
-    unique_key = ['ticker', 'trade_date'],
+    unique_key = ['security_id', 'trade_date'],
+    cluster_by = ['security_id'],
     on_schema_change = 'fail'
 ) }}
 
 WITH russell_3000 AS (
-    -- Time-aware dimension: defines when a ticker is considered part of the Russell 3000
-    SELECT *
-    FROM {{ ref('stg_russell3000__constituents') }}
+    -- Time-aware dimension: defines when a security is considered part of the Russell 3000.
+    -- Constituent files list tickers, so each is resolved to the security holding that
+    -- ticker during the file's validity range (the latest holder if it changed hands)
+    SELECT
+        r.*,
+        m.security_id
+    FROM {{ ref('stg_russell3000__constituents') }} AS r
+    INNER JOIN {{ ref('stg_security_master') }} AS m
+        ON r.ticker = m.ticker
+        AND m.valid_from <= r.valid_to
+        AND m.valid_to >= r.valid_from
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY r.ticker, r.valid_from
+        ORDER BY m.valid_from DESC
+    ) = 1
 ),
 
 full_market AS (
-    -- Daily market fact data at ticker × trade_date grain
+    -- Daily market fact data at security × trade_date grain
     SELECT DISTINCT *  -- DISTINCT used defensively to guard against upstream duplication
     FROM {{ ref('stg_daily_stocks') }}
     {% if is_incremental() %}
-        -- On incremental runs, only reprocess recent days
-        -- Handles late data, corrections, and retries
-        WHERE trade_date >= (
-            SELECT DATEADD(day, -4, MAX(trade_date))
-            FROM {{ this }}
-        )
+        -- On incremental runs, only reprocess dates the ingestion ledger reported as
+        -- loaded or revised (falls back to the last 4 days without the changed_dates var),
+        -- plus the full history of securities re-adjusted for a split
+        WHERE {{ incremental_window('trade_date') }}
+           OR {{ adjusted_securities('security_id') }}
     {% endif %}
 ),
 
@@ -30,6 +43,7 @@ joined AS (
     -- Enrich daily prices with Russell 3000 attributes
     -- Join is point-in-time correct using valid_from / valid_to
     SELECT 
+        f.security_id,
         f.ticker,
         f.trade_date,
         f.volume,
@@ -47,19 +61,36 @@ joined AS (
         r.market_weight AS index_weight
     FROM full_market AS f
     INNER JOIN russell_3000 AS r
-        ON f.ticker = r.ticker
+        ON f.security_id = r.security_id
         AND f.trade_date BETWEEN r.valid_from AND r.valid_to
 ),
 
 {% if is_incremental() %}
--- Pull historical rows from the already-built table
--- This lets today’s rows look back at yesterday even when yesterday is NOT in the current incremental slice
-prev_day_close AS (
+-- A slice can be a single day, so LAG alone has no previous row on its first date.
+-- Each security's latest already-built row before its slice supplies the previous
+-- close (the prior session, not calendar day - 1: Mondays and post-holiday sessions)
+-- and the running day count
+slice_start AS (
+    SELECT
+        security_id,
+        MIN(trade_date) AS first_trade_date
+    FROM joined
+    GROUP BY security_id
+),
+
+prior_row AS (
     SELECT
-        ticker,
-        trade_date,
-        close AS prev_close
-    FROM {{ this }}  -- the existing INT_RUSSELL3000__DAILY table
+        t.security_id,
+        t.close AS prev_close,
+        t.consecutive_trading_days AS prev_consecutive_trading_days
+    FROM {{ this }} AS t  -- the existing INT_RUSSELL3000__DAILY table
+    INNER JOIN slice_start AS s
+        ON t.security_id = s.security_id
+        AND t.trade_date < s.first_trade_date
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY t.security_id
+        ORDER BY t.trade_date DESC
+    ) = 1
 ),
 {% endif %}
 
@@ -67,20 +98,23 @@ final AS (
     SELECT
         j.*,
 
-        -- Counts how many times this ticker has appeared since it last entered the index
-        -- Resets only if the ticker disappears and later reappears
+        -- Counts how many times this security has appeared since it last entered the index
+        -- Continues across ticker renames; resets only if the security disappears and reappears
+        {% if is_incremental() %}
+        COALESCE(p.prev_consecutive_trading_days, 0) +
+        {% endif %}
         ROW_NUMBER() OVER (
-            PARTITION BY j.ticker
+            PARTITION BY j.security_id
             ORDER BY j.trade_date
         ) AS consecutive_trading_days,
 
         {% if is_incremental() %}
         -- Get yesterday's close:
         -- 1) Use LAG if yesterday is in the current slice
-        -- 2) Otherwise fall back to the historical table
+        -- 2) Otherwise the latest earlier row in the built table
         COALESCE(
             LAG(j.close) OVER (
-                PARTITION BY j.ticker
+                PARTITION BY j.security_id
                 ORDER BY j.trade_date
             ),
             p.prev_close
@@ -89,18 +123,21 @@ final AS (
         -- On full builds, all history is present
         -- LAG alone is sufficient
         LAG(j.close) OVER (
-            PARTITION BY j.ticker
+            PARTITION BY j.security_id
             ORDER BY j.trade_date
         ) AS yesterday_close,
         {% endif %}
 
-        -- Flags the first day a ticker appears in the dataset
-        -- If there is no previous row for this ticker, it is new
+        -- Flags the first day a security appears in the dataset
+        -- If there is no previous row for this security, it is new (a rename is not)
         CASE 
-            WHEN LAG(j.ticker) OVER (
-                PARTITION BY j.ticker
+            WHEN LAG(j.security_id) OVER (
+                PARTITION BY j.security_id
                 ORDER BY j.trade_date
-            ) IS NULL 
+            ) IS NULL
+            {% if is_incremental() %}
+            AND p.security_id IS NULL
+            {% endif %}
             THEN 1 
             ELSE 0 
         END AS is_new_to_index
@@ -108,13 +145,9 @@ final AS (
     FROM joined AS j
 
     {% if is_incremental() %}
-    -- Join today's row to yesterday's row from history
-    -- Needed when yesterday is outside the incremental window
-    LEFT JOIN prev_day_close AS p
-        ON j.ticker = p.ticker
-       AND j.trade_date = DATEADD(day, 1, p.trade_date)
+    LEFT JOIN prior_row AS p
+        ON j.security_id = p.security_id
     {% endif %}
 )
 
 SELECT * FROM final
-
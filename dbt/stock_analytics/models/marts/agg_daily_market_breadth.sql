@@ -6,7 +6,7 @@
 WITH base_aggregates AS (
     SELECT 
         trade_date,
-        COUNT(DISTINCT ticker) AS stocks_traded,
+        COUNT(DISTINCT security_id) AS stocks_traded,
         SUM(IFF(close = yesterday_close OR yesterday_close IS NULL, 1, 0)) AS unchanged_stocks,
         SUM(IFF(close > yesterday_close AND yesterday_close IS NOT NULL, 1, 0)) AS advances,
         SUM(IFF(close < yesterday_close AND yesterday_close IS NOT NULL, 1, 0)) AS declines,
@@ -21,12 +21,12 @@ rolling_high_low AS (
         *,
         IFF(
             COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             ) >= 252,
             MAX(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             ),
@@ -34,12 +34,12 @@ rolling_high_low AS (
         ) AS high_52week,
         IFF(
             COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             ) >= 252,
             MIN(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             ),
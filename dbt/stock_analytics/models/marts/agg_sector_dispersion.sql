@@ -0,0 +1,13 @@
+-- Daily cross-sectional dispersion of log returns per sector, maintained by src/cross_asset.py.
+{{ config(
+    materialized = 'view'
+) }}
+
+SELECT
+    TRADE_DATE                      AS trade_date,
+    SECTOR                          AS sector,
+    MEMBERS                         AS members,
+    MEAN_RETURN                     AS mean_return,
+    DISPERSION                      AS dispersion,
+    COMPUTED_AT                     AS computed_at
+FROM {{ source('raw_market', 'SECTOR_DISPERSION') }}
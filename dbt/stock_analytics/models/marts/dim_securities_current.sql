@@ -4,6 +4,7 @@
 
 WITH latest_snapshot AS (
     SELECT
+        security_id,
         ticker,
         company,
         sector,
@@ -29,25 +30,38 @@ WITH latest_snapshot AS (
 
 returns_lookback AS (
     SELECT 
-        ticker,
+        security_id,
         {{ calculate_return(5) }}  AS return_1w,
         {{ calculate_return(21) }} AS return_1m,
         {{ calculate_return(63) }} AS return_3m,
         {{ calculate_return(252) }} AS return_ytd
     FROM {{ ref('fct_trading_momentum') }}
-    QUALIFY ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY trade_date DESC) = 1
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY security_id ORDER BY trade_date DESC) = 1
+),
+
+period_to_date AS (
+    -- Week- and month-to-date returns from each security's latest rollup bars
+    SELECT
+        w.security_id,
+        w.period_return AS return_wtd,
+        m.period_return AS return_mtd
+    FROM {{ ref('fct_bars_weekly') }} AS w
+    LEFT JOIN {{ ref('fct_bars_monthly') }} AS m
+        ON w.security_id = m.security_id
+        AND w.trade_date = m.trade_date
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY w.security_id ORDER BY w.period_start DESC) = 1
 ),
 
 numbered_dates AS (
     SELECT 
-        ticker,
+        security_id,
         sector,
         trade_date,
         close,
         yesterday_close,
         volume,
         ROW_NUMBER() OVER (
-            PARTITION BY ticker
+            PARTITION BY security_id
             ORDER BY trade_date DESC
         ) AS days_back
     FROM {{ ref('fct_trading_momentum') }}
@@ -59,7 +73,7 @@ numbered_dates AS (
 
 sector_lookback AS (
     SELECT 
-        ticker,
+        security_id,
         sector,
         trade_date,
         {{ calculate_return(21) }} AS return_1m
@@ -68,7 +82,7 @@ sector_lookback AS (
 
 sector_metrics AS (
     SELECT
-        ticker,
+        security_id,
         AVG(return_1m) OVER (PARTITION BY sector) AS sector_return_1m,
         CASE
             WHEN return_1m IS NOT NULL
@@ -79,31 +93,31 @@ sector_metrics AS (
             ELSE NULL
         END AS performance_percentile
     FROM sector_lookback
-    QUALIFY ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY trade_date DESC) = 1
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY security_id ORDER BY trade_date DESC) = 1
 ),
 
 volatility_metrics AS (
     SELECT
-        ticker,
+        security_id,
         STDDEV(LN(close / NULLIF(yesterday_close, 0))) * SQRT(252) AS volatility_20d,
         AVG(volume) AS avg_volume_20d,
         COUNT(*) AS trading_days
     FROM numbered_dates
     WHERE days_back <= 20
-    GROUP BY ticker
+    GROUP BY security_id
 ),
 
 trading_days_count AS (
     SELECT
-        ticker,
+        security_id,
         COUNT(DISTINCT trade_date) AS total_trading_days
     FROM {{ ref('fct_trading_momentum') }}
-    GROUP BY ticker
+    GROUP BY security_id
 ),
 
 signal_flags AS (
     SELECT
-        ticker,
+        security_id,
         CASE WHEN latest_sma50 > latest_sma200 THEN 1 ELSE 0 END AS has_golden_cross_active,
         CASE WHEN latest_close > latest_sma20 THEN 1 ELSE 0 END AS over_sma20,
         CASE WHEN latest_close > latest_sma50 THEN 1 ELSE 0 END AS over_sma50,
@@ -113,7 +127,7 @@ signal_flags AS (
 
 last_signals AS (
     SELECT 
-        ticker,
+        security_id,
 
         /* last golden cross date; fallback to first date where sma_200 exists */
         COALESCE(
@@ -150,7 +164,7 @@ last_signals AS (
         day, -365,
         (SELECT MAX(trade_date) FROM {{ ref('fct_trading_momentum') }})
     )
-    GROUP BY ticker
+    GROUP BY security_id
 ),
 
 final AS (
@@ -175,6 +189,8 @@ final AS (
         r.return_1m,
         r.return_3m,
         r.return_ytd,
+        ptd.return_wtd,
+        ptd.return_mtd,
 
         sm.sector_return_1m,
         sm.performance_percentile,
@@ -218,17 +234,20 @@ final AS (
 
     FROM latest_snapshot AS l
     LEFT JOIN returns_lookback AS r
-        ON l.ticker = r.ticker
+        ON l.security_id = r.security_id
     LEFT JOIN trading_days_count AS t_days
-        ON l.ticker = t_days.ticker
+        ON l.security_id = t_days.security_id
     LEFT JOIN volatility_metrics AS v
-        ON l.ticker = v.ticker
+        ON l.security_id = v.security_id
     LEFT JOIN signal_flags AS s
-        ON l.ticker = s.ticker
+        ON l.security_id = s.security_id
     LEFT JOIN last_signals AS ls
-        ON l.ticker = ls.ticker
+        ON l.security_id = ls.security_id
     LEFT JOIN sector_metrics AS sm
-        ON l.ticker = sm.ticker
+        ON l.security_id = sm.security_id
+    LEFT JOIN period_to_date AS ptd
+        ON l.security_id = ptd.security_id
+        AND l.latest_trade_date = ptd.trade_date
 )
 
 SELECT * FROM final
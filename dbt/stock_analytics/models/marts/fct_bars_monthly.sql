@@ -0,0 +1,9 @@
+-- Monthly OHLCV + VWAP bars per security on NYSE month boundaries, folded in from the daily bars.
+{{ config(
+    materialized = 'incremental',
+    unique_key = ['security_id', 'period_start'],
+    cluster_by = ['security_id'],
+    on_schema_change = 'fail'
+) }}
+
+{{ rollup_bars('month') }}
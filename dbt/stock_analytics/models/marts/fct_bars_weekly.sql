@@ -0,0 +1,9 @@
+-- Weekly (Monday-Sunday) OHLCV + VWAP bars per security on NYSE week boundaries, folded in from the daily bars.
+{{ config(
+    materialized = 'incremental',
+    unique_key = ['security_id', 'period_start'],
+    cluster_by = ['security_id'],
+    on_schema_change = 'fail'
+) }}
+
+{{ rollup_bars('week') }}
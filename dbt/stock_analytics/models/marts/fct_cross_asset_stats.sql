@@ -0,0 +1,21 @@
+-- Rolling correlations and betas to the Russell 3000, maintained incrementally by src/cross_asset.py.
+{{ config(
+    materialized = 'view'
+) }}
+
+SELECT
+    SECURITY_ID                     AS security_id,
+    TICKER                          AS ticker,
+    TRADE_DATE                      AS trade_date,
+    SECTOR                          AS sector,
+    LOG_RETURN                      AS log_return,
+    CORR_EW_60                      AS corr_ew_60,
+    BETA_EW_60                      AS beta_ew_60,
+    CORR_IW_60                      AS corr_iw_60,
+    BETA_IW_60                      AS beta_iw_60,
+    CORR_EW_120                     AS corr_ew_120,
+    BETA_EW_120                     AS beta_ew_120,
+    CORR_IW_120                     AS corr_iw_120,
+    BETA_IW_120                     AS beta_iw_120,
+    COMPUTED_AT                     AS computed_at
+FROM {{ source('raw_market', 'CROSS_ASSET_STATS') }}
@@ -1,13 +1,14 @@
 -- Computes trading momentum indicators (SMA, RSI, crosses, volatility signals) for Russell 3000 constituents.
 {{ config(
     materialized = 'incremental',
-    unique_key = ['ticker', 'trade_date'],
-    cluster_by = ['ticker'],
+    unique_key = ['security_id', 'trade_date'],
+    cluster_by = ['security_id'],
     on_schema_change = 'fail'
 ) }}
 
 WITH base_metrics AS (
     SELECT 
+        security_id,
         ticker,
         volume, 
         open,
@@ -22,45 +23,45 @@ WITH base_metrics AS (
         is_new_to_index,
         is_valid_record,
 
-        /* SMA-20 (NULL until 20 rows exist for ticker) */
+        /* SMA-20 (NULL until 20 rows exist for the security) */
         CASE
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 19 PRECEDING AND CURRENT ROW
             ) >= 20
             THEN AVG(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 19 PRECEDING AND CURRENT ROW
             )
             ELSE NULL
         END AS sma_20,
 
-        /* SMA-50 (NULL until 50 rows exist for ticker) */
+        /* SMA-50 (NULL until 50 rows exist for the security) */
         CASE
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 49 PRECEDING AND CURRENT ROW
             ) >= 50
             THEN AVG(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 49 PRECEDING AND CURRENT ROW
             )
             ELSE NULL
         END AS sma_50,
 
-        /* SMA-200 (NULL until 200 rows exist for ticker) */
+        /* SMA-200 (NULL until 200 rows exist for the security) */
         CASE
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 199 PRECEDING AND CURRENT ROW
             ) >= 200
             THEN AVG(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 199 PRECEDING AND CURRENT ROW
             )
@@ -70,12 +71,12 @@ WITH base_metrics AS (
         /* 52-week high/low (252 trading days) */
         CASE
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             ) >= 252
             THEN MAX(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             )
@@ -84,12 +85,12 @@ WITH base_metrics AS (
 
         CASE
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             ) >= 252
             THEN MIN(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 251 PRECEDING AND CURRENT ROW
             )
@@ -99,7 +100,7 @@ WITH base_metrics AS (
         /* Avg gain/loss (14-day RSI components) */
         CASE 
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 13 PRECEDING AND CURRENT ROW
             ) >= 14
@@ -110,7 +111,7 @@ WITH base_metrics AS (
                         ELSE 0
                     END
                 ) OVER (
-                    PARTITION BY ticker
+                    PARTITION BY security_id
                     ORDER BY trade_date
                     ROWS BETWEEN 13 PRECEDING AND CURRENT ROW
                 ) / 14
@@ -119,7 +120,7 @@ WITH base_metrics AS (
 
         CASE 
             WHEN COUNT(close) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 13 PRECEDING AND CURRENT ROW
             ) >= 14
@@ -130,7 +131,7 @@ WITH base_metrics AS (
                         ELSE 0
                     END
                 ) OVER (
-                    PARTITION BY ticker
+                    PARTITION BY security_id
                     ORDER BY trade_date
                     ROWS BETWEEN 13 PRECEDING AND CURRENT ROW
                 ) / 14
@@ -147,37 +148,37 @@ signal_flags AS (
         /* Price crosses above SMA-20 today */
         CASE 
             WHEN close > sma_20
-             AND LAG(close) OVER (PARTITION BY ticker ORDER BY trade_date)
-                 <= LAG(sma_20) OVER (PARTITION BY ticker ORDER BY trade_date)
+             AND LAG(close) OVER (PARTITION BY security_id ORDER BY trade_date)
+                 <= LAG(sma_20) OVER (PARTITION BY security_id ORDER BY trade_date)
             THEN 1 ELSE 0
         END AS bullish_crossover,
 
         /* SMA-50 crosses above SMA-200 today */
         CASE 
             WHEN sma_50 > sma_200
-             AND LAG(sma_50) OVER (PARTITION BY ticker ORDER BY trade_date)
-                 <= LAG(sma_200) OVER (PARTITION BY ticker ORDER BY trade_date)
+             AND LAG(sma_50) OVER (PARTITION BY security_id ORDER BY trade_date)
+                 <= LAG(sma_200) OVER (PARTITION BY security_id ORDER BY trade_date)
             THEN 1 ELSE 0
         END AS golden_cross,
 
         /* SMA-50 crosses below SMA-200 today */
         CASE
             WHEN sma_50 < sma_200
-             AND LAG(sma_50) OVER (PARTITION BY ticker ORDER BY trade_date)
-                 >= LAG(sma_200) OVER (PARTITION BY ticker ORDER BY trade_date)
+             AND LAG(sma_50) OVER (PARTITION BY security_id ORDER BY trade_date)
+                 >= LAG(sma_200) OVER (PARTITION BY security_id ORDER BY trade_date)
             THEN 1 ELSE 0
         END AS death_cross,
 
         /* Relative volume vs 20-day avg (NULL until 20 rows) */
         CASE 
             WHEN COUNT(volume) OVER (
-                PARTITION BY ticker
+                PARTITION BY security_id
                 ORDER BY trade_date
                 ROWS BETWEEN 19 PRECEDING AND CURRENT ROW
             ) >= 20
             THEN volume / (
                 AVG(volume) OVER (
-                    PARTITION BY ticker
+                    PARTITION BY security_id
                     ORDER BY trade_date
                     ROWS BETWEEN 19 PRECEDING AND CURRENT ROW
                 )
@@ -207,8 +208,10 @@ signal_flags AS (
 SELECT *
 FROM signal_flags
 {% if is_incremental() %}
-WHERE trade_date >= (
-    SELECT DATEADD(day, -4, MAX(trade_date)) FROM {{ this }}
+WHERE (
+    {{ incremental_window('trade_date') }}
+    -- Securities re-adjusted for a split are rewritten in full
+    OR {{ adjusted_securities('security_id') }}
 )
 AND is_valid_record = 1
 {% endif %}
@@ -0,0 +1,33 @@
+-- Cumulative adjustment factors per security as [valid_from, valid_to) trade-date ranges.
+-- A bar's adjusted price is its unadjusted price × the product of the factors of every later
+-- ex-date, so bars on or after a security's last ex-date have no row (factor 1).
+WITH per_ex_date AS (
+    -- Several actions can share an ex-date (e.g. a regular and a special dividend)
+    SELECT
+        security_id,
+        ex_date,
+        EXP(SUM(LN(split_factor)))      AS split_factor,
+        EXP(SUM(LN(dividend_factor)))   AS dividend_factor
+    FROM {{ ref('stg_corporate_actions') }}
+    GROUP BY security_id, ex_date
+)
+
+SELECT
+    security_id,
+    COALESCE(
+        LAG(ex_date) OVER (PARTITION BY security_id ORDER BY ex_date),
+        '1900-01-01'::DATE
+    ) AS valid_from,
+    ex_date AS valid_to,
+    -- Products over this and every later ex-date, as sums of logs
+    EXP(SUM(LN(split_factor)) OVER (
+        PARTITION BY security_id
+        ORDER BY ex_date DESC
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+    )) AS split_factor,
+    EXP(SUM(LN(split_factor * dividend_factor)) OVER (
+        PARTITION BY security_id
+        ORDER BY ex_date DESC
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+    )) AS total_return_factor
+FROM per_ex_date
@@ -0,0 +1,49 @@
+-- Splits and cash dividends with the price factor each applies to bars before its ex-date.
+-- Split factor = split_from / split_to (a 4-for-1 split scales earlier prices by 0.25).
+-- Dividend factor = 1 - cash / last unadjusted close before the ex-date (1 when that close is missing).
+WITH actions AS (
+    SELECT *
+    FROM {{ source('raw_market', 'CORPORATE_ACTIONS') }}
+    WHERE SECURITY_ID IS NOT NULL
+      AND EX_DATE IS NOT NULL
+),
+
+dividend_closes AS (
+    -- Reads the raw table directly: stg_daily_stocks itself depends on these factors
+    SELECT
+        a.ACTION_ID                 AS action_id,
+        d.C                         AS prev_close
+    FROM actions AS a
+    INNER JOIN {{ source('raw_market', 'DAILY_STOCKS') }} AS d
+        ON d.SECURITY_ID = a.SECURITY_ID
+        AND d.DATE < a.EX_DATE
+        AND d.DATE >= DATEADD(day, -10, a.EX_DATE)
+    WHERE a.ACTION_TYPE = 'DIVIDEND'
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY a.ACTION_ID ORDER BY d.DATE DESC) = 1
+)
+
+SELECT
+    a.ACTION_ID                     AS action_id,
+    a.SECURITY_ID                   AS security_id,
+    a.TICKER                        AS ticker,
+    a.ACTION_TYPE                   AS action_type,
+    a.EX_DATE                       AS ex_date,
+    a.SPLIT_FROM                    AS split_from,
+    a.SPLIT_TO                      AS split_to,
+    a.CASH_AMOUNT                   AS cash_amount,
+    a.DIVIDEND_TYPE                 AS dividend_type,
+    p.prev_close,
+    IFF(
+        a.ACTION_TYPE = 'SPLIT' AND a.SPLIT_FROM > 0 AND a.SPLIT_TO > 0,
+        a.SPLIT_FROM / a.SPLIT_TO,
+        1
+    ) AS split_factor,
+    IFF(
+        a.ACTION_TYPE = 'DIVIDEND' AND a.CASH_AMOUNT > 0 AND a.CASH_AMOUNT < p.prev_close,
+        1 - a.CASH_AMOUNT / p.prev_close,
+        1
+    ) AS dividend_factor,
+    a.LOADED_AT                     AS loaded_at
+FROM actions AS a
+LEFT JOIN dividend_closes AS p
+    ON a.ACTION_ID = p.action_id
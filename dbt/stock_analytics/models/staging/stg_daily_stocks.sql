@@ -1,26 +1,37 @@
 -- Standardizes raw Polygon daily stock data into staging format.
+-- New loads are validated at ingest (src/validation.py); the flags below still cover legacy rows.
+-- Bars are stored unadjusted; prices and volume are split-adjusted here from stg_adjustment_factors,
+-- so a split only adds a factor row (and its security's history is reprocessed downstream).
 SELECT 
-    T                               AS ticker,
-    CAST(V AS INTEGER)              AS volume,
-    VW                              AS volume_weighted_avg,
-    O                               AS open,
-    C                               AS close,
-    H                               AS high,
-    L                               AS low,
-    N                               AS num_transactions,
-    DATE                            AS trade_date,
-    INGESTED_AT                     AS ingested_at,
-    IFF(V > 0, 1, 0)                AS has_volume,
+    d.SECURITY_ID                   AS security_id,
+    d.T                             AS ticker,
+    CAST(d.V / COALESCE(f.split_factor, 1) AS INTEGER) AS volume,
+    d.VW * COALESCE(f.split_factor, 1) AS volume_weighted_avg,
+    d.O * COALESCE(f.split_factor, 1)  AS open,
+    d.C * COALESCE(f.split_factor, 1)  AS close,
+    d.H * COALESCE(f.split_factor, 1)  AS high,
+    d.L * COALESCE(f.split_factor, 1)  AS low,
+    d.N                             AS num_transactions,
+    d.DATE                          AS trade_date,
+    d.INGESTED_AT                   AS ingested_at,
+    COALESCE(f.split_factor, 1)     AS split_factor,
+    -- Multiply the split-adjusted close by this for a dividend-reinvested (total return) series
+    COALESCE(f.total_return_factor / f.split_factor, 1) AS dividend_factor,
+    d.C                             AS unadjusted_close,
+    IFF(d.V > 0, 1, 0)              AS has_volume,
     IFF(
-        O > 0
-        AND C > 0
-        AND H > 0
-        AND L > 0
-        AND C <= H
-        AND C >= L
-        AND L <= H,
+        d.O > 0
+        AND d.C > 0
+        AND d.H > 0
+        AND d.L > 0
+        AND d.C <= d.H
+        AND d.C >= d.L
+        AND d.L <= d.H,
         1, 0
     ) AS is_valid_record
-FROM {{ source('raw_market', 'DAILY_STOCKS') }}
-WHERE DATE IS NOT NULL
-
+FROM {{ source('raw_market', 'DAILY_STOCKS') }} AS d
+LEFT JOIN {{ ref('stg_adjustment_factors') }} AS f
+    ON d.SECURITY_ID = f.security_id
+    AND d.DATE >= f.valid_from
+    AND d.DATE < f.valid_to
+WHERE d.DATE IS NOT NULL
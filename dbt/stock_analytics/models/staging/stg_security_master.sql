@@ -0,0 +1,8 @@
+-- Effective-dated ticker/name history per security (one row per ticker per validity range).
+SELECT
+    SECURITY_ID                     AS security_id,
+    TICKER                          AS ticker,
+    NAME                            AS security_name,
+    VALID_FROM                      AS valid_from,
+    VALID_TO                        AS valid_to
+FROM {{ source('raw_market', 'SECURITY_MASTER') }}
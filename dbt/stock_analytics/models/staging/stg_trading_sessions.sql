@@ -0,0 +1,9 @@
+-- NYSE sessions with the first and last session of their week (Monday-Sunday) and calendar month.
+SELECT
+    SESSION_DATE                    AS session_date,
+    WEEK_FIRST_SESSION              AS week_first_session,
+    WEEK_LAST_SESSION               AS week_last_session,
+    MONTH_FIRST_SESSION             AS month_first_session,
+    MONTH_LAST_SESSION              AS month_last_session,
+    EARLY_CLOSE_MINUTES             AS early_close_minutes
+FROM {{ source('raw_market', 'TRADING_SESSIONS') }}
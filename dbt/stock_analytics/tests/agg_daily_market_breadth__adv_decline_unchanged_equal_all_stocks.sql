@@ -1,7 +1,7 @@
--- Checks for market breadth rows where component counts don't reconcile.
+-- Checks for market breadth rows where component counts don't reconcile (changed dates only; see test_window).
 SELECT 
     *
 FROM {{ ref('agg_daily_market_breadth') }}
 WHERE 
     (advances + declines + unchanged_stocks) != stocks_traded
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('agg_daily_market_breadth')) }}
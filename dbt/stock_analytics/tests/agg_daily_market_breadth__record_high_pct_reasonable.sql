@@ -1,7 +1,7 @@
--- Flags days where record-high percentage exceeds a realistic range.
+-- Flags days where record-high percentage exceeds a realistic range (changed dates only; see test_window).
 SELECT 
     *
 FROM {{ ref('agg_daily_market_breadth') }}
 WHERE 
     record_high_pct > 0.3    -- >30% of market hitting record highs is implausible
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('agg_daily_market_breadth')) }}
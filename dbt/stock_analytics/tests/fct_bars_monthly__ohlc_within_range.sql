@@ -0,0 +1,9 @@
+-- Flags monthly bars whose open/close fall outside high/low or whose period bounds are inverted (changed rows only; see test_window).
+SELECT *
+FROM {{ ref('fct_bars_monthly') }}
+WHERE
+    (high < low
+     OR open NOT BETWEEN low AND high
+     OR close NOT BETWEEN low AND high
+     OR trade_date NOT BETWEEN period_start AND period_end)
+    AND {{ test_window(ref('fct_bars_monthly'), id_column='security_id') }}
@@ -1,7 +1,7 @@
--- Flags rows where close price falls outside the 52-week range.
+-- Flags rows where close price falls outside the 52-week range (changed rows only; see test_window).
 SELECT 
     *
 FROM {{ ref('fct_trading_momentum') }}
 WHERE 
     (close > high_52week OR close < low_52week)
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('fct_trading_momentum'), id_column='security_id') }}
@@ -1,7 +1,7 @@
--- Flags rows where both golden_cross and death_cross are simultaneously true.
+-- Flags rows where both golden_cross and death_cross are simultaneously true (changed rows only).
 SELECT *
 FROM {{ ref('fct_trading_momentum') }}
 WHERE 
     golden_cross = 1 
     AND death_cross = 1
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('fct_trading_momentum'), id_column='security_id') }}
@@ -1,7 +1,7 @@
--- Flags rows where RSI falls outside the valid 0–100 range.
+-- Flags rows where RSI falls outside the valid 0–100 range (changed rows only; see test_window).
 SELECT *
 FROM {{ ref('fct_trading_momentum') }}
 WHERE 
     rsi IS NOT NULL 
     AND (rsi < 0 OR rsi > 100)
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('fct_trading_momentum'), id_column='security_id') }}
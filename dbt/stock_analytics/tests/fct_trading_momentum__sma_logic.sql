@@ -1,8 +1,8 @@
--- Flags rows where SMA indicators are inconsistently populated.
+-- Flags rows where SMA indicators are inconsistently populated (changed rows only; see test_window).
 SELECT *
 FROM {{ ref('fct_trading_momentum') }}
 WHERE 
     ((sma_200 IS NOT NULL AND sma_50 IS NULL)
      OR (sma_200 IS NOT NULL AND sma_20 IS NULL)
      OR (sma_50 IS NOT NULL AND sma_20 IS NULL))
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('fct_trading_momentum'), id_column='security_id') }}
@@ -1,12 +1,15 @@
 -- Flags rows where yesterday_close does not match the prior day's close.
+-- Only changed rows are checked; the LAG reads up to 10 earlier calendar days (weekends and
+-- holiday runs) so the first changed session still sees its predecessor.
 WITH agg AS (
     SELECT 
         *,
         LAG(close, 1) OVER (
-            PARTITION BY ticker
+            PARTITION BY security_id
             ORDER BY trade_date
         ) AS lag_close
     FROM {{ ref('fct_trading_momentum') }}
+    WHERE {{ test_window(ref('fct_trading_momentum'), context_days=10, id_column='security_id') }}
 )
 SELECT 
     *
@@ -14,4 +17,4 @@ FROM agg
 WHERE 
     yesterday_close IS NOT NULL
     AND yesterday_close != lag_close
-    AND trade_date >= DATEADD(day, -7, CURRENT_DATE())
+    AND {{ test_window(ref('fct_trading_momentum'), id_column='security_id') }}
@@ -0,0 +1,28 @@
+-- Flags changed rows whose carried-forward columns restart although an earlier row exists:
+-- NULL yesterday_close, is_new_to_index = 1, or consecutive_trading_days not counting on.
+-- The LAG reads up to 10 earlier calendar days so a one-day slice still sees its predecessor.
+WITH checked AS (
+    SELECT
+        *,
+        LAG(close) OVER (
+            PARTITION BY security_id
+            ORDER BY trade_date
+        ) AS lag_close,
+        LAG(consecutive_trading_days) OVER (
+            PARTITION BY security_id
+            ORDER BY trade_date
+        ) AS lag_consecutive_trading_days
+    FROM {{ ref('int_russell3000__daily') }}
+    WHERE {{ test_window(ref('int_russell3000__daily'), context_days=10, id_column='security_id') }}
+)
+SELECT
+    *
+FROM checked
+WHERE
+    lag_consecutive_trading_days IS NOT NULL
+    AND (
+        (yesterday_close IS NULL AND lag_close IS NOT NULL)
+        OR is_new_to_index = 1
+        OR consecutive_trading_days != lag_consecutive_trading_days + 1
+    )
+    AND {{ test_window(ref('int_russell3000__daily'), id_column='security_id') }}
@@ -0,0 +1,388 @@
+# src/backtest.py
+# Vectorized backtests of momentum signals over the whole universe as dates × tickers matrix operations.
+#
+# Usage:
+#   python -m src.backtest --start 2022-01-03 --end 2024-12-31 --entry golden_cross --exit death_cross
+#   python -m src.backtest --entry golden_cross bullish_crossover --hold-days 5 20 60 --rsi-max 70 --workers 8
+#   python -m src.backtest --tickers AAPL MSFT NVDA --entry bullish_crossover --output data/backtests/sweep.json
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+from src.config import MOMENTUM_STORE_DIR
+from src.instrumentation import incr, span
+
+# 0/1 flags of fct_trading_momentum usable as entry/exit signals
+SIGNALS = ("golden_cross", "death_cross", "bullish_crossover")
+
+# Entry filters: rule key -> (panel field, comparison)
+FILTERS = {
+    "rsi_min": ("rsi", np.greater_equal),
+    "rsi_max": ("rsi", np.less_equal),
+    "min_rel_vol": ("rel_vol", np.greater_equal),
+}
+
+PANEL_FIELDS = ["close", "rsi", "rel_vol", *SIGNALS]
+
+# Sessions after an entry at which forward returns are measured
+HORIZONS = (1, 5, 20, 60)
+PERCENTILES = (5, 25, 50, 75, 95)
+TRADING_DAYS_PER_YEAR = 252
+
+DEFAULT_RULE = {
+    "entry": "golden_cross",
+    "exit": "death_cross",
+    # Sessions a position is held after its latest entry signal (None = until exit)
+    "hold_days": 20,
+    "rsi_min": None,
+    "rsi_max": None,
+    "min_rel_vol": None,
+}
+
+# Context of a sweep worker process (see _init_worker)
+_worker_context = None
+
+
+def make_rule(**overrides):
+    """Return DEFAULT_RULE with `overrides` applied, validating signal names and keys."""
+    unknown = set(overrides) - set(DEFAULT_RULE)
+    if unknown:
+        raise ValueError(f"Unknown rule keys: {sorted(unknown)}")
+    rule = {**DEFAULT_RULE, **overrides}
+    if rule["entry"] not in SIGNALS:
+        raise ValueError(f"Unknown entry signal {rule['entry']!r}; expected one of {SIGNALS}")
+    if rule["exit"] is not None and rule["exit"] not in SIGNALS:
+        raise ValueError(f"Unknown exit signal {rule['exit']!r}; expected one of {SIGNALS}")
+    return rule
+
+
+def expand_grid(grid):
+    """
+    Every combination of a parameter grid as a list of rules.
+
+    Args:
+        grid (dict): Rule key -> list of values, e.g. {"hold_days": [5, 20], "rsi_max": [None, 70]}.
+
+    Returns:
+        list[dict]: One rule per combination, in itertools.product order.
+    """
+    keys = list(grid)
+    return [make_rule(**dict(zip(keys, values))) for values in itertools.product(*grid.values())]
+
+
+def load_panel(start, end, tickers=None, store_dir=MOMENTUM_STORE_DIR):
+    """
+    Momentum panel for a backtest.
+
+    Without `tickers` the whole universe is read from the local momentum store
+    (no Snowflake round trip); each security becomes one column labelled with
+    its latest ticker. With `tickers` the panel comes from get_panel.
+
+    fct_trading_momentum only has rows while a security is a Russell 3000
+    constituent, so a missing close doubles as point-in-time membership.
+
+    Returns:
+        src.panel.Panel
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from src.momentum_store import read_store
+    from src.panel import get_panel, pivot_panel
+
+    if tickers:
+        return get_panel(tickers, start, end, PANEL_FIELDS, source="momentum")
+
+    table = read_store(store_dir)
+    if table is None:
+        raise FileNotFoundError(f"No momentum store in {store_dir}; run `python -m src.momentum_store` first.")
+    days = table.column("trade_date")
+    table = table.filter(pc.and_(
+        pc.greater_equal(days, pa.scalar(date.fromisoformat(str(start)[:10]), type=days.type)),
+        pc.less_equal(days, pa.scalar(date.fromisoformat(str(end)[:10]), type=days.type)),
+    ))
+    if table.num_rows == 0:
+        raise ValueError(f"The momentum store has no rows between {start} and {end}.")
+
+    # Store rows are sorted by security_id, trade_date: the last row of each
+    # block carries the security's latest ticker
+    ids = table.column("security_id").to_numpy()
+    ends = np.append(np.flatnonzero(ids[1:] != ids[:-1]), len(ids) - 1)
+    latest = table.column("ticker").to_numpy(zero_copy_only=False)[ends]
+    # A reused ticker labels its newest security; older holders get ".<security_id>"
+    labels, seen = [], set()
+    for ticker, security_id in zip(latest[::-1], ids[ends][::-1]):
+        labels.append(f"{ticker}.{security_id}" if ticker in seen else ticker)
+        seen.add(ticker)
+    labels = labels[::-1]
+
+    row_labels = np.asarray(labels, dtype=object)[np.searchsorted(ends, np.arange(len(ids)))]
+    table = pa.table(
+        [pa.array(row_labels, type=pa.string()), table.column("trade_date")]
+        + [table.column(field).cast(pa.float64()) for field in PANEL_FIELDS],
+        names=["ticker", "trade_date", *PANEL_FIELDS],
+    )
+    return pivot_panel(table, labels, PANEL_FIELDS)
+
+
+def prepare(panel):
+    """
+    Precompute the rule-independent matrices of a panel.
+
+    Args:
+        panel (src.panel.Panel): dates × tickers panel with PANEL_FIELDS.
+
+    Returns:
+        dict: dates, close, in_universe, returns (0 where either close is
+        missing), log_wealth (cumulative log returns), one bool matrix per
+        signal, the filter fields, and the equal-weight universe returns.
+    """
+    with span("backtest.prepare", dates=panel.shape[0], tickers=panel.shape[1]):
+        close = np.asarray(panel["close"], dtype=np.float64)
+        in_universe = ~np.isnan(close)
+        returns = np.zeros_like(close)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = close[1:] / close[:-1] - 1.0
+        returns[~np.isfinite(returns)] = 0.0
+
+        context = {
+            "dates": np.asarray(panel.dates),
+            "close": close,
+            "in_universe": in_universe,
+            "returns": returns,
+            "log_wealth": np.cumsum(np.log1p(returns), axis=0),
+            "universe_returns": _portfolio_returns(in_universe, returns),
+        }
+        for signal in SIGNALS:
+            context[signal] = np.asarray(panel[signal]) == 1
+        for field in {field for field, _ in FILTERS.values()}:
+            context[field] = np.asarray(panel[field], dtype=np.float64)
+    return context
+
+
+def _portfolio_returns(held, returns):
+    """Equal-weight returns of the positions held at each close, earned over the next session."""
+    counts = held.sum(axis=1)
+    portfolio = np.zeros(len(held))
+    with np.errstate(invalid="ignore"):
+        portfolio[1:] = (held[:-1] * returns[1:]).sum(axis=1) / counts[:-1]
+    portfolio[~np.isfinite(portfolio)] = 0.0
+    return portfolio
+
+
+def positions(context, rule):
+    """
+    Entry events and held positions of a rule.
+
+    A position opens at the close of an entry signal and is held while the
+    security stays in the universe, no exit signal fires, and fewer than
+    `hold_days` sessions have passed since the latest entry signal (a repeat
+    signal restarts the holding period). Everything is computed with running
+    maxima along the date axis, so no ticker is visited individually.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (entries, held) bool dates × tickers matrices.
+    """
+    in_universe = context["in_universe"]
+    entries = context[rule["entry"]] & in_universe
+    for key, (field, compare) in FILTERS.items():
+        if rule[key] is not None:
+            with np.errstate(invalid="ignore"):
+                entries &= compare(context[field], rule[key])
+
+    exits = ~in_universe
+    if rule["exit"] is not None:
+        exits = exits | context[rule["exit"]]
+
+    day = np.arange(len(in_universe))[:, None]
+    last_entry = np.maximum.accumulate(np.where(entries, day, -1), axis=0)
+    last_exit = np.maximum.accumulate(np.where(exits, day, -1), axis=0)
+    held = (last_entry >= 0) & (last_exit < last_entry)
+    if rule["hold_days"] is not None:
+        held &= day - last_entry < rule["hold_days"]
+    return entries, held
+
+
+def _distribution(values):
+    if len(values) == 0:
+        return {"count": 0, "hit_rate": None, "mean": None, "percentiles": None}
+    return {
+        "count": int(len(values)),
+        "hit_rate": round(float((values > 0).mean()), 4),
+        "mean": round(float(values.mean()), 6),
+        "percentiles": {
+            f"p{p}": round(float(v), 6) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+    }
+
+
+def _trade_returns(held, log_wealth):
+    """Return of every holding stretch, marked to the last close for positions still open."""
+    n_dates = len(held)
+    edge = np.zeros((1, held.shape[1]), dtype=bool)
+    opened = held & ~np.vstack([edge, held[:-1]])
+    closed = held & ~np.vstack([held[1:], edge])
+    # Transposed nonzero orders stretches by ticker then date, so opens and closes pair up
+    open_ticker, open_day = np.nonzero(opened.T)
+    _, close_day = np.nonzero(closed.T)
+    # A position held at close d earns the return of session d + 1
+    realized_to = np.minimum(close_day + 1, n_dates - 1)
+    return np.expm1(log_wealth[realized_to, open_ticker] - log_wealth[open_day, open_ticker])
+
+
+def evaluate(context, rule):
+    """
+    Backtest one rule against a prepared panel.
+
+    Args:
+        context (dict): Output of prepare().
+        rule (dict): Output of make_rule().
+
+    Returns:
+        dict: rule, equity curve, summary statistics (return, Sharpe, drawdown,
+        exposure, trade hit rate, excess return over the equal-weight
+        universe) and forward-return distributions of the entry signals.
+    """
+    close = context["close"]
+    entries, held = positions(context, rule)
+
+    daily = _portfolio_returns(held, context["returns"])
+    equity = np.cumprod(1.0 + daily)
+    universe_equity = np.cumprod(1.0 + context["universe_returns"])
+    volatility = daily[1:].std()
+    trades = _trade_returns(held, context["log_wealth"])
+
+    entry_day, entry_ticker = np.nonzero(entries)
+    forward = {}
+    for horizon in HORIZONS:
+        inside = entry_day + horizon < len(close)
+        day, ticker = entry_day[inside], entry_ticker[inside]
+        # Securities without a close `horizon` sessions later (left the index) are excluded
+        values = close[day + horizon, ticker] / close[day, ticker] - 1.0
+        forward[horizon] = _distribution(values[np.isfinite(values)])
+
+    return {
+        "rule": rule,
+        "equity": equity,
+        "summary": {
+            "total_return": round(float(equity[-1] - 1.0), 6) if len(equity) else 0.0,
+            "excess_return": round(float(equity[-1] - universe_equity[-1]), 6) if len(equity) else 0.0,
+            "sharpe": round(float(daily[1:].mean() / volatility * np.sqrt(TRADING_DAYS_PER_YEAR)), 4)
+            if volatility > 0 else 0.0,
+            "max_drawdown": round(float((equity / np.maximum.accumulate(equity) - 1.0).min()), 6)
+            if len(equity) else 0.0,
+            "exposure": round(float((held.sum(axis=1) > 0).mean()), 4) if len(held) else 0.0,
+            "signals": int(entries.sum()),
+            "trades": _distribution(trades),
+        },
+        "forward_returns": forward,
+    }
+
+
+def run_backtest(panel, rule=None):
+    """Backtest a single rule (default DEFAULT_RULE) over a panel."""
+    return evaluate(prepare(panel), rule or make_rule())
+
+
+def _init_worker(context_dir):
+    global _worker_context
+    # Memory-mapped, so every worker shares one copy of the matrices in the page cache
+    _worker_context = {
+        name[:-len(".npy")]: np.load(os.path.join(context_dir, name), mmap_mode="r")
+        for name in os.listdir(context_dir)
+    }
+
+
+def _evaluate_in_worker(rule):
+    return evaluate(_worker_context, rule)
+
+
+def sweep(panel, rules, workers=None):
+    """
+    Backtest many rules over the same panel, spread across processes.
+
+    The rule-independent matrices are computed once and written as .npy files
+    that every worker memory-maps, so only rules and results cross process
+    boundaries.
+
+    Args:
+        panel (src.panel.Panel): Momentum panel (see load_panel).
+        rules (list[dict]): Rules to evaluate, e.g. from expand_grid().
+        workers (int | None): Processes (default one per core; 1 runs in-process).
+
+    Returns:
+        list[dict]: evaluate() results in the order of `rules`.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(rules)) or 1
+    context = prepare(panel)
+    with span("backtest.sweep", rules=len(rules), workers=workers):
+        if workers == 1:
+            results = [evaluate(context, rule) for rule in rules]
+        else:
+            with tempfile.TemporaryDirectory(prefix="backtest_") as context_dir:
+                for name, matrix in context.items():
+                    np.save(os.path.join(context_dir, f"{name}.npy"), matrix)
+                with ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_worker, initargs=(context_dir,)
+                ) as pool:
+                    results = list(pool.map(_evaluate_in_worker, rules))
+    incr("backtest_rules_evaluated", len(rules))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest momentum signals over the universe")
+    parser.add_argument("--start", default="1970-01-01", help="YYYY-MM-DD")
+    parser.add_argument("--end", default="3000-01-01", help="YYYY-MM-DD")
+    parser.add_argument("--tickers", nargs="+", help="Restrict to these tickers (default: whole momentum store)")
+    parser.add_argument("--entry", nargs="+", default=[DEFAULT_RULE["entry"]], choices=SIGNALS)
+    parser.add_argument("--exit", nargs="+", default=[DEFAULT_RULE["exit"]], choices=[*SIGNALS, "none"])
+    parser.add_argument("--hold-days", nargs="+", type=int, default=[DEFAULT_RULE["hold_days"]],
+                        help="0 = hold until the exit signal")
+    parser.add_argument("--rsi-min", nargs="+", type=float)
+    parser.add_argument("--rsi-max", nargs="+", type=float)
+    parser.add_argument("--min-rel-vol", nargs="+", type=float)
+    parser.add_argument("--workers", type=int, help="Processes for the sweep (default: one per core)")
+    parser.add_argument("--output", help="Write summaries and equity curves as JSON")
+    args = parser.parse_args(argv)
+
+    rules = expand_grid({
+        "entry": args.entry,
+        "exit": [None if e == "none" else e for e in args.exit],
+        "hold_days": [h or None for h in args.hold_days],
+        "rsi_min": args.rsi_min or [None],
+        "rsi_max": args.rsi_max or [None],
+        "min_rel_vol": args.min_rel_vol or [None],
+    })
+    panel = load_panel(args.start, args.end, args.tickers)
+    print(f"Backtesting {len(rules)} rules over {panel.shape[0]} sessions × {panel.shape[1]} tickers.")
+    results = sweep(panel, rules, args.workers)
+
+    for r in sorted(results, key=lambda r: r["summary"]["sharpe"], reverse=True):
+        s, rule = r["summary"], r["rule"]
+        filters = " ".join(f"{k}={rule[k]}" for k in FILTERS if rule[k] is not None)
+        print(
+            f"{rule['entry']:<18} exit={str(rule['exit']):<13} hold={str(rule['hold_days']):<5} {filters:<28} "
+            f"return {s['total_return']:+.1%}  sharpe {s['sharpe']:>6.2f}  maxdd {s['max_drawdown']:.1%}  "
+            f"trades {s['trades']['count']:>6}  hit {s['trades']['hit_rate'] or 0:.1%}"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        dates = [str(d) for d in panel.dates]
+        with open(args.output, "w") as f:
+            json.dump(
+                [{**r, "dates": dates, "equity": np.round(r["equity"], 6).tolist()} for r in results], f, indent=2
+            )
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+# src/bulk_import.py
+# Bulk importer for Polygon day-aggregate flat files: parallel parse -> partitioned Parquet -> COPY INTO.
+#
+# Usage:
+#   python -m src.bulk_import /data/flatfiles/us_stocks_sip/day_aggs_v1 --start 2016-01-01 --end 2023-12-31
+#   python -m src.bulk_import /data/flatfiles --workers 4 --out-dir /tmp/bulk_import
+#   python -m src.bulk_import /data/flatfiles --start 2016-01-01 --replace
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pendulum
+from src.config import BULK_IMPORT_DIR, BULK_IMPORT_WORKERS, INGESTION_LEDGER_DB
+from src.ingestion_ledger import open_ledger, sync_ledger
+from src.instrumentation import finish_run, incr, span, start_run
+from src.security_master import open_security_master, sync_security_master
+
+# Flat-file column -> grouped daily REST field, so both paths share normalize_grouped_daily
+FLAT_FILE_COLUMNS = {
+    "ticker": "T",
+    "volume": "v",
+    "open": "o",
+    "close": "c",
+    "high": "h",
+    "low": "l",
+    "window_start": "t",
+    "transactions": "n",
+}
+
+FLAT_FILE_SUFFIX = ".csv.gz"
+
+
+def discover_flat_files(root, start=None, end=None):
+    """
+    Find day-aggregate files under `root` (Polygon layout: YYYY/MM/YYYY-MM-DD.csv.gz).
+
+    Returns:
+        list[tuple[str, Path]]: (date, path) pairs sorted by date, limited to start..end.
+    """
+    files = []
+    for path in Path(root).rglob(f"*{FLAT_FILE_SUFFIX}"):
+        date_str = path.name[:-len(FLAT_FILE_SUFFIX)]
+        if (start and date_str < str(start)) or (end and date_str > str(end)):
+            continue
+        files.append((date_str, path))
+    return sorted(files)
+
+
+def read_flat_file(path):
+    """Parse one gzip CSV into the column names of the grouped daily REST payload."""
+    import pandas as pd
+
+    df = pd.read_csv(
+        path,
+        engine="pyarrow",
+        dtype={"ticker": str},
+        # Tickers such as "NA" and "NAN" must not become nulls
+        keep_default_na=False,
+        na_values=[""],
+    )
+    df = df.rename(columns=FLAT_FILE_COLUMNS)
+    # window_start is nanoseconds; the REST "t" field is milliseconds
+    df["t"] = df["t"] // 1_000_000
+    # Day aggregates carry no VWAP; the column stays null
+    df["vw"] = float("nan")
+    return df
+
+
+def _partition_dir(out_dir, table_name, date_str):
+    return Path(out_dir) / table_name / f"year={date_str[:4]}"
+
+
+def _write_parquet(df, path):
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    # Snowflake reads microsecond timestamps; nanosecond Parquet columns load as numbers
+    df.to_parquet(tmp_path, index=False, coerce_timestamps="us", allow_truncated_timestamps=True)
+    os.replace(tmp_path, path)
+
+
+def convert_file(task):
+    """
+    Worker: normalize, validate and write one session as Parquet.
+
+    Runs in a child process, so it takes and returns plain picklable values and
+    reports failures in the result instead of raising.
+
+    Args:
+        task (tuple): (date_str, flat file path, output directory, run_id).
+
+    Returns:
+        dict: date, rows, tickers, symbols (distinct clean tickers),
+        rows_quarantined, validation_counts, and error (None on success).
+    """
+    import pandas as pd
+    from src.load import normalize_grouped_daily
+    from src.validation import validate_batch
+
+    date_str, path, out_dir, run_id = task
+    result = {"date": date_str, "rows": 0, "tickers": 0, "symbols": [], "rows_quarantined": 0,
+              "validation_counts": None, "error": None}
+    try:
+        raw = read_flat_file(path)
+        result["tickers"] = int(raw["T"].nunique())
+        df = normalize_grouped_daily(raw, date_str)
+        df, quarantined, validation_counts = validate_batch(df)
+
+        # Typed DATE column so COPY INTO needs no string cast
+        day = pendulum.parse(date_str).date()
+        df["DATE"] = day
+        _write_parquet(df, _partition_dir(out_dir, "DAILY_STOCKS", date_str) / f"{date_str}.parquet")
+        if not quarantined.empty:
+            quarantined["DATE"] = day
+            quarantined["RUN_ID"] = run_id
+            _write_parquet(
+                quarantined,
+                _partition_dir(out_dir, "DAILY_STOCKS_QUARANTINE", date_str) / f"{date_str}.parquet",
+            )
+        result.update(rows=len(df), symbols=df["T"].unique().tolist(),
+                      rows_quarantined=len(quarantined), validation_counts=validation_counts)
+    except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _load_partition(client, out_dir, year, results, run_id, ledger, master, replace=False):
+    """COPY one year of converted sessions and checkpoint every date in it."""
+    converted = [r for r in results if r["error"] is None]
+    failed = [r for r in results if r["error"] is not None]
+
+    if converted:
+        # Register new listings in date order (workers cannot share the master),
+        # then key the loaded rows with one set-based UPDATE
+        for r in converted:
+            master.assign(r["symbols"], r["date"])
+        sync_security_master(client, master)
+        try:
+            with span("bulk.load", year=year, dates=len(converted)):
+                if replace:
+                    # Reloads drop the dates' existing rows so COPY does not duplicate them
+                    dates = [r["date"] for r in converted]
+                    client.delete_dates("DAILY_STOCKS", dates)
+                    client.delete_dates("DAILY_STOCKS_QUARANTINE", dates)
+                client.bulk_load_parquet(
+                    "DAILY_STOCKS",
+                    _partition_dir(out_dir, "DAILY_STOCKS", year),
+                    f"DAILY_STOCKS/year={year}",
+                    [f"{r['date']}.parquet" for r in converted],
+                )
+                quarantined = [r for r in converted if r["rows_quarantined"]]
+                if quarantined:
+                    client.bulk_load_parquet(
+                        "DAILY_STOCKS_QUARANTINE",
+                        _partition_dir(out_dir, "DAILY_STOCKS_QUARANTINE", year),
+                        f"DAILY_STOCKS_QUARANTINE/year={year}",
+                        [f"{r['date']}.parquet" for r in quarantined],
+                    )
+                client.assign_security_ids(
+                    start=converted[0]["date"], end=converted[-1]["date"], missing_only=True
+                )
+        except Exception as e:
+            # One failed COPY fails the whole partition; its dates stay outstanding
+            print(f"Bulk load failed for {year}: {e}")
+            if replace:
+                print(f"Rerun with --replace to reload {year}; its old rows may already be deleted.")
+            for r in converted:
+                r["error"] = f"COPY INTO failed: {e}"
+            failed, converted = failed + converted, []
+
+    entries = [
+        {
+            "api_date": pendulum.parse(r["date"]),
+            "status": "completed",
+            "total_tickers": r["tickers"],
+            "rows_inserted": r["rows"],
+            "rows_quarantined": r["rows_quarantined"],
+            "validation_counts": r["validation_counts"],
+        }
+        for r in converted
+    ] + [
+        {
+            "api_date": pendulum.parse(r["date"]),
+            "status": "failed",
+            "total_tickers": r["tickers"],
+            "error_message": r["error"],
+        }
+        for r in failed
+    ]
+    client.record_checkpoints(run_id, entries)
+
+    for r in converted:
+        # No payload hash: the flat file has no VWAP, so its hash would never
+        # match the REST payload. The first REST re-check adopts a hash instead.
+        ledger.record_load(r["date"], None, r["rows"], run_id)
+    for r in failed:
+        print(f"Failed to import {r['date']}: {r['error']}")
+
+    incr("dates_processed", len(results))
+    incr("dates_failed", len(failed))
+    return sum(r["rows"] for r in converted)
+
+
+def import_flat_files(root, start=None, end=None, workers=None, client=None,
+                      out_dir=BULK_IMPORT_DIR, ledger_path=INGESTION_LEDGER_DB, run_id=None,
+                      replace=False):
+    """
+    Import every outstanding session under `root` into DAILY_STOCKS.
+
+    Files are parsed across `workers` processes in date order; each calendar
+    year is bulk loaded as soon as its last session is converted, so uploads
+    overlap with parsing of the next year.
+
+    With `replace`, dates already in the ledger are imported too: their
+    DAILY_STOCKS and quarantine rows are deleted before the COPY and the
+    ledger re-records them, so dbt reprocesses them on the next run.
+
+    Args:
+        root (str | Path): Flat-file directory.
+        start (str | None): First date to import (YYYY-MM-DD).
+        end (str | None): Last date to import (YYYY-MM-DD).
+        workers (int | None): Parser processes (default BULK_IMPORT_WORKERS, else one per core).
+        client: SnowflakeClient or stand-in (default: a new ingestion client).
+        out_dir (str | Path): Root of the partitioned Parquet output.
+        ledger_path (str | Path): Ingestion ledger file.
+        run_id (str | None): Pipeline execution identifier.
+        replace (bool): Reload dates that are already loaded instead of skipping them.
+
+    Returns:
+        dict: dates, rows, failed dates and dates now pending for dbt.
+    """
+    run_id = run_id or pendulum.now().strftime("bulk_%Y%m%d_%H%M%S")
+    workers = workers or BULK_IMPORT_WORKERS or os.cpu_count() or 1
+    owns_client = client is None
+    if owns_client:
+        from src.snowflake_client import SnowflakeClient
+
+        client = SnowflakeClient(component="ingestion", stage="bulk_import")
+
+    start_run(run_id)
+    ledger = open_ledger(client, ledger_path)
+    master = open_security_master(client)
+    try:
+        completed = ledger.completed_dates()
+        files = [(d, p) for d, p in discover_flat_files(root, start, end)
+                 if replace or d not in completed]
+        print(f"Bulk import {run_id}: {len(files)} sessions to import with {workers} workers "
+              f"({len(completed)} already loaded{', replacing them' if replace else ''}).")
+
+        rows, failed = 0, []
+        tasks = [(d, str(p), str(out_dir), run_id) for d, p in files]
+        with span("bulk.import", dates=len(tasks), workers=workers), \
+                ProcessPoolExecutor(max_workers=workers) as pool:
+            year, batch = None, []
+            for result in pool.map(convert_file, tasks, chunksize=4):
+                if year is not None and result["date"][:4] != year:
+                    rows += _load_partition(client, out_dir, year, batch, run_id, ledger, master, replace)
+                    failed += [r["date"] for r in batch if r["error"]]
+                    batch = []
+                year = result["date"][:4]
+                batch.append(result)
+            if batch:
+                rows += _load_partition(client, out_dir, year, batch, run_id, ledger, master, replace)
+                failed += [r["date"] for r in batch if r["error"]]
+
+        sync_ledger(client, ledger)
+        pending = ledger.pending_dates()
+    finally:
+        ledger.close()
+        finish_run()
+        if owns_client:
+            client.close()
+
+    print(f"Imported {rows} rows for {len(files) - len(failed)} sessions; {len(failed)} failed.")
+    return {"dates": len(files), "rows": rows, "failed": failed, "changed_dates": pending}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import Polygon day-aggregate flat files")
+    parser.add_argument("root", help="Directory of YYYY-MM-DD.csv.gz files (searched recursively)")
+    parser.add_argument("--start", help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: one per core)")
+    parser.add_argument("--out-dir", default=str(BULK_IMPORT_DIR), help="Partitioned Parquet output")
+    parser.add_argument("--replace", action="store_true",
+                        help="Reload dates that are already loaded (deletes their rows first)")
+    args = parser.parse_args(argv)
+
+    summary = import_flat_files(args.root, args.start, args.end, args.workers,
+                                out_dir=args.out_dir, replace=args.replace)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
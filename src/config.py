@@ -1,37 +1,306 @@
 # src/config.py
 # Centralized configuration loader for local execution and Airflow deployments.
-from dotenv import load_dotenv
+#
+# Settings are grouped (polygon, snowflake, pipeline) and resolved lazily: the
+# first access to a group resolves all of its keys (one PIPELINE_CONFIG
+# Variable read, per-key Variables only for uncovered keys) and caches them
+# for the process. The legacy module-level names (SNOWFLAKE,
+# POLYGON_API_KEY, METRICS_DIR, ...) still work and resolve only their group.
+import json
 import os
+import threading
+import time
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 
-# Detect whether the code is running inside Airflow; fallback to .env locally.
-try:
+from dotenv import load_dotenv
+
+# Repository root
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Optional JSON Variable holding any of the keys below in a single value
+PIPELINE_CONFIG_VARIABLE = "PIPELINE_CONFIG"
+
+# Seconds a resolved group stays cached (0 = for the life of the process).
+# Read from the environment only, since it governs the lookups themselves.
+CONFIG_TTL_SECONDS = float(os.getenv("CONFIG_TTL_SECONDS", "0"))
+
+_TRUE_VALUES = ("1", "true", "yes")
+
+
+def _detect_airflow():
+    """Detect whether the code is running inside Airflow; fallback to .env locally."""
+    try:
+        from airflow.models import Variable  # noqa: F401
+        return True
+    except ImportError:
+        load_dotenv()
+        return False
+
+
+IS_AIRFLOW = _detect_airflow()
+
+
+def _flag(value):
+    return str(value).lower() in _TRUE_VALUES
+
+
+def _setting(key, default=None, cast=None):
+    """Declare a settings field backed by config key `key`."""
+    return field(default=None, metadata={"key": key, "default": default, "cast": cast})
+
+
+@dataclass(frozen=True)
+class PolygonSettings:
+    """Polygon REST and websocket settings."""
+
+    api_key: str = _setting("POLYGON_API_KEY")
+    api_base_url: str = _setting("API_BASE_URL")
+    ws_url: str = _setting("POLYGON_WS_URL", "wss://socket.polygon.io/stocks")
+    # "A.*" = per-second aggregates for every symbol, "AM.*" = per-minute
+    stream_subscription: str = _setting("STREAM_SUBSCRIPTION", "A.*")
+    stream_flush_seconds: float = _setting("STREAM_FLUSH_SECONDS", "5", float)
+    # Plan request limit shared by every worker (0 = unlimited; see src/rate_limiter.py)
+    requests_per_minute: float = _setting("POLYGON_REQUESTS_PER_MINUTE", "5", float)
+    rate_burst: int = _setting("POLYGON_RATE_BURST", "1", int)
+    # Redis holding the shared token bucket; unset = file-locked bucket on this host
+    rate_limiter_redis_url: str = _setting("RATE_LIMITER_REDIS_URL")
+
+
+@dataclass(frozen=True)
+class SnowflakeSettings:
+    """Snowflake connection settings and the schema dbt materializes the marts in."""
+
+    account: str = _setting("SNOWFLAKE_ACCOUNT")
+    user: str = _setting("SNOWFLAKE_USER")
+    role: str = _setting("SNOWFLAKE_ROLE")
+    warehouse: str = _setting("SNOWFLAKE_WAREHOUSE")
+    database: str = _setting("SNOWFLAKE_DATABASE")
+    schema: str = _setting("SNOWFLAKE_SCHEMA")
+    private_key_path: str = _setting("PRIVATE_KEY_PATH")
+    # See generate_schema_name macro
+    marts_schema: str = _setting("MARTS_SCHEMA", "RAW_MARTS")
+    # Per-stage warehouse/size/auto-suspend overrides as JSON (see src/workload_profiles.py)
+    warehouse_profiles: dict = _setting("SNOWFLAKE_WAREHOUSE_PROFILES", "{}", json.loads)
+    # Create missing profile warehouses and apply their AUTO_SUSPEND before first use
+    manage_warehouses: bool = _setting("SNOWFLAKE_MANAGE_WAREHOUSES", "false", _flag)
+
+    def connection_dict(self):
+        """The legacy SNOWFLAKE dict."""
+        return {
+            "account": self.account,
+            "user": self.user,
+            "role": self.role,
+            "warehouse": self.warehouse,
+            "database": self.database,
+            "schema": self.schema,
+            "private_key_path": self.private_key_path,
+        }
+
+
+@dataclass(frozen=True)
+class PipelineSettings:
+    """Local paths, instrumentation switches and ingestion/dbt tuning."""
+
+    # Local directory holding the memory-mapped momentum store shared with Streamlit
+    momentum_store_dir: Path = _setting(
+        "MOMENTUM_STORE_DIR", str(PROJECT_ROOT / "data" / "momentum_store"), Path)
+    # Versioned Parquet/Feather snapshots of the marts served by the dashboard
+    dashboard_bundle_dir: Path = _setting(
+        "DASHBOARD_BUNDLE_DIR", str(PROJECT_ROOT / "data" / "dashboard_bundle"), Path)
+    # Per-stage timing/counter instrumentation (see src/instrumentation.py)
+    metrics_enabled: bool = _setting("PIPELINE_METRICS_ENABLED", "false", _flag)
+    metrics_dir: Path = _setting("PIPELINE_METRICS_DIR", str(PROJECT_ROOT / "data" / "metrics"), Path)
+    # Opt-in CPU/memory profiling of ingestion runs (see src/profiling.py)
+    profile_enabled: bool = _setting("PIPELINE_PROFILE", "false", _flag)
+    profile_dir: Path = _setting("PIPELINE_PROFILE_DIR", str(PROJECT_ROOT / "data" / "profiles"), Path)
+    # dbt run_results telemetry (see src/dbt_telemetry.py)
+    dbt_target_dir: Path = _setting(
+        "DBT_TARGET_DIR", str(PROJECT_ROOT / "dbt" / "stock_analytics" / "target"), Path)
+    # "snowflake" writes ADMIN.DBT_MODEL_RUNS; "sqlite" keeps a local stand-in store
+    dbt_telemetry_store: str = _setting("DBT_TELEMETRY_STORE", "snowflake", str.lower)
+    dbt_telemetry_db: Path = _setting(
+        "DBT_TELEMETRY_DB", str(PROJECT_ROOT / "data" / "telemetry" / "dbt_model_runs.sqlite"), Path)
+    # Flag a model whose runtime exceeds its recent median by more than this fraction
+    dbt_regression_threshold: float = _setting("DBT_REGRESSION_THRESHOLD", "0.5", float)
+    # Local ingestion ledger mirrored to ADMIN.INGESTION_LEDGER (see src/ingestion_ledger.py)
+    ingestion_ledger_db: Path = _setting(
+        "INGESTION_LEDGER_DB", str(PROJECT_ROOT / "data" / "ledger" / "ingestion_ledger.sqlite"), Path)
+    # Trailing trading days re-fetched each run to detect Polygon revisions (0 disables)
+    ledger_recheck_days: int = _setting("LEDGER_RECHECK_DAYS", "3", int)
+    # Precomputed trading calendar (see src/trading_calendar.py)
+    trading_calendar_path: Path = _setting(
+        "TRADING_CALENDAR_PATH", str(PROJECT_ROOT / "data" / "calendar" / "nyse_calendar.npz"), Path)
+    # Local Arrow cache of get_panel results (see src/panel.py)
+    panel_cache_dir: Path = _setting("PANEL_CACHE_DIR", str(PROJECT_ROOT / "data" / "panel_cache"), Path)
+    # Ring buffer + rolling sums behind the incremental cross-asset refresh (see src/cross_asset.py)
+    cross_asset_state_path: Path = _setting(
+        "CROSS_ASSET_STATE_PATH", str(PROJECT_ROOT / "data" / "cross_asset" / "state.npz"), Path)
+    # Single-host token bucket used when no Redis is configured
+    rate_limiter_path: Path = _setting(
+        "RATE_LIMITER_PATH", str(PROJECT_ROOT / "data" / "rate_limiter" / "polygon_bucket.json"), Path)
+    # Partitioned Parquet written by the flat-file importer (see src/bulk_import.py)
+    bulk_import_dir: Path = _setting("BULK_IMPORT_DIR", str(PROJECT_ROOT / "data" / "bulk_import"), Path)
+    # Worker processes for flat-file parsing (0 = one per core)
+    bulk_import_workers: int = _setting("BULK_IMPORT_WORKERS", "0", int)
+
+
+_stats = {"metastore_queries": 0, "keys_resolved": 0, "groups_loaded": 0}
+_cache = {}
+_lock = threading.Lock()
+
+
+def _get_variable(key):
+    """Variable.get through the supported API (secrets backends, Airflow 3 task SDK)."""
     from airflow.models import Variable
-    IS_AIRFLOW = True
-except ImportError:
-    IS_AIRFLOW = False
-    load_dotenv()
 
-def get_config_value(key, default=None):
-    """Fetch a configuration value from Airflow Variables or environment vars."""
+    _stats["metastore_queries"] += 1
+    return Variable.get(key, default_var=None)
+
+
+def _fetch_variables(keys):
+    """
+    Fetch config keys from Airflow Variables without touching the ORM.
+
+    PIPELINE_CONFIG is read once; a Variable of its own is then looked up
+    only for the keys neither that bundle nor the environment provides. A
+    failed lookup (no API server, no secrets backend) stops the remaining
+    lookups, leaving those keys to their defaults.
+
+    Returns:
+        dict: key -> value for the keys found.
+    """
+    try:
+        bundle = os.getenv(f"AIRFLOW_VAR_{PIPELINE_CONFIG_VARIABLE}") or _get_variable(PIPELINE_CONFIG_VARIABLE)
+        values = {k: v for k, v in (json.loads(bundle) if bundle else {}).items() if k in keys}
+        for key in keys:
+            if key not in values and os.getenv(key) is None:
+                value = _get_variable(key)
+                if value is not None:
+                    values[key] = value
+    except Exception as e:
+        print(f"Airflow Variables unavailable ({e}); using environment variables and defaults.")
+        return {}
+    return values
+
+
+def _resolve(keys):
+    """
+    Resolve config keys: AIRFLOW_VAR_<KEY> env var, then the PIPELINE_CONFIG
+    bundle, then the plain env var, then a Variable of the key's own
+    (Variable.get only for keys nothing else covers). Outside Airflow only
+    the environment (.env) is consulted.
+    """
+    resolved = {}
     if IS_AIRFLOW:
-        return Variable.get(key, default_var=os.getenv(key, default))
-    return os.getenv(key, default)
+        missing = []
+        for key in keys:
+            value = os.getenv(f"AIRFLOW_VAR_{key}")
+            if value is None:
+                missing.append(key)
+            else:
+                resolved[key] = value
+        if missing:
+            resolved.update(_fetch_variables(missing))
+    for key in keys:
+        if key not in resolved and os.getenv(key) is not None:
+            resolved[key] = os.getenv(key)
+    _stats["keys_resolved"] += len(keys)
+    return resolved
+
+
+def _load(group):
+    """Return the cached settings for `group`, resolving all its keys on first use."""
+    with _lock:
+        cached = _cache.get(group)
+        if cached and (not CONFIG_TTL_SECONDS or time.monotonic() - cached[1] < CONFIG_TTL_SECONDS):
+            return cached[0]
+
+        specs = [(f.name, f.metadata) for f in fields(group)]
+        raw = _resolve([meta["key"] for _, meta in specs])
+        values = {}
+        for name, meta in specs:
+            value = raw.get(meta["key"], meta["default"])
+            values[name] = meta["cast"](value) if meta["cast"] and value is not None else value
+        settings_group = group(**values)
+        _cache[group] = (settings_group, time.monotonic())
+        _stats["groups_loaded"] += 1
+        return settings_group
+
+
+class Settings:
+    """Lazily resolved, typed settings; each group is fetched on first access."""
+
+    @property
+    def polygon(self) -> PolygonSettings:
+        return _load(PolygonSettings)
+
+    @property
+    def snowflake(self) -> SnowflakeSettings:
+        return _load(SnowflakeSettings)
+
+    @property
+    def pipeline(self) -> PipelineSettings:
+        return _load(PipelineSettings)
+
+    def reload(self):
+        """Drop cached groups so the next access re-resolves them."""
+        with _lock:
+            _cache.clear()
+
+
+settings = Settings()
+
+
+def lookup_stats():
+    """Counts of Variable lookups (metastore_queries), keys resolved and groups loaded in this process."""
+    return dict(_stats)
+
+
+def get_config_value(key, default=None):
+    """Fetch a single configuration value from Airflow Variables or environment vars."""
+    return _resolve([key]).get(key, default)
+
+
+# Legacy module-level names -> (group, attribute)
+_LEGACY_NAMES = {
+    "POLYGON_API_KEY": ("polygon", "api_key"),
+    "API_BASE_URL": ("polygon", "api_base_url"),
+    "POLYGON_WS_URL": ("polygon", "ws_url"),
+    "STREAM_SUBSCRIPTION": ("polygon", "stream_subscription"),
+    "STREAM_FLUSH_SECONDS": ("polygon", "stream_flush_seconds"),
+    "POLYGON_REQUESTS_PER_MINUTE": ("polygon", "requests_per_minute"),
+    "POLYGON_RATE_BURST": ("polygon", "rate_burst"),
+    "RATE_LIMITER_REDIS_URL": ("polygon", "rate_limiter_redis_url"),
+    "MARTS_SCHEMA": ("snowflake", "marts_schema"),
+    "SNOWFLAKE_WAREHOUSE_PROFILES": ("snowflake", "warehouse_profiles"),
+    "SNOWFLAKE_MANAGE_WAREHOUSES": ("snowflake", "manage_warehouses"),
+    "MOMENTUM_STORE_DIR": ("pipeline", "momentum_store_dir"),
+    "DASHBOARD_BUNDLE_DIR": ("pipeline", "dashboard_bundle_dir"),
+    "METRICS_ENABLED": ("pipeline", "metrics_enabled"),
+    "METRICS_DIR": ("pipeline", "metrics_dir"),
+    "PROFILE_ENABLED": ("pipeline", "profile_enabled"),
+    "PROFILE_DIR": ("pipeline", "profile_dir"),
+    "DBT_TARGET_DIR": ("pipeline", "dbt_target_dir"),
+    "DBT_TELEMETRY_STORE": ("pipeline", "dbt_telemetry_store"),
+    "DBT_TELEMETRY_DB": ("pipeline", "dbt_telemetry_db"),
+    "DBT_REGRESSION_THRESHOLD": ("pipeline", "dbt_regression_threshold"),
+    "INGESTION_LEDGER_DB": ("pipeline", "ingestion_ledger_db"),
+    "LEDGER_RECHECK_DAYS": ("pipeline", "ledger_recheck_days"),
+    "TRADING_CALENDAR_PATH": ("pipeline", "trading_calendar_path"),
+    "PANEL_CACHE_DIR": ("pipeline", "panel_cache_dir"),
+    "RATE_LIMITER_PATH": ("pipeline", "rate_limiter_path"),
+    "CROSS_ASSET_STATE_PATH": ("pipeline", "cross_asset_state_path"),
+    "BULK_IMPORT_DIR": ("pipeline", "bulk_import_dir"),
+    "BULK_IMPORT_WORKERS": ("pipeline", "bulk_import_workers"),
+}
 
-# Repository root
-PROJECT_ROOT = Path(__file__).parent.parent
 
-# Polygon API Configuration
-POLYGON_API_KEY = get_config_value("POLYGON_API_KEY")
-API_BASE_URL = get_config_value("API_BASE_URL")
-
-# Snowflake configuration settings
-SNOWFLAKE = {
-    "account": get_config_value("SNOWFLAKE_ACCOUNT"),
-    "user": get_config_value("SNOWFLAKE_USER"),
-    "role": get_config_value("SNOWFLAKE_ROLE"),
-    "warehouse": get_config_value("SNOWFLAKE_WAREHOUSE"),
-    "database": get_config_value("SNOWFLAKE_DATABASE"),
-    "schema": get_config_value("SNOWFLAKE_SCHEMA"),
-    "private_key_path": get_config_value("PRIVATE_KEY_PATH"),
-}
\ No newline at end of file
+def __getattr__(name):
+    # `from src.config import X` lands here, so each module resolves only the group it uses
+    if name == "SNOWFLAKE":
+        return settings.snowflake.connection_dict()
+    if name in _LEGACY_NAMES:
+        group, attribute = _LEGACY_NAMES[name]
+        return getattr(getattr(settings, group), attribute)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,170 @@
+# src/corporate_actions.py
+# Split/dividend factor table: bars are stored unadjusted and dbt applies cumulative factors per security.
+#
+# Usage:
+#   python -m src.corporate_actions backfill --start 2023-01-01 --end 2025-09-16
+#   python -m src.corporate_actions pending    # splits dbt has not applied yet
+
+import argparse
+import sys
+
+import pendulum
+from src.instrumentation import incr, span
+
+# Ex-dates re-requested before each run's first date: Polygon sometimes publishes
+# a split after its execution date, and a failed fetch is retried by the next run
+ACTION_LOOKBACK_DAYS = 7
+
+
+def normalize_actions(splits, dividends, master):
+    """
+    Map Polygon split and dividend records to CORPORATE_ACTIONS rows.
+
+    Each action is keyed to the security holding the ticker on its ex-date;
+    tickers the security master has never seen have no bars to adjust and
+    are skipped.
+
+    Args:
+        splits (list[dict]): /v3/reference/splits results.
+        dividends (list[dict]): /v3/reference/dividends results.
+        master (SecurityMaster): Ticker -> SECURITY_ID index.
+
+    Returns:
+        tuple[list[dict], int]: Rows to merge and the number of actions skipped.
+    """
+    rows, skipped = [], 0
+    for kind, records in (("SPLIT", splits), ("DIVIDEND", dividends)):
+        for record in records:
+            ex_date = record.get("execution_date") if kind == "SPLIT" else record.get("ex_dividend_date")
+            ticker = record.get("ticker")
+            # Factors apply to USD bars; other currencies would need an FX rate
+            if not ex_date or not ticker or record.get("currency", "USD") != "USD":
+                skipped += 1
+                continue
+            security_id = master.lookup(ticker, ex_date)
+            if security_id is None:
+                skipped += 1
+                continue
+            rows.append({
+                "ACTION_ID": record.get("id") or f"{kind}:{ticker}:{ex_date}",
+                "SECURITY_ID": int(security_id),
+                "TICKER": ticker,
+                "ACTION_TYPE": kind,
+                "EX_DATE": ex_date,
+                "SPLIT_FROM": record.get("split_from"),
+                "SPLIT_TO": record.get("split_to"),
+                "CASH_AMOUNT": record.get("cash_amount"),
+                "DIVIDEND_TYPE": record.get("dividend_type"),
+            })
+    return rows, skipped
+
+
+def sync_corporate_actions(client, start, end, run_id, master=None):
+    """
+    Fetch splits and dividends with ex-dates in [start - lookback, end] and upsert them.
+
+    A new or revised split marks its security for a single-security
+    recompute on the next dbt run (see get_pending_adjustments); nothing
+    already loaded into DAILY_STOCKS is touched.
+
+    Args:
+        client: SnowflakeClient used for the merge.
+        start (str): First ex-date of the run's window (YYYY-MM-DD).
+        end (str): Last ex-date (YYYY-MM-DD).
+        run_id (str): Pipeline execution identifier.
+        master (SecurityMaster | None): Loaded security master (default: the load's shared one).
+
+    Returns:
+        int: Actions merged (0 if Polygon could not be reached).
+    """
+    from src.extraction import fetch_corporate_actions
+
+    if master is None:
+        from src.load import get_security_master
+
+        master = get_security_master()
+
+    start = pendulum.parse(start).subtract(days=ACTION_LOOKBACK_DAYS).to_date_string()
+    fetched = fetch_corporate_actions(start, end)
+    if fetched is None:
+        # Picked up by the next run's lookback
+        print(f"Could not fetch corporate actions for {start} → {end}; factors unchanged.")
+        return 0
+
+    splits, dividends = fetched
+    with span("corporate_actions.normalize", splits=len(splits), dividends=len(dividends)) as normalize_span:
+        rows, skipped = normalize_actions(splits, dividends, master)
+        normalize_span.set(rows=len(rows), skipped=skipped)
+    incr("corporate_actions_fetched", len(splits) + len(dividends))
+    if rows:
+        client.merge_corporate_actions(rows, run_id)
+    print(f"Corporate actions {start} → {end}: {len(splits)} splits, {len(dividends)} dividends "
+          f"({skipped} skipped).")
+    return len(rows)
+
+
+def get_pending_adjustments(client=None):
+    """
+    Securities whose split factors changed since dbt last ran.
+
+    Returns:
+        dict: {"security_ids": [...], "ex_dates": [...]}, both sorted. The
+        incremental models reprocess these securities' whole history (the
+        adjusted_security_ids var); the ex-dates are the sessions whose
+        close-to-close returns changed.
+    """
+    owns_client = client is None
+    if owns_client:
+        from src.snowflake_client import SnowflakeClient
+
+        client = SnowflakeClient(component="ingestion", stage="corporate_actions")
+    try:
+        pending = client.get_pending_splits()
+    finally:
+        if owns_client:
+            client.close()
+    security_ids = sorted({int(security_id) for security_id, _ in pending})
+    ex_dates = sorted({ex_date for _, ex_date in pending})
+    if security_ids:
+        print(f"Splits pending for {len(security_ids)} securities: {security_ids}")
+    return {"security_ids": security_ids, "ex_dates": ex_dates}
+
+
+def mark_adjustments_processed(client, security_ids):
+    """Record that dbt has re-adjusted these securities' history."""
+    if security_ids:
+        client.mark_splits_processed(security_ids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the split/dividend factor table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="Load every split and dividend with an ex-date in a range")
+    backfill.add_argument("--start", required=True, help="YYYY-MM-DD")
+    backfill.add_argument("--end", default=pendulum.today().to_date_string(), help="YYYY-MM-DD")
+    sub.add_parser("pending", help="Securities whose splits dbt has not applied yet")
+    args = parser.parse_args(argv)
+
+    from src.security_master import open_security_master
+    from src.snowflake_client import SnowflakeClient
+
+    client = SnowflakeClient(component="admin", stage="corporate_actions")
+    try:
+        if args.command == "pending":
+            pending = get_pending_adjustments(client)
+            if not pending["security_ids"]:
+                print("No splits pending.")
+            return 0
+
+        run_id = pendulum.now().strftime("%Y%m%d_%H%M%S")
+        master = open_security_master(client)
+        sync_corporate_actions(client, args.start, args.end, run_id, master=master)
+        print("The next DAG run re-adjusts the affected securities; or run dbt with "
+              "--vars '{adjusted_security_ids: [...]}' (see `pending`).")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
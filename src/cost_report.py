@@ -0,0 +1,176 @@
+# src/cost_report.py
+# Aggregates Snowflake query history per QUERY_TAG and day into ADMIN.WAREHOUSE_COST_BY_TAG.
+#
+# Usage:
+#   python -m src.cost_report --days 3
+#   python -m src.cost_report --history-file benchmarks/fixtures/query_history.csv
+
+import argparse
+import sys
+
+import pandas as pd
+import pendulum
+from src.query_tags import parse_query_tag
+
+# ACCOUNT_USAGE lags by up to ~45 minutes, so recent days are recomputed every run
+DEFAULT_LOOKBACK_DAYS = 3
+
+# Standard warehouse credit rates; per-query credits are estimated from execution time
+CREDITS_PER_HOUR = {
+    "X-Small": 1,
+    "Small": 2,
+    "Medium": 4,
+    "Large": 8,
+    "X-Large": 16,
+    "2X-Large": 32,
+    "3X-Large": 64,
+    "4X-Large": 128,
+    "5X-Large": 256,
+    "6X-Large": 512,
+}
+
+HISTORY_QUERY = """
+    SELECT
+        QUERY_ID,
+        QUERY_TAG,
+        START_TIME,
+        WAREHOUSE_NAME,
+        WAREHOUSE_SIZE,
+        TOTAL_ELAPSED_TIME,
+        EXECUTION_TIME,
+        BYTES_SCANNED,
+        CREDITS_USED_CLOUD_SERVICES
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+    WHERE START_TIME >= %s
+      AND START_TIME < %s
+      AND DATABASE_NAME = %s
+"""
+
+GROUP_COLUMNS = ["USAGE_DATE", "COMPONENT", "STAGE", "PAGE", "MODEL", "PROFILE", "WAREHOUSE_NAME"]
+
+REPORT_COLUMNS = GROUP_COLUMNS + [
+    "QUERY_COUNT",
+    "TOTAL_ELAPSED_SECONDS",
+    "EXECUTION_SECONDS",
+    "BYTES_SCANNED",
+    "CREDITS_ESTIMATED",
+]
+
+
+def fetch_query_history(client, start, end):
+    """Return QUERY_HISTORY rows for the pipeline database between two dates."""
+    from src.config import SNOWFLAKE
+
+    client.cursor.execute(HISTORY_QUERY, (start, end, SNOWFLAKE["database"]))
+    return client.cursor.fetch_pandas_all()
+
+
+def aggregate_costs(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate query history into one row per tag and day.
+
+    Args:
+        history (pd.DataFrame): QUERY_HISTORY rows (TOTAL_ELAPSED_TIME and
+            EXECUTION_TIME in milliseconds, as Snowflake reports them).
+
+    Returns:
+        pd.DataFrame: REPORT_COLUMNS, most expensive first.
+    """
+    if history.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    df = history.copy()
+    df["USAGE_DATE"] = pd.to_datetime(df["START_TIME"]).dt.date
+
+    # Tags repeat heavily; parse each distinct value once
+    tags = {tag: parse_query_tag(tag) for tag in df["QUERY_TAG"].dropna().unique()}
+    parsed = df["QUERY_TAG"].map(lambda tag: tags.get(tag, {"component": "untagged"}))
+    for key in ("component", "stage", "page", "model", "profile"):
+        df[key.upper()] = parsed.map(lambda tag, key=key: tag.get(key))
+
+    df["TOTAL_ELAPSED_SECONDS"] = df["TOTAL_ELAPSED_TIME"].fillna(0) / 1000
+    df["EXECUTION_SECONDS"] = df["EXECUTION_TIME"].fillna(0) / 1000
+    rate = df["WAREHOUSE_SIZE"].map(CREDITS_PER_HOUR).fillna(0)
+    df["CREDITS_ESTIMATED"] = (
+        df["EXECUTION_SECONDS"] / 3600 * rate + df["CREDITS_USED_CLOUD_SERVICES"].fillna(0)
+    )
+
+    report = (
+        df.groupby(GROUP_COLUMNS, dropna=False)
+        .agg(
+            QUERY_COUNT=("QUERY_ID", "count"),
+            TOTAL_ELAPSED_SECONDS=("TOTAL_ELAPSED_SECONDS", "sum"),
+            EXECUTION_SECONDS=("EXECUTION_SECONDS", "sum"),
+            BYTES_SCANNED=("BYTES_SCANNED", "sum"),
+            CREDITS_ESTIMATED=("CREDITS_ESTIMATED", "sum"),
+        )
+        .reset_index()
+        .sort_values(["USAGE_DATE", "CREDITS_ESTIMATED"], ascending=[True, False])
+    )
+    return report[REPORT_COLUMNS].reset_index(drop=True)
+
+
+def write_report(client, report: pd.DataFrame):
+    """Replace the covered days in ADMIN.WAREHOUSE_COST_BY_TAG with the new aggregates."""
+    if report.empty:
+        print("No query history to report.")
+        return 0
+
+    computed_at = pendulum.now("UTC").naive()
+    rows = [
+        tuple(None if pd.isna(value) else value for value in row) + (computed_at,)
+        for row in report[REPORT_COLUMNS].itertuples(index=False)
+    ]
+    client.cursor.execute(
+        "DELETE FROM ADMIN.WAREHOUSE_COST_BY_TAG WHERE USAGE_DATE BETWEEN %s AND %s",
+        (report["USAGE_DATE"].min(), report["USAGE_DATE"].max()),
+    )
+    client.cursor.executemany(
+        f"""
+        INSERT INTO ADMIN.WAREHOUSE_COST_BY_TAG ({', '.join(REPORT_COLUMNS)}, COMPUTED_AT)
+        VALUES ({', '.join(['%s'] * (len(REPORT_COLUMNS) + 1))})
+        """,
+        rows,
+    )
+    client.conn.commit()
+    print(f"Wrote {len(rows)} cost rows for {report['USAGE_DATE'].min()} → {report['USAGE_DATE'].max()}.")
+    return len(rows)
+
+
+def run_cost_report(days=DEFAULT_LOOKBACK_DAYS):
+    """Recompute the last `days` days of per-tag warehouse cost."""
+    from src.snowflake_client import SnowflakeClient
+
+    today = pendulum.now("UTC").date()
+    start, end = today.subtract(days=days), today.add(days=1)
+    client = SnowflakeClient(component="admin", stage="cost_report", ensure_objects=False)
+    try:
+        history = fetch_query_history(client, start, end)
+        report = aggregate_costs(history)
+        write_report(client, report)
+    finally:
+        client.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-tag warehouse cost report")
+    parser.add_argument("--days", type=int, default=DEFAULT_LOOKBACK_DAYS)
+    parser.add_argument(
+        "--history-file",
+        help="Aggregate a recorded QUERY_HISTORY CSV instead of querying Snowflake (nothing is written)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.history_file:
+        report = aggregate_costs(pd.read_csv(args.history_file))
+    else:
+        report = run_cost_report(args.days)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(report.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
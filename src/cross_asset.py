@@ -0,0 +1,414 @@
+# src/cross_asset.py
+# Rolling correlations/betas to the Russell 3000 and sector dispersion, maintained incrementally from fct_trading_momentum.
+#
+# Usage:
+#   python -m src.cross_asset                           # incremental refresh (full rebuild without state)
+#   python -m src.cross_asset --rebuild                 # recompute all history
+#   python -m src.cross_asset --rebuild --start 2024-06-03
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pendulum
+from src.config import CROSS_ASSET_STATE_PATH, MARTS_SCHEMA, SNOWFLAKE
+from src.instrumentation import incr, span
+
+# Rolling windows in sessions
+WINDOWS = (60, 120)
+# Equal-weight and index-weighted (int_russell3000__daily.index_weight) universe returns
+MARKETS = ("EW", "IW")
+# A statistic needs returns on at least this share of its window's sessions
+MIN_COVERAGE = 0.8
+# Sessions per batch of a full recomputation (each batch also reads the longest window as warm-up)
+BATCH_SESSIONS = 250
+# Incremental sums are rebuilt from the buffered returns this often to bound float drift
+REBUILD_EVERY = 20
+# Calendar days read before a partial recomputation so its first session has full windows
+WARMUP_CALENDAR_DAYS = 200
+
+STAT_COLUMNS = [
+    f"{stat}_{market}_{window}" for window in WINDOWS for market in MARKETS for stat in ("CORR", "BETA")
+]
+
+# Moment axis of the rolling sums: count, Σx, Σy, Σx², Σy², Σxy
+N, SX, SY, SXX, SYY, SXY = range(6)
+
+
+def market_returns(returns, weights):
+    """
+    Equal- and index-weighted log returns of the securities traded each session.
+
+    Args:
+        returns (np.ndarray): (..., securities) daily log returns, NaN where absent.
+        weights (np.ndarray): Index weights of the same shape.
+
+    Returns:
+        np.ndarray: (..., 2) log returns, ordered as MARKETS.
+    """
+    valid = np.isfinite(returns)
+    simple = np.where(valid, np.expm1(np.where(valid, returns, 0.0)), 0.0)
+    w = np.where(valid & np.isfinite(weights), weights, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        equal = simple.sum(axis=-1) / valid.sum(axis=-1)
+        weighted = (simple * w).sum(axis=-1) / w.sum(axis=-1)
+    return np.log1p(np.stack([equal, weighted], axis=-1))
+
+
+def _contributions(returns, market):
+    """Per-session terms of the rolling sums: (..., market, moment, security)."""
+    x = returns[..., None, :]
+    y = market[..., :, None]
+    valid = np.isfinite(x) & np.isfinite(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    return np.stack([valid.astype(np.float64), x, y, x * x, y * y, x * y], axis=-2)
+
+
+def _statistics(moments, window):
+    """(correlation, beta) per market and security from rolling sums (..., market, moment, security)."""
+    n = moments[..., N, :]
+    sx, sy = moments[..., SX, :], moments[..., SY, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = moments[..., SXY, :] - sx * sy / n
+        var_x = moments[..., SXX, :] - sx * sx / n
+        var_y = moments[..., SYY, :] - sy * sy / n
+        beta = cov / var_y
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    enough = (n >= MIN_COVERAGE * window) & (var_x > 0) & (var_y > 0)
+    return np.where(enough, corr, np.nan), np.where(enough, beta, np.nan)
+
+
+# ---- Incremental state ----
+#
+# The state holds the last max(WINDOWS) sessions of returns in a ring buffer
+# plus the running sums of every window. Adding a session adds its terms and
+# subtracts those of the session leaving each window: O(1) per security.
+
+def _empty_state():
+    depth = max(WINDOWS)
+    return {
+        "security_ids": np.array([], dtype=np.int64),
+        "returns": np.full((depth, 0), np.nan),
+        "market": np.full((depth, len(MARKETS)), np.nan),
+        "moments": np.zeros((len(WINDOWS), len(MARKETS), 6, 0)),
+        "head": 0,
+        "filled": 0,
+        "advances": 0,
+        "last_date": None,
+    }
+
+
+def _align(state, security_ids):
+    """Add columns for securities new to the state; return the state column of each id."""
+    new = np.setdiff1d(security_ids, state["security_ids"])
+    if len(new):
+        state["security_ids"] = np.concatenate([state["security_ids"], new])
+        state["returns"] = np.hstack([state["returns"], np.full((len(state["returns"]), len(new)), np.nan)])
+        state["moments"] = np.concatenate(
+            [state["moments"], np.zeros(state["moments"].shape[:-1] + (len(new),))], axis=-1
+        )
+    order = np.argsort(state["security_ids"])
+    return order[np.searchsorted(state["security_ids"], security_ids, sorter=order)]
+
+
+def _recent_rows(state, count):
+    """Ring positions of the last `count` buffered sessions."""
+    return (state["head"] - 1 - np.arange(min(count, state["filled"]))) % len(state["returns"])
+
+
+def _rebuild_moments(state):
+    """Recompute every window's sums from the buffered returns."""
+    for k, window in enumerate(WINDOWS):
+        rows = _recent_rows(state, window)
+        state["moments"][k] = _contributions(state["returns"][rows], state["market"][rows]).sum(axis=0)
+    state["advances"] = 0
+
+
+def _advance(state, day, returns, weights):
+    """Roll the state forward one session; `returns`/`weights` are aligned to the state's columns."""
+    market = market_returns(returns, weights)
+    added = _contributions(returns, market)
+    depth = len(state["returns"])
+    for k, window in enumerate(WINDOWS):
+        state["moments"][k] += added
+        if state["filled"] >= window:
+            leaving = (state["head"] - window) % depth
+            state["moments"][k] -= _contributions(state["returns"][leaving], state["market"][leaving])
+    state["returns"][state["head"]] = returns
+    state["market"][state["head"]] = market
+    state["head"] = (state["head"] + 1) % depth
+    state["filled"] = min(state["filled"] + 1, depth)
+    state["advances"] += 1
+    state["last_date"] = str(day)
+
+
+def _state_from(security_ids, dates, returns, market):
+    """State as of the last of `dates`, built from a full return matrix."""
+    state = _empty_state()
+    depth = len(state["returns"])
+    _align(state, security_ids)
+    tail = slice(max(len(dates) - depth, 0), len(dates))
+    filled = tail.stop - tail.start
+    state["returns"][:filled] = returns[tail]
+    state["market"][:filled] = market[tail]
+    state["head"], state["filled"] = filled % depth, filled
+    state["last_date"] = str(dates[-1])
+    _rebuild_moments(state)
+    return state
+
+
+def load_state(path=CROSS_ASSET_STATE_PATH):
+    """Return the saved incremental state, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as saved:
+        state = {name: saved[name] for name in saved.files}
+    for name in ("head", "filled", "advances"):
+        state[name] = int(state[name])
+    state["last_date"] = str(state["last_date"])
+    return state
+
+
+def save_state(state, path=CROSS_ASSET_STATE_PATH):
+    """Drop securities with no buffered returns and atomically write the state."""
+    if state["advances"] >= REBUILD_EVERY:
+        _rebuild_moments(state)
+    active = np.isfinite(state["returns"]).any(axis=0)
+    if not active.all():
+        state["security_ids"] = state["security_ids"][active]
+        state["returns"] = state["returns"][:, active]
+        state["moments"] = state["moments"][..., active]
+    path = str(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # One temp file per writer: a manual rebuild may overlap the DAG's refresh
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        # A file object keeps np.savez from appending .npz to the name
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **state)
+        # mkstemp creates 0600; other services on the host read the file too
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# ---- Warehouse I/O ----
+
+def _fetch(client, since=None):
+    """Momentum rows with their daily log return, optionally from a trade date onward."""
+    query = f"""
+        SELECT
+            SECURITY_ID,
+            TICKER,
+            TRADE_DATE,
+            SECTOR,
+            INDEX_WEIGHT,
+            LN(CLOSE / NULLIF(YESTERDAY_CLOSE, 0)) AS LOG_RETURN
+        FROM {SNOWFLAKE['database']}.{MARTS_SCHEMA}.FCT_TRADING_MOMENTUM
+        {"WHERE TRADE_DATE >= %s" if since else ""}
+    """
+    with span("cross_asset.fetch", since=since) as fetch_span:
+        table = client.fetch_arrow(query, (since,) if since else None)
+        fetch_span.set(rows=0 if table is None else table.num_rows)
+    return table
+
+
+def _pivot(table):
+    """
+    Long momentum rows -> dates × securities matrices.
+
+    Returns:
+        tuple: security_ids, dates (datetime64[D]), returns, weights, and the
+        (row, column) of every input row in the matrices.
+    """
+    import pyarrow as pa
+
+    ids = table.column("SECURITY_ID").cast(pa.int64()).to_numpy()
+    days = table.column("TRADE_DATE").cast(pa.int32()).to_numpy()
+    security_ids, col = np.unique(ids, return_inverse=True)
+    dates, row = np.unique(days, return_inverse=True)
+
+    def matrix(name):
+        values = np.full((len(dates), len(security_ids)), np.nan)
+        values[row, col] = table.column(name).cast(pa.float64()).to_numpy(zero_copy_only=False)
+        return values
+
+    dates = np.datetime64(0, "D") + dates.astype("timedelta64[D]")
+    return security_ids, dates, matrix("LOG_RETURN"), matrix("INDEX_WEIGHT"), row, col
+
+
+def _frames(base, selected, row, col, stats, offset):
+    """Output rows (statistics per security, dispersion per sector) for the selected input rows."""
+    frame = base[selected].copy()
+    for name, values in stats.items():
+        frame[name] = values[row[selected] - offset, col[selected]]
+    # Cross-sectional spread of the sector's daily log returns
+    dispersion = (
+        frame.groupby(["TRADE_DATE", "SECTOR"])["LOG_RETURN"]
+        .agg(MEMBERS="count", MEAN_RETURN="mean", DISPERSION="std")
+        .reset_index()
+    )
+    return frame, dispersion
+
+
+def _delete_from(client, start):
+    schema = SNOWFLAKE["schema"]
+    for table_name in ("CROSS_ASSET_STATS", "SECTOR_DISPERSION"):
+        if start is None:
+            client.cursor.execute(f"DELETE FROM {schema}.{table_name}")
+        else:
+            client.cursor.execute(f"DELETE FROM {schema}.{table_name} WHERE TRADE_DATE >= %s", (start,))
+    client.conn.commit()
+
+
+def _write(client, frame, dispersion):
+    computed_at = pendulum.now("UTC").naive()
+    frame["COMPUTED_AT"] = computed_at
+    dispersion["COMPUTED_AT"] = computed_at
+    client.write_dataframe(frame, "CROSS_ASSET_STATS")
+    client.write_dataframe(dispersion, "SECTOR_DISPERSION")
+    incr("cross_asset_rows_written", len(frame))
+    return len(frame)
+
+
+# ---- Refresh paths ----
+
+def recompute(client, start=None, state_path=CROSS_ASSET_STATE_PATH):
+    """
+    Batched full recomputation of every session from `start` (default: all history).
+
+    Sessions are processed in blocks of BATCH_SESSIONS: each block takes
+    cumulative sums of the per-session terms over itself plus the longest
+    window before it, and every window's sums are differences of those
+    cumulative sums. The incremental state is rebuilt from the last sessions.
+
+    Returns:
+        int: Rows written to CROSS_ASSET_STATS.
+    """
+    since = None if start is None else str(np.datetime64(start, "D") - np.timedelta64(WARMUP_CALENDAR_DAYS, "D"))
+    table = _fetch(client, since)
+    if table is None or table.num_rows == 0:
+        print("No momentum rows to compute cross-asset statistics from.")
+        return 0
+
+    security_ids, dates, returns, weights, row, col = _pivot(table)
+    market = market_returns(returns, weights)
+    base = table.select(["SECURITY_ID", "TICKER", "TRADE_DATE", "SECTOR", "LOG_RETURN"]).to_pandas()
+    first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D")))
+    _delete_from(client, start)
+
+    warmup = max(WINDOWS) - 1
+    written = 0
+    for begin in range(first, len(dates), BATCH_SESSIONS):
+        end = min(begin + BATCH_SESSIONS, len(dates))
+        lo = max(begin - warmup, 0)
+        with span("cross_asset.batch", start=str(dates[begin]), sessions=end - begin):
+            sums = np.cumsum(_contributions(returns[lo:end], market[lo:end]), axis=0)
+            sums = np.concatenate([np.zeros_like(sums[:1]), sums])
+            # Cumulative-sum index just past each emitted session
+            upto = np.arange(begin - lo, end - lo) + 1
+            stats = {}
+            for window in WINDOWS:
+                corr, beta = _statistics(sums[upto] - sums[np.maximum(upto - window, 0)], window)
+                for m, market_name in enumerate(MARKETS):
+                    stats[f"CORR_{market_name}_{window}"] = corr[:, m]
+                    stats[f"BETA_{market_name}_{window}"] = beta[:, m]
+            selected = (row >= begin) & (row < end)
+            written += _write(client, *_frames(base, selected, row, col, stats, begin))
+
+    save_state(_state_from(security_ids, dates, returns, market), state_path)
+    print(f"Recomputed cross-asset statistics for {len(dates) - first} sessions ({written} rows).")
+    return written
+
+
+def refresh_cross_asset_stats(changed_dates=None, client=None, state_path=CROSS_ASSET_STATE_PATH):
+    """
+    Bring CROSS_ASSET_STATS and SECTOR_DISPERSION up to date after a DAG run.
+
+    New sessions are rolled into the saved state one at a time. If the
+    ingestion ledger reports a change on or before the last computed session,
+    everything from that date is recomputed in batches instead; without saved
+    state the whole history is.
+
+    Args:
+        changed_dates (list[str] | None): Dates dbt just (re)processed.
+        client: SnowflakeClient to reuse (default: a new cross_asset client).
+        state_path (str | Path): Local incremental state file.
+
+    Returns:
+        int: Rows written to CROSS_ASSET_STATS.
+    """
+    owns_client = client is None
+    if owns_client:
+        from src.snowflake_client import SnowflakeClient
+
+        client = SnowflakeClient(component="cross_asset", stage="refresh", ensure_objects=False)
+    try:
+        state = load_state(state_path)
+        if state is None:
+            print("No cross-asset state found; recomputing full history.")
+            return recompute(client, state_path=state_path)
+        earliest = min(changed_dates) if changed_dates else None
+        if earliest is not None and earliest <= state["last_date"]:
+            print(f"Sessions from {earliest} changed; recomputing cross-asset statistics from there.")
+            return recompute(client, start=earliest, state_path=state_path)
+
+        table = _fetch(client, str(np.datetime64(state["last_date"], "D") + 1))
+        if table is None or table.num_rows == 0:
+            print(f"Cross-asset statistics are current through {state['last_date']}.")
+            return 0
+
+        security_ids, dates, returns, weights, row, col = _pivot(table)
+        columns = _align(state, security_ids)
+        stats = {name: np.full(returns.shape, np.nan) for name in STAT_COLUMNS}
+        width = len(state["security_ids"])
+        with span("cross_asset.advance", sessions=len(dates), securities=len(security_ids)):
+            for i, day in enumerate(dates):
+                day_returns, day_weights = np.full(width, np.nan), np.full(width, np.nan)
+                day_returns[columns], day_weights[columns] = returns[i], weights[i]
+                _advance(state, day, day_returns, day_weights)
+                for k, window in enumerate(WINDOWS):
+                    corr, beta = _statistics(state["moments"][k], window)
+                    for m, market_name in enumerate(MARKETS):
+                        stats[f"CORR_{market_name}_{window}"][i] = corr[m, columns]
+                        stats[f"BETA_{market_name}_{window}"][i] = beta[m, columns]
+
+        base = table.select(["SECURITY_ID", "TICKER", "TRADE_DATE", "SECTOR", "LOG_RETURN"]).to_pandas()
+        _delete_from(client, str(dates[0]))
+        written = _write(client, *_frames(base, np.ones(len(row), dtype=bool), row, col, stats, 0))
+        save_state(state, state_path)
+        print(f"Added cross-asset statistics for {len(dates)} sessions through {state['last_date']} ({written} rows).")
+        return written
+    finally:
+        if owns_client:
+            client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh rolling correlations, betas and sector dispersion")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute instead of rolling the state forward")
+    parser.add_argument("--start", help="First session to recompute with --rebuild (YYYY-MM-DD)")
+    parser.add_argument("--state-path", default=str(CROSS_ASSET_STATE_PATH))
+    args = parser.parse_args(argv)
+
+    if not args.rebuild:
+        refresh_cross_asset_stats(state_path=args.state_path)
+        return 0
+
+    from src.snowflake_client import SnowflakeClient
+
+    client = SnowflakeClient(component="cross_asset", stage="rebuild", ensure_objects=False)
+    try:
+        recompute(client, start=args.start, state_path=args.state_path)
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# src/dashboard_bundle.py
+# Exports a versioned snapshot of the marts (Parquet/Feather + manifest) for the Streamlit dashboard.
+
+import json
+import os
+import shutil
+import tempfile
+
+import pendulum
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from src.config import DASHBOARD_BUNDLE_DIR, MARTS_SCHEMA, SNOWFLAKE
+from src.momentum_store import MOMENTUM_COLUMNS
+from src.snowflake_client import SnowflakeClient
+
+MANIFEST_FILE = "manifest.json"
+LATEST_POINTER = "LATEST"
+BUNDLE_FORMAT_VERSION = 1
+
+# Number of published bundles kept on disk (older versions are pruned)
+BUNDLE_RETENTION = 3
+
+# Calendar days of momentum history included in the panel
+MOMENTUM_PANEL_DAYS = 400
+
+
+def _fetch_table(client, query, params=None):
+    """Fetch a query as Arrow with lower-case column names (None if no rows)."""
+    table = client.fetch_arrow(query, params)
+    if table is None:
+        return None
+    return table.rename_columns([name.lower() for name in table.column_names])
+
+
+def _date_range(table, column="trade_date"):
+    """Return the ISO min/max of a date column, or (None, None) for an empty table."""
+    if table is None or table.num_rows == 0:
+        return None, None
+    bounds = pc.min_max(table.column(column))
+    return bounds["min"].as_py().isoformat(), bounds["max"].as_py().isoformat()
+
+
+def _prune_old_bundles(bundle_root, keep):
+    """Delete all but the newest `keep` bundle versions."""
+    versions = sorted(
+        name for name in os.listdir(bundle_root)
+        if os.path.isfile(os.path.join(bundle_root, name, MANIFEST_FILE))
+    )
+    for version in versions[:-keep]:
+        shutil.rmtree(os.path.join(bundle_root, version), ignore_errors=True)
+        print(f"Pruned dashboard bundle {version}")
+
+
+def export_bundle(bundle_root=DASHBOARD_BUNDLE_DIR):
+    """
+    Export the dashboard bundle for the latest marts run.
+
+    Contents:
+        breadth.feather     Full AGG_DAILY_MARKET_BREADTH (one row per day)
+        securities.feather  Full DIM_SECURITIES_CURRENT
+        momentum.parquet    Trailing FCT_TRADING_MOMENTUM panel, zstd-compressed
+        manifest.json       Version, row counts, and date coverage per dataset
+
+    Args:
+        bundle_root (Path | str): Local or shared directory read by the dashboard.
+
+    Returns:
+        str | None: Published bundle version, or None if the marts are empty.
+    """
+    version = pendulum.now("UTC").strftime("%Y%m%dT%H%M%SZ")
+    bundle_dir = os.path.join(bundle_root, version)
+    marts = f"{SNOWFLAKE['database']}.{MARTS_SCHEMA}"
+
+    client = SnowflakeClient(component="dashboard_bundle", stage="export", ensure_objects=False)
+    try:
+        breadth = _fetch_table(
+            client, f"SELECT * FROM {marts}.AGG_DAILY_MARKET_BREADTH ORDER BY TRADE_DATE"
+        )
+        securities = _fetch_table(client, f"SELECT * FROM {marts}.DIM_SECURITIES_CURRENT")
+        momentum = _fetch_table(
+            client,
+            f"""
+                SELECT {", ".join(MOMENTUM_COLUMNS)}
+                FROM {marts}.FCT_TRADING_MOMENTUM
+                WHERE TRADE_DATE >= DATEADD(
+                    day, -%s, (SELECT MAX(TRADE_DATE) FROM {marts}.FCT_TRADING_MOMENTUM)
+                )
+                ORDER BY TICKER, TRADE_DATE
+            """,
+            (MOMENTUM_PANEL_DAYS,),
+        )
+        # Full-history lower bound so the dashboard's date picker still spans everything
+        history_min = client.fetch_arrow(
+            f"SELECT MIN(TRADE_DATE) AS MIN_DATE FROM {marts}.FCT_TRADING_MOMENTUM"
+        )
+    finally:
+        client.close()
+
+    if breadth is None or securities is None:
+        print("Marts are empty; dashboard bundle not published.")
+        return None
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    feather.write_feather(breadth, os.path.join(bundle_dir, "breadth.feather"), compression="zstd")
+    feather.write_feather(securities, os.path.join(bundle_dir, "securities.feather"), compression="zstd")
+
+    breadth_min, breadth_max = _date_range(breadth)
+    datasets = {
+        "breadth": {
+            "file": "breadth.feather",
+            "rows": breadth.num_rows,
+            "min_date": breadth_min,
+            "max_date": breadth_max,
+        },
+        "securities": {
+            "file": "securities.feather",
+            "rows": securities.num_rows,
+        },
+    }
+
+    if momentum is not None:
+        # Ticker-sorted row groups keep single-ticker reads to a few pages
+        pq.write_table(
+            momentum,
+            os.path.join(bundle_dir, "momentum.parquet"),
+            compression="zstd",
+            row_group_size=64_000,
+        )
+        momentum_min, momentum_max = _date_range(momentum)
+        datasets["momentum"] = {
+            "file": "momentum.parquet",
+            "rows": momentum.num_rows,
+            "min_date": momentum_min,
+            "max_date": momentum_max,
+            "history_min_date": history_min.column(0)[0].as_py().isoformat(),
+        }
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "created_at": pendulum.now("UTC").to_iso8601_string(),
+        "data_through": breadth_max,
+        "datasets": datasets,
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Flip the pointer last so readers only ever see complete bundles
+    pointer = os.path.join(bundle_root, LATEST_POINTER)
+    # One temp file per writer: two exports must not interleave their pointer writes
+    fd, tmp_path = tempfile.mkstemp(dir=bundle_root, prefix=f"{LATEST_POINTER}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(version)
+        # mkstemp creates 0600; other services on the host read the file too
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, pointer)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    _prune_old_bundles(bundle_root, BUNDLE_RETENTION)
+    print(f"Published dashboard bundle {version} to {bundle_dir}")
+    return version
+
+
+if __name__ == "__main__":
+    export_bundle()
@@ -0,0 +1,320 @@
+# src/dbt_telemetry.py
+# Persists per-model dbt timings from run_results.json and flags models that are getting slower.
+#
+# Usage (after each dbt command, from the repository root):
+#   python -m src.dbt_telemetry record --stage marts
+#   python -m src.dbt_telemetry trend --model fct_trading_momentum
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+
+from src.config import (
+    DBT_REGRESSION_THRESHOLD,
+    DBT_TARGET_DIR,
+    DBT_TELEMETRY_DB,
+    DBT_TELEMETRY_STORE,
+)
+
+# Runs compared against when checking for regressions
+HISTORY_RUNS = 20
+# Too few runs make the median meaningless
+MIN_HISTORY_RUNS = 5
+# Short nodes are dominated by warehouse queueing noise
+MIN_REGRESSION_SECONDS = 5.0
+
+# run_results statuses for models ("success") and tests ("pass")
+SUCCESS_STATUSES = ("success", "pass")
+
+COLUMNS = [
+    "INVOCATION_ID",
+    "STAGE",
+    "UNIQUE_ID",
+    "NAME",
+    "RESOURCE_TYPE",
+    "MATERIALIZATION",
+    "STATUS",
+    "EXECUTION_TIME",
+    "ROWS_AFFECTED",
+    "QUERY_ID",
+    "STARTED_AT",
+    "COMPLETED_AT",
+    "GENERATED_AT",
+]
+
+HISTORY_QUERY = """
+    SELECT UNIQUE_ID, EXECUTION_TIME
+    FROM (
+        SELECT
+            UNIQUE_ID,
+            EXECUTION_TIME,
+            ROW_NUMBER() OVER (PARTITION BY UNIQUE_ID ORDER BY GENERATED_AT DESC) AS RN
+        FROM {table}
+        WHERE STATUS IN ('success', 'pass')
+          AND INVOCATION_ID <> {ph}
+          AND UNIQUE_ID IN ({ids})
+    ) recent
+    WHERE RN <= {limit}
+"""
+
+TREND_QUERY = """
+    SELECT GENERATED_AT, STAGE, STATUS, EXECUTION_TIME, ROWS_AFFECTED
+    FROM {table}
+    WHERE NAME = {ph}
+    ORDER BY GENERATED_AT DESC
+    LIMIT {limit}
+"""
+
+
+def _execute_timing(result):
+    """Return (started_at, completed_at) of the execute phase, if dbt reported it."""
+    for timing in result.get("timing", []):
+        if timing.get("name") == "execute":
+            return timing.get("started_at"), timing.get("completed_at")
+    return None, None
+
+
+def parse_run_results(target_dir, stage):
+    """
+    Turn dbt's run_results.json and manifest.json into one record per node.
+
+    Args:
+        target_dir (str | Path): dbt target directory.
+        stage (str): Pipeline stage that ran dbt (staging, intermediate, marts, tests).
+
+    Returns:
+        list[dict]: Rows keyed by COLUMNS, or [] if dbt produced no results.
+    """
+    results_path = os.path.join(target_dir, "run_results.json")
+    if not os.path.exists(results_path):
+        print(f"No run_results.json in {target_dir}; nothing to record.")
+        return []
+
+    with open(results_path) as f:
+        run_results = json.load(f)
+
+    nodes = {}
+    manifest_path = os.path.join(target_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            nodes = json.load(f).get("nodes", {})
+
+    metadata = run_results.get("metadata", {})
+    records = []
+    for result in run_results.get("results", []):
+        unique_id = result["unique_id"]
+        node = nodes.get(unique_id, {})
+        adapter_response = result.get("adapter_response") or {}
+        started_at, completed_at = _execute_timing(result)
+        records.append({
+            "INVOCATION_ID": metadata.get("invocation_id"),
+            "STAGE": stage,
+            "UNIQUE_ID": unique_id,
+            "NAME": node.get("name") or unique_id.split(".")[-1],
+            "RESOURCE_TYPE": node.get("resource_type") or unique_id.split(".")[0],
+            "MATERIALIZATION": node.get("config", {}).get("materialized"),
+            "STATUS": result.get("status"),
+            "EXECUTION_TIME": result.get("execution_time"),
+            "ROWS_AFFECTED": adapter_response.get("rows_affected"),
+            "QUERY_ID": adapter_response.get("query_id"),
+            "STARTED_AT": started_at,
+            "COMPLETED_AT": completed_at,
+            "GENERATED_AT": metadata.get("generated_at"),
+        })
+    return records
+
+
+class SnowflakeRunStore:
+    """ADMIN.DBT_MODEL_RUNS in Snowflake (created by SnowflakeClient)."""
+
+    table = "ADMIN.DBT_MODEL_RUNS"
+    placeholder = "%s"
+
+    def __init__(self):
+        from src.snowflake_client import SnowflakeClient
+        self.client = SnowflakeClient(component="dbt_telemetry")
+        self.cursor = self.client.cursor
+
+    def commit(self):
+        self.client.conn.commit()
+
+    def close(self):
+        self.client.close()
+
+
+class SqliteRunStore:
+    """Local stand-in for ADMIN.DBT_MODEL_RUNS."""
+
+    table = "DBT_MODEL_RUNS"
+    placeholder = "?"
+
+    def __init__(self, path=DBT_TELEMETRY_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.cursor = self.conn.cursor()
+        self.cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ({', '.join(COLUMNS)})"
+        )
+        self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(kind=DBT_TELEMETRY_STORE):
+    """Return the configured run store ("snowflake" or "sqlite")."""
+    if kind == "sqlite":
+        return SqliteRunStore()
+    return SnowflakeRunStore()
+
+
+def save_records(store, records):
+    """Insert records unless their invocation was already recorded; returns rows written."""
+    if not records:
+        return 0
+    ph = store.placeholder
+    invocation_id = records[0]["INVOCATION_ID"]
+    store.cursor.execute(
+        f"SELECT COUNT(*) FROM {store.table} WHERE INVOCATION_ID = {ph}", (invocation_id,)
+    )
+    if store.cursor.fetchone()[0]:
+        # A failed compile leaves the previous stage's run_results.json behind
+        print(f"Invocation {invocation_id} already recorded; skipping.")
+        return 0
+
+    query = (
+        f"INSERT INTO {store.table} ({', '.join(COLUMNS)}) "
+        f"VALUES ({', '.join([ph] * len(COLUMNS))})"
+    )
+    store.cursor.executemany(query, [tuple(r[c] for c in COLUMNS) for r in records])
+    store.commit()
+    return len(records)
+
+
+def load_history(store, unique_ids, exclude_invocation, limit=HISTORY_RUNS):
+    """Return {unique_id: [execution_time, ...]} for the last `limit` successful runs."""
+    if not unique_ids:
+        return {}
+    ph = store.placeholder
+    query = HISTORY_QUERY.format(
+        table=store.table, ph=ph, ids=", ".join([ph] * len(unique_ids)), limit=int(limit)
+    )
+    store.cursor.execute(query, (exclude_invocation, *unique_ids))
+    history = {}
+    for unique_id, execution_time in store.cursor.fetchall():
+        history.setdefault(unique_id, []).append(float(execution_time))
+    return history
+
+
+def find_regressions(records, history, threshold=DBT_REGRESSION_THRESHOLD,
+                     min_runs=MIN_HISTORY_RUNS, min_seconds=MIN_REGRESSION_SECONDS):
+    """
+    Compare each successful node's runtime with its recent median.
+
+    Returns:
+        list[dict]: name, execution_time, median, runs and growth for each regression.
+    """
+    regressions = []
+    for record in records:
+        runtime = record["EXECUTION_TIME"]
+        past = history.get(record["UNIQUE_ID"], [])
+        if record["STATUS"] not in SUCCESS_STATUSES or runtime is None or len(past) < min_runs:
+            continue
+        median = statistics.median(past)
+        if runtime < min_seconds or median <= 0:
+            continue
+        growth = runtime / median - 1
+        if growth > threshold:
+            regressions.append({
+                "name": record["NAME"],
+                "execution_time": round(runtime, 3),
+                "median": round(median, 3),
+                "runs": len(past),
+                "growth": round(growth, 3),
+            })
+    return regressions
+
+
+def record(stage, target_dir=DBT_TARGET_DIR, store_kind=DBT_TELEMETRY_STORE,
+           threshold=DBT_REGRESSION_THRESHOLD):
+    """
+    Persist the latest dbt invocation and report runtime regressions.
+
+    Returns:
+        list[dict]: Regressions found (see find_regressions).
+    """
+    records = parse_run_results(target_dir, stage)
+    if not records:
+        return []
+
+    store = open_store(store_kind)
+    try:
+        written = save_records(store, records)
+        if not written:
+            return []
+        print(f"Recorded {written} dbt node timings for stage '{stage}'.")
+        history = load_history(
+            store, [r["UNIQUE_ID"] for r in records], records[0]["INVOCATION_ID"]
+        )
+    finally:
+        store.close()
+
+    slowest = sorted(records, key=lambda r: r["EXECUTION_TIME"] or 0, reverse=True)[:5]
+    for r in slowest:
+        print(f"  {r['NAME']:<40} {r['STATUS']:<8} {r['EXECUTION_TIME'] or 0:>8.2f}s "
+              f"rows={r['ROWS_AFFECTED']}")
+
+    regressions = find_regressions(records, history, threshold)
+    for reg in regressions:
+        print(
+            f"REGRESSION: {reg['name']} took {reg['execution_time']}s, "
+            f"{reg['growth']:+.0%} over its {reg['runs']}-run median of {reg['median']}s"
+        )
+    return regressions
+
+
+def trend(model, limit=HISTORY_RUNS, store_kind=DBT_TELEMETRY_STORE):
+    """Return the most recent runs of a model, newest first."""
+    store = open_store(store_kind)
+    try:
+        query = TREND_QUERY.format(table=store.table, ph=store.placeholder, limit=int(limit))
+        store.cursor.execute(query, (model,))
+        return store.cursor.fetchall()
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dbt model timing telemetry")
+    parser.add_argument("--store", choices=["snowflake", "sqlite"], default=DBT_TELEMETRY_STORE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_cmd = commands.add_parser("record", help="Persist the latest run_results.json")
+    record_cmd.add_argument("--stage", required=True)
+    record_cmd.add_argument("--target-dir", default=DBT_TARGET_DIR)
+    record_cmd.add_argument("--threshold", type=float, default=DBT_REGRESSION_THRESHOLD)
+    record_cmd.add_argument("--fail-on-regression", action="store_true")
+
+    trend_cmd = commands.add_parser("trend", help="Show recent runtimes of one model")
+    trend_cmd.add_argument("--model", required=True)
+    trend_cmd.add_argument("--limit", type=int, default=HISTORY_RUNS)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        regressions = record(args.stage, args.target_dir, args.store, args.threshold)
+        return 1 if regressions and args.fail_on_regression else 0
+
+    for generated_at, stage, status, execution_time, rows in trend(args.model, args.limit, args.store):
+        print(f"{generated_at}  {stage:<12} {status:<8} {float(execution_time or 0):>8.2f}s rows={rows}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
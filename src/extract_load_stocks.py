@@ -1,83 +1,160 @@
 # src/extract_load_stocks.py
 # Pipeline entrypoint for extracting grouped daily data from Polygon and loading it into Snowflake with ingestion checkpoints.
 
-import time
+# pandas, requests and the Snowflake connector are imported inside the functions
+# that use them, so tasks that only touch the ledger or calendar start quickly.
 import pendulum
-import pandas_market_calendars as mcal
 from pendulum import duration
-from src.extraction import fetch_grouped_daily
-from src.load import load_data
-from src.snowflake_client import SnowflakeClient
-
-
-def get_trading_days(start_date, end_date, calendar_name="NYSE"):
-    """Return all valid trading days between two dates for a given market calendar."""
-    calendar = mcal.get_calendar(calendar_name)
-    schedule = calendar.schedule(start_date=start_date, end_date=end_date)
-    trading_days = schedule.index
-    return trading_days
+from src.config import LEDGER_RECHECK_DAYS
+from src.ingestion_ledger import open_ledger, payload_hash, sync_ledger
+from src.instrumentation import finish_run, incr, span, start_run
+from src.profiling import finish_profile, start_profile
+from src.trading_calendar import ensure_sessions_published, get_trading_days, previous_session
 
 
 def get_completed_dates():
     """Retrieve dates already loaded into Snowflake."""
-    client = SnowflakeClient()
+    from src.snowflake_client import SnowflakeClient
+
+    client = SnowflakeClient(component="ingestion", stage="completed_dates")
     completed = client.get_completed_dates()
     client.close()
     return completed
 
 
-def extract_load_data(years_back=2, days_back_override=None):
+def extract_load_data(years_back=2, days_back_override=None, profile=None):
     """
     Main pipeline entrypoint: fetch grouped daily data from Polygon,
     load it into Snowflake, and record ingestion checkpoints.
+
+    Pass profile=True (or set PIPELINE_PROFILE) to write CPU and memory
+    profiles for the run under data/profiles/<run_id>/.
+
+    Returns:
+        list[str]: Dates loaded or revised that dbt has not processed yet
+        (published to the dbt models as the changed_dates var).
     """
     run_id = pendulum.now().strftime("%Y%m%d_%H%M%S")
     print(f"\nStarting historical stock data load | run_id = {run_id}")
+    start_run(run_id)
+    start_profile(run_id, enabled=profile)
+    try:
+        return _run(run_id, years_back, days_back_override)
+    finally:
+        finish_profile()
+        finish_run()
+
+
+def _run(run_id, years_back, days_back_override):
+    """Process every outstanding trading day in the requested window."""
+    from src.corporate_actions import sync_corporate_actions
+    from src.extraction import fetch_grouped_daily
+    from src.load import get_snowflake_client
 
     today = pendulum.now("America/New_York").date()
     end_date = today - duration(days=1)
 
     if days_back_override == 1:
-        calendar = mcal.get_calendar("NYSE")
-        schedule = calendar.schedule(
-            start_date=today.subtract(days=10),
-            end_date=today
-        )
-        last_trading_day = schedule.index[schedule.index < today][-1].date()
-        start_date = end_date = last_trading_day
+        start_date = end_date = previous_session(today)
     elif days_back_override:
         start_date = end_date - duration(days=days_back_override)
     else:
         start_date = end_date - duration(years=years_back)
 
-    completed_dates = get_completed_dates()
-    trading_days = get_trading_days(start_date, end_date)
-    total_days = len(trading_days)
-    remaining_days = len(
-        [d for d in trading_days if d.strftime("%Y-%m-%d") not in completed_dates]
-    )
-
-    print(f"Total trading days: {total_days}")
-    print(f"Already completed: {len(completed_dates)}")
-    print(f"Remaining to process: {remaining_days}\n")
-
-    for i, date in enumerate(trading_days, 1):
-        date_str = date.strftime("%Y-%m-%d")
-
-        if date_str in completed_dates:
-            print(f"Skipping {date_str} (already completed). Progress: {i}/{total_days}")
-            continue
-
-        print(f"Processing {date_str} | Progress {i}/{total_days} (Remaining: {remaining_days})")
-
-        df = fetch_grouped_daily(date_str)
-        load_data(df, date_str, run_id)
-
-        # Prevent API throttling
-        time.sleep(20)
-        remaining_days -= 1
-
-    print("\nFinished processing all trading days.")
+    client = get_snowflake_client()
+    ledger = open_ledger(client)
+    try:
+        completed_dates = ledger.completed_dates()
+        trading_days = [d.strftime("%Y-%m-%d") for d in get_trading_days(start_date, end_date)]
+
+        # Recently loaded days are re-fetched so Polygon revisions are picked up
+        recheck_dates = []
+        if LEDGER_RECHECK_DAYS > 0:
+            recent = get_trading_days(end_date - duration(days=LEDGER_RECHECK_DAYS * 2 + 7), end_date)
+            recheck_dates = [
+                d for d in (day.strftime("%Y-%m-%d") for day in recent[-LEDGER_RECHECK_DAYS:])
+                if d in completed_dates
+            ]
+        work = sorted(set(d for d in trading_days if d not in completed_dates) | set(recheck_dates))
+
+        print(f"Total trading days: {len(trading_days)}")
+        print(f"Already completed: {len(completed_dates)}")
+        print(f"Re-checking for revisions: {len(recheck_dates)}")
+        print(f"Remaining to process: {len(work)}\n")
+
+        for i, date_str in enumerate(work, 1):
+            print(f"Processing {date_str} | Progress {i}/{len(work)}")
+
+            with span("pipeline.date", date=date_str):
+                df = fetch_grouped_daily(date_str)
+                if df is not None and not df.empty:
+                    _load_if_changed(df, date_str, run_id, ledger)
+
+            # Throttling happens per request in the shared Polygon rate limiter
+            incr("dates_processed")
+
+        # Bars are unadjusted; splits/dividends become factor rows instead of reloads
+        first = work[0] if work else end_date.strftime("%Y-%m-%d")
+        with span("pipeline.corporate_actions"):
+            sync_corporate_actions(client, first, end_date.strftime("%Y-%m-%d"), run_id)
+
+        # Week/month boundaries for the rollups; rewritten only when the window outgrows them
+        with span("pipeline.trading_sessions"):
+            ensure_sessions_published(client, start_date, end_date)
+
+        sync_ledger(client, ledger)
+        changed_dates = ledger.pending_dates()
+    finally:
+        ledger.close()
+
+    print(f"\nFinished processing all trading days. Dates pending for dbt: {changed_dates}")
+    return changed_dates
+
+
+def _load_if_changed(df, date_str, run_id, ledger):
+    """Load a date unless its payload hash matches the ledger."""
+    from src.load import load_data
+
+    with span("ledger.hash", date=date_str):
+        digest = payload_hash(df)
+    entry = ledger.get_entry(date_str)
+    already_loaded = entry is not None
+    previous = entry["PAYLOAD_HASH"] if entry else None
+
+    if already_loaded and previous is None:
+        # Seeded from checkpoints before hashes existed: adopt rather than reload
+        ledger.adopt_hash(date_str, digest)
+        print(f"Recorded payload hash for {date_str} (no previous hash).")
+        return
+    if previous == digest:
+        incr("dates_unchanged")
+        print(f"Skipping {date_str} (payload unchanged).")
+        return
+
+    if already_loaded:
+        incr("dates_revised")
+        print(f"Payload for {date_str} changed since last load; replacing.")
+    if load_data(df, date_str, run_id, replace=already_loaded):
+        ledger.record_load(date_str, digest, len(df), run_id)
+
+
+def mark_changes_processed(dates, adjusted_security_ids=None):
+    """Mark dates (and re-adjusted securities' splits) as processed by dbt."""
+    if not dates and not adjusted_security_ids:
+        return
+    from src.corporate_actions import mark_adjustments_processed
+    from src.snowflake_client import SnowflakeClient
+
+    client = SnowflakeClient(component="ingestion", stage="ledger_sync")
+    ledger = open_ledger(client)
+    try:
+        if dates:
+            ledger.mark_processed(dates)
+            sync_ledger(client, ledger)
+        mark_adjustments_processed(client, adjusted_security_ids)
+    finally:
+        ledger.close()
+        client.close()
 
 
 if __name__ == "__main__":
@@ -1,17 +1,25 @@
 # src/extraction.py
-# Fetches grouped daily aggregate data from the Polygon API with retry handling.
+# Fetches grouped daily aggregates and corporate actions from the Polygon API with retry handling.
 
 import requests
 import pandas as pd
 import time
 from requests import RequestException
 from src.config import POLYGON_API_KEY, API_BASE_URL
+from src.instrumentation import incr, span
+from src.rate_limiter import get_rate_limiter
+
+# Seconds every worker holds off after a 429 without a Retry-After header
+RATE_LIMIT_BACKOFF_SECONDS = 60
 
 
 def fetch_grouped_daily(date_str: str) -> pd.DataFrame:
     """
     Fetch grouped daily aggregate data from the Polygon API for a given date.
 
+    Bars are unadjusted; splits are applied downstream from RAW.CORPORATE_ACTIONS
+    (src/corporate_actions.py), so a split never rewrites loaded history.
+
     Args:
         date_str (str): Date in 'YYYY-MM-DD' format.
 
@@ -24,7 +32,7 @@ def fetch_grouped_daily(date_str: str) -> pd.DataFrame:
     url = f"{API_BASE_URL}/v2/aggs/grouped/locale/us/market/stocks/{date_str}"
 
     params = {
-        "adjusted": "true",
+        "adjusted": "false",
         "apiKey": POLYGON_API_KEY
     }
 
@@ -34,7 +42,10 @@ def fetch_grouped_daily(date_str: str) -> pd.DataFrame:
         print(f"No data returned for {date_str}")
         return None
 
-    df = pd.DataFrame(data["results"])
+    with span("extract.parse", date=date_str) as parse_span:
+        df = pd.DataFrame(data["results"])
+        parse_span.set(rows=len(df))
+    incr("rows_fetched", len(df))
 
     if df.empty:
         print(f"Empty results for {date_str}")
@@ -44,6 +55,46 @@ def fetch_grouped_daily(date_str: str) -> pd.DataFrame:
     return df
 
 
+def fetch_corporate_actions(start: str, end: str):
+    """
+    Fetch splits and dividends with an ex-date between start and end (inclusive).
+
+    Args:
+        start (str): First ex-date in 'YYYY-MM-DD' format.
+        end (str): Last ex-date in 'YYYY-MM-DD' format.
+
+    Returns:
+        tuple[list[dict], list[dict]] | None: (splits, dividends) as returned by
+        Polygon, or None if any page failed.
+    """
+    with span("extract.corporate_actions", start=start, end=end) as actions_span:
+        splits = _fetch_all_pages(
+            f"{API_BASE_URL}/v3/reference/splits",
+            {"execution_date.gte": start, "execution_date.lte": end, "limit": 1000},
+        )
+        dividends = _fetch_all_pages(
+            f"{API_BASE_URL}/v3/reference/dividends",
+            {"ex_dividend_date.gte": start, "ex_dividend_date.lte": end, "limit": 1000},
+        )
+        if splits is None or dividends is None:
+            return None
+        actions_span.set(splits=len(splits), dividends=len(dividends))
+    return splits, dividends
+
+
+def _fetch_all_pages(url: str, params: dict):
+    """Follow Polygon's next_url cursor and return every page's results (None on failure)."""
+    results = []
+    while url:
+        data = _make_request_with_retry(url, params={**params, "apiKey": POLYGON_API_KEY})
+        if data is None:
+            return None
+        results.extend(data.get("results", []))
+        # next_url carries the cursor and the original filters; only the key is re-added
+        url, params = data.get("next_url"), {}
+    return results
+
+
 def _make_request_with_retry(url: str, params: dict, max_retries: int = 3):
     """
     Helper: retry HTTP requests for transient errors or rate limits.
@@ -56,26 +107,56 @@ def _make_request_with_retry(url: str, params: dict, max_retries: int = 3):
     Returns:
         dict | None: JSON response as dict, or None on failure.
     """
+    limiter = get_rate_limiter()
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            incr("polygon_retries")
+        # Every request draws from the quota shared with all other workers
+        with span("extract.rate_limit_wait", backend=limiter.backend) as wait_span:
+            waited = limiter.acquire()
+            wait_span.set(seconds=round(waited, 3))
+        incr("rate_limit_wait_seconds", waited)
         try:
-            response = requests.get(url, params=params, timeout=10)
-            status = response.status_code
+            with span("extract.http_request", attempt=attempt) as request_span:
+                response = requests.get(url, params=params, timeout=10)
+                status = response.status_code
+                request_span.set(status=status, bytes=len(response.content))
+            incr("polygon_requests")
+            incr("bytes_fetched", len(response.content))
 
             if status == 200:
                 return response.json()
             elif status == 429:
-                print("Rate limited. Waiting 60 seconds before retry...")
-                time.sleep(60)
+                backoff = _retry_after(response)
+                print(f"Rate limited. Holding back all workers for {backoff}s before retry...")
+                # The next acquire() waits out the penalty, here and in every other worker
+                limiter.penalize(backoff)
+                incr("rate_limit_penalty_seconds", backoff)
             elif 500 <= status < 600:
                 print(f"Server error {status}. Retrying in 5s (attempt {attempt}/{max_retries})...")
-                time.sleep(5)
+                _sleep(5, "retry_sleep_seconds")
             else:
                 print(f"Client error {status}: {response.text[:100]}")
                 break
 
         except RequestException as e:
             print(f"Request failed ({attempt}/{max_retries}): {e}")
-            time.sleep(5)
+            _sleep(5, "retry_sleep_seconds")
 
     print("All retries exhausted. Returning None.")
     return None
+
+
+def _retry_after(response):
+    """Seconds to back off after a 429: the Retry-After header when present."""
+    try:
+        return max(int(response.headers.get("Retry-After", RATE_LIMIT_BACKOFF_SECONDS)), 1)
+    except (TypeError, ValueError):
+        return RATE_LIMIT_BACKOFF_SECONDS
+
+
+def _sleep(seconds, counter):
+    """Sleep between attempts and account the time to the given counter."""
+    with span("extract.sleep", reason=counter):
+        time.sleep(seconds)
+    incr(counter, seconds)
@@ -0,0 +1,176 @@
+# src/ingestion_ledger.py
+# Local SQLite ledger of loaded dates with payload hashes, mirrored to ADMIN.INGESTION_LEDGER.
+
+import hashlib
+import os
+import sqlite3
+
+import pendulum
+from src.config import INGESTION_LEDGER_DB
+
+# Raw Polygon columns that define a day's payload (ingest-time columns are excluded)
+HASH_COLUMNS = ["T", "v", "vw", "o", "c", "h", "l", "n", "t"]
+
+LEDGER_COLUMNS = ["API_DATE", "PAYLOAD_HASH", "ROW_COUNT", "LOADED_AT", "RUN_ID", "DBT_PROCESSED_AT"]
+
+
+def payload_hash(df) -> str:
+    """
+    Order-independent content hash of a grouped daily payload.
+
+    Rows are sorted by ticker and hashed column-wise with pandas' vectorized
+    row hashing, so the digest only changes when Polygon changes the data.
+    """
+    # Imported here so ledger-only tasks (mark_changes_processed) skip pandas
+    import pandas as pd
+
+    columns = [c for c in HASH_COLUMNS if c in df.columns]
+    ordered = df[columns].sort_values("T", kind="stable") if "T" in columns else df[columns]
+    row_hashes = pd.util.hash_pandas_object(ordered, index=False).to_numpy()
+    return hashlib.blake2b(row_hashes.tobytes(), digest_size=16).hexdigest()
+
+
+class IngestionLedger:
+    """
+    One row per loaded trading date.
+
+    Args:
+        path (str | Path): SQLite file; created on first use.
+    """
+
+    def __init__(self, path=INGESTION_LEDGER_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS INGESTION_LEDGER (
+                API_DATE TEXT PRIMARY KEY,
+                PAYLOAD_HASH TEXT,
+                ROW_COUNT INTEGER,
+                LOADED_AT TEXT,
+                RUN_ID TEXT,
+                DBT_PROCESSED_AT TEXT,
+                SYNCED INTEGER DEFAULT 0
+            )
+        """)
+        self.conn.commit()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT COUNT(*) FROM INGESTION_LEDGER").fetchone()[0] == 0
+
+    def completed_dates(self):
+        """Dates with a successful load (replaces scanning the checkpoint log)."""
+        return {row[0] for row in self.conn.execute("SELECT API_DATE FROM INGESTION_LEDGER")}
+
+    def get_entry(self, api_date):
+        """Return the ledger row for a date as a dict, or None if it was never loaded."""
+        row = self.conn.execute(
+            f"SELECT {', '.join(LEDGER_COLUMNS)} FROM INGESTION_LEDGER WHERE API_DATE = ?",
+            (api_date,),
+        ).fetchone()
+        return dict(zip(LEDGER_COLUMNS, row)) if row else None
+
+    def record_load(self, api_date, digest, row_count, run_id):
+        """Record a (re)load; the date is pending for dbt until mark_processed."""
+        self.conn.execute(
+            """
+            INSERT INTO INGESTION_LEDGER (API_DATE, PAYLOAD_HASH, ROW_COUNT, LOADED_AT, RUN_ID, DBT_PROCESSED_AT, SYNCED)
+            VALUES (?, ?, ?, ?, ?, NULL, 0)
+            ON CONFLICT(API_DATE) DO UPDATE SET
+                PAYLOAD_HASH = excluded.PAYLOAD_HASH,
+                ROW_COUNT = excluded.ROW_COUNT,
+                LOADED_AT = excluded.LOADED_AT,
+                RUN_ID = excluded.RUN_ID,
+                DBT_PROCESSED_AT = NULL,
+                SYNCED = 0
+            """,
+            (api_date, digest, row_count, pendulum.now("UTC").to_datetime_string(), run_id),
+        )
+        self.conn.commit()
+
+    def adopt_hash(self, api_date, digest):
+        """Store the hash for a date seeded without one, without marking it changed."""
+        self.conn.execute(
+            "UPDATE INGESTION_LEDGER SET PAYLOAD_HASH = ?, SYNCED = 0 WHERE API_DATE = ?",
+            (digest, api_date),
+        )
+        self.conn.commit()
+
+    def seed(self, rows, synced):
+        """Bulk-insert existing ledger rows (dicts keyed by LEDGER_COLUMNS)."""
+        self.conn.executemany(
+            f"""
+            INSERT OR IGNORE INTO INGESTION_LEDGER ({', '.join(LEDGER_COLUMNS)}, SYNCED)
+            VALUES ({', '.join(['?'] * (len(LEDGER_COLUMNS) + 1))})
+            """,
+            [tuple(row.get(c) for c in LEDGER_COLUMNS) + (int(synced),) for row in rows],
+        )
+        self.conn.commit()
+
+    def pending_dates(self):
+        """Dates loaded or revised since dbt last processed them, oldest first."""
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT API_DATE FROM INGESTION_LEDGER WHERE DBT_PROCESSED_AT IS NULL ORDER BY API_DATE"
+            )
+        ]
+
+    def mark_processed(self, dates):
+        now = pendulum.now("UTC").to_datetime_string()
+        self.conn.executemany(
+            "UPDATE INGESTION_LEDGER SET DBT_PROCESSED_AT = ?, SYNCED = 0 WHERE API_DATE = ?",
+            [(now, d) for d in dates],
+        )
+        self.conn.commit()
+
+    def unsynced_rows(self):
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(LEDGER_COLUMNS)} FROM INGESTION_LEDGER WHERE SYNCED = 0"
+        )
+        return [dict(zip(LEDGER_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def mark_synced(self, dates):
+        self.conn.executemany(
+            "UPDATE INGESTION_LEDGER SET SYNCED = 1 WHERE API_DATE = ?", [(d,) for d in dates]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def open_ledger(client, path=INGESTION_LEDGER_DB):
+    """
+    Open the local ledger, bootstrapping an empty one from the warehouse.
+
+    The ADMIN.INGESTION_LEDGER mirror is preferred; before the ledger existed
+    only checkpoints are available, so those dates are seeded without a hash
+    and treated as already processed by dbt.
+    """
+    ledger = IngestionLedger(path)
+    if not ledger.is_empty():
+        return ledger
+
+    rows = client.get_ledger_rows()
+    if rows:
+        print(f"Seeding local ledger with {len(rows)} dates from ADMIN.INGESTION_LEDGER.")
+        ledger.seed(rows, synced=True)
+        return ledger
+
+    now = pendulum.now("UTC").to_datetime_string()
+    rows = [
+        {"API_DATE": d, "DBT_PROCESSED_AT": now}
+        for d in sorted(client.get_completed_dates())
+    ]
+    print(f"Seeding local ledger with {len(rows)} completed dates from checkpoints.")
+    # Not in the mirror yet, so leave them unsynced
+    ledger.seed(rows, synced=False)
+    return ledger
+
+
+def sync_ledger(client, ledger):
+    """Mirror changed ledger rows to ADMIN.INGESTION_LEDGER; returns rows synced."""
+    rows = ledger.unsynced_rows()
+    if rows:
+        client.merge_ledger_rows(rows)
+        ledger.mark_synced([row["API_DATE"] for row in rows])
+    return len(rows)
@@ -0,0 +1,221 @@
+# src/instrumentation.py
+# Lightweight spans and counters for per-stage pipeline timings, exported as JSON logs and Prometheus text.
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from src.config import lookup_stats, settings
+
+PROMETHEUS_FILE = "pipeline_metrics.prom"
+
+
+class _NullSpan:
+    """Shared no-op span returned while instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class RunMetrics:
+    """Span durations and counters collected for a single pipeline run."""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.durations = defaultdict(list)
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add_duration(self, stage, seconds):
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    def incr(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self):
+        """Aggregate span durations into per-stage count/total/p50/p99/max."""
+        stages = {}
+        for stage, values in self.durations.items():
+            ordered = sorted(values)
+            stages[stage] = {
+                "count": len(ordered),
+                "total_seconds": round(sum(ordered), 6),
+                "p50_seconds": round(percentile(ordered, 50), 6),
+                "p99_seconds": round(percentile(ordered, 99), 6),
+                "max_seconds": round(ordered[-1], 6),
+            }
+        return {
+            "run_id": self.run_id,
+            "wall_seconds": round(time.time() - self.started_at, 6),
+            "stages": stages,
+            "counters": dict(self.counters),
+        }
+
+
+class _Span:
+    """Times a block of work and attributes it to a stage of the active run."""
+
+    def __init__(self, run, stage, attrs):
+        self.run = run
+        self.stage = stage
+        self.attrs = attrs
+
+    def __enter__(self):
+        for hook in _stage_hooks:
+            hook.enter(self.stage, self.attrs)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        for hook in reversed(_stage_hooks):
+            hook.exit(self.stage, self.attrs)
+        if self.run is None:
+            return False
+        self.run.add_duration(self.stage, seconds)
+        log = {
+            "event": "span",
+            "run_id": self.run.run_id,
+            "stage": self.stage,
+            "seconds": round(seconds, 6),
+            "status": "error" if exc_type else "ok",
+            **self.attrs,
+        }
+        print(json.dumps(log, default=str))
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes (e.g. row counts) discovered inside the span."""
+        self.attrs.update(attrs)
+
+
+_active_run = None
+# Objects with enter(stage, attrs) / exit(stage, attrs), e.g. the profiler
+_stage_hooks = []
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def start_run(run_id, enabled=None):
+    """Begin collecting metrics for a run; a no-op unless instrumentation is enabled."""
+    global _active_run
+    if not (settings.pipeline.metrics_enabled if enabled is None else enabled):
+        _active_run = None
+        return None
+    _active_run = RunMetrics(run_id)
+    return _active_run
+
+
+def span(stage, **attrs):
+    """Context manager timing a stage of the active run."""
+    if _active_run is None and not _stage_hooks:
+        return _NULL_SPAN
+    return _Span(_active_run, stage, attrs)
+
+
+def add_stage_hook(hook):
+    """Notify `hook` on every span enter/exit, even when metrics are disabled."""
+    _stage_hooks.append(hook)
+
+
+def remove_stage_hook(hook):
+    if hook in _stage_hooks:
+        _stage_hooks.remove(hook)
+
+
+def incr(name, value=1):
+    """Add to a run-level counter (rows, bytes, retries, sleep seconds, ...)."""
+    if _active_run is not None:
+        _active_run.incr(name, value)
+
+
+def _prometheus_text(summary):
+    """Render a run summary in the Prometheus text exposition format."""
+    run_id = summary["run_id"]
+    lines = [
+        "# HELP pipeline_stage_seconds_total Time spent in each pipeline stage.",
+        "# TYPE pipeline_stage_seconds_total counter",
+    ]
+    for stage, stats in sorted(summary["stages"].items()):
+        lines.append(
+            f'pipeline_stage_seconds_total{{run_id="{run_id}",stage="{stage}"}} {stats["total_seconds"]}'
+        )
+    lines += [
+        "# HELP pipeline_stage_calls_total Number of times each pipeline stage ran.",
+        "# TYPE pipeline_stage_calls_total counter",
+    ]
+    for stage, stats in sorted(summary["stages"].items()):
+        lines.append(
+            f'pipeline_stage_calls_total{{run_id="{run_id}",stage="{stage}"}} {stats["count"]}'
+        )
+    for name, value in sorted(summary["counters"].items()):
+        metric = f"pipeline_{name}_total"
+        lines += [f"# TYPE {metric} counter", f'{metric}{{run_id="{run_id}"}} {value}']
+    lines += [
+        "# TYPE pipeline_run_wall_seconds gauge",
+        f'pipeline_run_wall_seconds{{run_id="{run_id}"}} {summary["wall_seconds"]}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def finish_run(metrics_dir=None):
+    """
+    Export the active run's metrics and stop collecting.
+
+    Writes <run_id>.json (under PIPELINE_METRICS_DIR unless metrics_dir is given) with the full summary and overwrites the
+    Prometheus textfile so a scraper always sees the latest run.
+
+    Returns:
+        dict | None: Run summary, or None if instrumentation was disabled.
+    """
+    global _active_run
+    run, _active_run = _active_run, None
+    if run is None:
+        return None
+
+    # Config lookups this process made against the Airflow metastore (see src/config.py)
+    run.incr("config_metastore_queries", lookup_stats()["metastore_queries"])
+    summary = run.summary()
+    print(json.dumps({"event": "run_summary", **summary}))
+
+    metrics_dir = metrics_dir or settings.pipeline.metrics_dir
+    os.makedirs(metrics_dir, exist_ok=True)
+    with open(os.path.join(metrics_dir, f"{run.run_id}.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    prom_path = os.path.join(metrics_dir, PROMETHEUS_FILE)
+    # One temp file per writer: parallel DAG tasks finish runs at the same time
+    fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, prefix=f"{PROMETHEUS_FILE}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(_prometheus_text(summary))
+        # mkstemp creates 0600; the node exporter reads the file as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, prom_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return summary
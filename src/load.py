@@ -3,13 +3,35 @@
 
 import pandas as pd
 from pendulum import parse
+from src.instrumentation import span
+from src.security_master import open_security_master, sync_security_master
 from src.snowflake_client import SnowflakeClient
+from src.validation import validate_batch
 
-# Shared client for load operations
-snowflake_client = SnowflakeClient()
+# Shared client for load operations (created on first use so stand-ins can be swapped in)
+snowflake_client = None
 
+# Ticker -> SECURITY_ID index, loaded once per process
+security_master = None
 
-def load_data(df, date_str, run_id):
+
+def get_snowflake_client():
+    """Return the shared load client, connecting on first use."""
+    global snowflake_client
+    if snowflake_client is None:
+        snowflake_client = SnowflakeClient(component="ingestion")
+    return snowflake_client
+
+
+def get_security_master():
+    """Return the shared security master, loading it on first use."""
+    global security_master
+    if security_master is None:
+        security_master = open_security_master(get_snowflake_client())
+    return security_master
+
+
+def load_data(df, date_str, run_id, replace=False):
     """
     Load extracted Polygon data into Snowflake and record checkpoints.
 
@@ -17,11 +39,16 @@ def load_data(df, date_str, run_id):
         df (pd.DataFrame): DataFrame returned by the Polygon API.
         date_str (str): Trading date being processed (YYYY-MM-DD).
         run_id (str): Pipeline execution identifier.
+        replace (bool): Delete the date's existing rows first (revised payloads).
+
+    Returns:
+        bool: True if the date was loaded and checkpointed as completed.
     """
     if df is None or df.empty:
         print(f"No data to load for {date_str}")
-        return
+        return False
 
+    snowflake_client = get_snowflake_client()
     total_tickers = len(df["T"].unique()) if "T" in df.columns else 0
 
     # Record "started" checkpoint
@@ -32,7 +59,69 @@ def load_data(df, date_str, run_id):
         total_tickers=total_tickers
     )
 
-    # Normalize and enrich DataFrame before writing
+    with span("load.normalize", date=date_str, rows=len(df)):
+        df = normalize_grouped_daily(df, date_str)
+
+    # Only clean bars reach DAILY_STOCKS; the rest are kept with reason codes
+    with span("load.validate", date=date_str, rows=len(df)) as validate_span:
+        df, quarantined, validation_counts = validate_batch(df)
+        validate_span.set(quarantined=len(quarantined))
+
+    # Key clean rows by security; new listings are registered and persisted
+    # before any row references their SECURITY_ID
+    if not df.empty:
+        master = get_security_master()
+        tickers = df["T"].to_numpy(dtype=object)
+        master.assign(tickers, date_str)
+        sync_security_master(snowflake_client, master)
+        # Looked up after the sync, which may adopt a concurrently registered id
+        df = df.assign(SECURITY_ID=master.assign(tickers, date_str))
+
+    if replace:
+        snowflake_client.delete_date("DAILY_STOCKS", date_str)
+        snowflake_client.delete_date("DAILY_STOCKS_QUARANTINE", date_str)
+
+    # Write to Snowflake (a batch that is entirely quarantined still completes)
+    if df.empty:
+        success, rows_inserted = True, 0
+    else:
+        success, rows_inserted = snowflake_client.write_dataframe(df, "DAILY_STOCKS")
+
+    if success and not quarantined.empty:
+        quarantined["RUN_ID"] = run_id
+        quarantine_ok, _ = snowflake_client.write_dataframe(quarantined, "DAILY_STOCKS_QUARANTINE")
+        if not quarantine_ok:
+            print(f"Failed to write {len(quarantined)} quarantined rows for {date_str}")
+        summary = ", ".join(f"{code}={n}" for code, n in validation_counts.items() if n)
+        print(f"Quarantined {len(quarantined)} rows for {date_str} ({summary})")
+
+    # Record checkpoint status
+    if success:
+        snowflake_client.record_checkpoint(
+            run_id=run_id,
+            api_date=parse(date_str),
+            status="completed",
+            total_tickers=total_tickers,
+            rows_inserted=rows_inserted,
+            rows_quarantined=len(quarantined),
+            validation_counts=validation_counts
+        )
+        print(f"Successfully saved {rows_inserted} records for {date_str}")
+        return True
+    else:
+        snowflake_client.record_checkpoint(
+            run_id=run_id,
+            api_date=parse(date_str),
+            status="failed",
+            total_tickers=total_tickers,
+            error_message="Failed to insert data into Snowflake"
+        )
+        print(f"Failed to save data for {date_str}")
+        return False
+
+
+def normalize_grouped_daily(df, date_str):
+    """Map a Polygon grouped daily payload onto the DAILY_STOCKS schema."""
     # Rename timestamp column from Polygon ("t") to Snowflake ("TS")
     df = df.rename(columns={"t": "TS"})
 
@@ -75,25 +164,4 @@ def load_data(df, date_str, run_id):
             except (TypeError, AttributeError):
                 pass
 
-    # Write to Snowflake
-    success, rows_inserted = snowflake_client.write_dataframe(df, "DAILY_STOCKS")
-
-    # Record checkpoint status
-    if success:
-        snowflake_client.record_checkpoint(
-            run_id=run_id,
-            api_date=parse(date_str),
-            status="completed",
-            total_tickers=total_tickers,
-            rows_inserted=rows_inserted
-        )
-        print(f"Successfully saved {rows_inserted} records for {date_str}")
-    else:
-        snowflake_client.record_checkpoint(
-            run_id=run_id,
-            api_date=parse(date_str),
-            status="failed",
-            total_tickers=total_tickers,
-            error_message="Failed to insert data into Snowflake"
-        )
-        print(f"Failed to save data for {date_str}")
+    return df
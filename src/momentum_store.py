@@ -0,0 +1,202 @@
+# src/momentum_store.py
+# Materializes FCT_TRADING_MOMENTUM into a security-sorted Arrow file that the dashboard memory-maps.
+
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+import pendulum
+import pyarrow as pa
+import pyarrow.compute as pc
+from src.config import MARTS_SCHEMA, MOMENTUM_STORE_DIR, SNOWFLAKE
+from src.snowflake_client import SnowflakeClient
+
+STORE_FILE = "fct_trading_momentum.arrow"
+
+# Schema metadata key holding the ticker -> (offset, length) index
+INDEX_METADATA_KEY = b"ticker_index"
+
+# Same trailing window the incremental dbt models rewrite on every run
+REFRESH_LOOKBACK_DAYS = 4
+
+MOMENTUM_COLUMNS = [
+    "SECURITY_ID",
+    "TICKER",
+    "TRADE_DATE",
+    "OPEN",
+    "HIGH",
+    "LOW",
+    "CLOSE",
+    "YESTERDAY_CLOSE",
+    "VOLUME",
+    "SMA_20",
+    "SMA_50",
+    "SMA_200",
+    "RSI",
+    "REL_VOL",
+    "HIGH_52WEEK",
+    "LOW_52WEEK",
+    "BULLISH_CROSSOVER",
+    "GOLDEN_CROSS",
+    "DEATH_CROSS",
+]
+
+
+def read_store(store_dir=MOMENTUM_STORE_DIR):
+    """Return the materialized momentum table, or None if the store has not been built."""
+    path = os.path.join(store_dir, STORE_FILE)
+    if not os.path.exists(path):
+        return None
+    with pa.memory_map(path, "r") as source:
+        # Copy into process memory: the file is replaced underneath us on refresh
+        return pa.ipc.open_file(source).read_all().combine_chunks()
+
+
+def build_ticker_index(table):
+    """
+    Build the ticker -> (offset, length) index for a table sorted by security_id, trade_date.
+
+    Every ticker a security traded under points at its whole series, so a
+    renamed company's history is found under either ticker. If a ticker was
+    reused, the newer security (higher security_id) wins.
+
+    Args:
+        table (pa.Table): Momentum rows sorted by security_id then trade_date.
+
+    Returns:
+        dict: Mapping of ticker to [row offset, row count].
+    """
+    if table.num_rows == 0:
+        return {}
+
+    ids = table.column("security_id").to_numpy()
+    tickers = table.column("ticker").to_numpy(zero_copy_only=False)
+    starts = np.concatenate(([0], np.flatnonzero(ids[1:] != ids[:-1]) + 1))
+    lengths = np.diff(np.append(starts, len(ids)))
+    # One run per (security, ticker) stretch; map each to its security's block
+    runs = np.concatenate(([0], np.flatnonzero((ids[1:] != ids[:-1]) | (tickers[1:] != tickers[:-1])) + 1))
+    blocks = np.searchsorted(starts, runs, side="right") - 1
+    return {
+        tickers[run]: [int(starts[block]), int(lengths[block])]
+        for run, block in zip(runs, blocks)
+    }
+
+
+def _fetch_rows(client, since=None, security_ids=()):
+    """
+    Fetch momentum rows from the mart, optionally only from a given trade date
+    onward plus the whole history of the given securities.
+    """
+    where, params = "", None
+    if since:
+        where = "WHERE TRADE_DATE >= %s"
+        params = [since]
+        if security_ids:
+            where += f" OR SECURITY_ID IN ({', '.join(['%s'] * len(security_ids))})"
+            params.extend(security_ids)
+    query = f"""
+        SELECT {", ".join(MOMENTUM_COLUMNS)}
+        FROM {SNOWFLAKE['database']}.{MARTS_SCHEMA}.FCT_TRADING_MOMENTUM
+        {where}
+    """
+    table = client.fetch_arrow(query, params)
+    if table is None:
+        return None
+    return table.rename_columns([name.lower() for name in table.column_names])
+
+
+def write_store(table, store_dir=MOMENTUM_STORE_DIR):
+    """
+    Sort, index, and atomically publish the momentum table.
+
+    The index is embedded in the Arrow schema metadata so readers never see
+    a table and an index from two different refreshes.
+
+    Args:
+        table (pa.Table): Momentum rows in any order.
+        store_dir (Path | str): Directory shared with the Streamlit processes.
+
+    Returns:
+        str: Path of the published store file.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    table = table.sort_by([("security_id", "ascending"), ("trade_date", "ascending")]).combine_chunks()
+
+    index = build_ticker_index(table)
+    metadata = {
+        INDEX_METADATA_KEY: json.dumps(index).encode("utf-8"),
+        b"refreshed_at": pendulum.now("UTC").to_iso8601_string().encode("utf-8"),
+    }
+    table = table.replace_schema_metadata(metadata)
+
+    path = os.path.join(store_dir, STORE_FILE)
+    # One temp file per writer: a manual refresh may overlap the DAG's
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, prefix=f"{STORE_FILE}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        # Uncompressed IPC file: readers memory-map it and slice without decoding
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # mkstemp creates 0600; other services on the host read the file too
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def refresh_store(store_dir=MOMENTUM_STORE_DIR, changed_dates=None, adjusted_security_ids=None):
+    """
+    Incrementally refresh the local momentum store from Snowflake.
+
+    Only rows inside the trailing incremental window are re-fetched; older
+    rows are carried over from the existing store file. When the ingestion
+    ledger's changed dates are given, the window starts at the earliest one
+    instead (matching what the incremental dbt models rewrote). Securities
+    re-adjusted for a split are replaced in full.
+    """
+    adjusted_security_ids = sorted(adjusted_security_ids or [])
+    existing = read_store(store_dir)
+
+    client = SnowflakeClient(component="momentum_store", stage="refresh", ensure_objects=False)
+    try:
+        if existing is None or existing.num_rows == 0 or "security_id" not in existing.column_names:
+            # Stores written before security_id existed are rebuilt once
+            print("No momentum store found; materializing full history.")
+            table = _fetch_rows(client)
+        else:
+            max_date = pc.max(existing.column("trade_date")).as_py()
+            since = max_date - timedelta(days=REFRESH_LOOKBACK_DAYS)
+            if changed_dates:
+                since = min(since, pendulum.parse(min(changed_dates)).date())
+            print(f"Refreshing momentum store from {since} (store through {max_date}).")
+            if adjusted_security_ids:
+                print(f"Replacing the full history of {len(adjusted_security_ids)} re-adjusted securities.")
+            fresh = _fetch_rows(client, since=since, security_ids=adjusted_security_ids)
+            keep = pc.less(existing.column("trade_date"), pa.scalar(since))
+            if adjusted_security_ids:
+                ids = existing.column("security_id")
+                adjusted = pc.is_in(ids, value_set=pa.array(adjusted_security_ids, type=ids.type))
+                keep = pc.and_(keep, pc.invert(adjusted))
+            kept = existing.filter(keep)
+            table = kept if fresh is None else pa.concat_tables(
+                [kept.replace_schema_metadata(None), fresh.cast(kept.schema.remove_metadata())]
+            )
+    finally:
+        client.close()
+
+    if table is None or table.num_rows == 0:
+        print("No momentum rows available; store not written.")
+        return None
+
+    path = write_store(table, store_dir)
+    print(f"Momentum store refreshed with {table.num_rows} rows at {path}")
+    return path
+
+
+if __name__ == "__main__":
+    refresh_store()
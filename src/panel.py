@@ -0,0 +1,392 @@
+# src/panel.py
+# Read API returning wide ticker × date panels from the marts, with a local Arrow result cache.
+#
+# Usage:
+#   from src.panel import get_panel
+#   panel = get_panel(["AAPL", "MSFT"], "2022-01-01", "2024-12-31", ["close", "rsi"])
+#   panel["close"]            # np.ndarray, dates × tickers (NaN where a ticker has no row)
+#   panel.to_arrow("rsi")     # pa.Table: trade_date + one column per ticker
+#
+#   python -m src.panel AAPL MSFT --start 2024-01-01 --end 2024-06-30 --fields close rsi
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from src.config import MARTS_SCHEMA, PANEL_CACHE_DIR, SNOWFLAKE
+from src.instrumentation import incr, span
+
+# Source name -> mart table, date column, and whether rows are keyed by ticker.
+# "history" sources keep their rows once built, so a cached range stays valid
+# up to the earliest date dbt reprocessed since (see _reusable_until).
+SOURCES = {
+    "momentum": {
+        "table": "FCT_TRADING_MOMENTUM",
+        "date_column": "TRADE_DATE",
+        "by_ticker": True,
+        "history": True,
+    },
+    "securities": {
+        "table": "DIM_SECURITIES_CURRENT",
+        "date_column": "LATEST_TRADE_DATE",
+        "by_ticker": True,
+        "history": False,
+    },
+    "breadth": {
+        "table": "AGG_DAILY_MARKET_BREADTH",
+        "date_column": "TRADE_DATE",
+        "by_ticker": False,
+        "history": True,
+    },
+    # Rollup bars are dated by their period's last session, so the open
+    # period's row is invalidated with every day folded into it
+    "weekly": {
+        "table": "FCT_BARS_WEEKLY",
+        "date_column": "PERIOD_END",
+        "by_ticker": True,
+        "history": True,
+    },
+    "monthly": {
+        "table": "FCT_BARS_MONTHLY",
+        "date_column": "PERIOD_END",
+        "by_ticker": True,
+        "history": True,
+    },
+}
+
+# Column label of panels from sources without a ticker dimension
+MARKET_COLUMN = "MARKET"
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_EPOCH = np.datetime64(0, "D")
+
+
+class Panel:
+    """
+    Wide panel: one float64 dates × tickers matrix per field.
+
+    Args:
+        dates (np.ndarray): Sorted datetime64[D] row labels.
+        tickers (list[str]): Column labels, in request order.
+        values (dict[str, np.ndarray]): field -> (len(dates), len(tickers)) matrix.
+    """
+
+    def __init__(self, dates, tickers, values):
+        self.dates = dates
+        self.tickers = tickers
+        self.values = values
+
+    @property
+    def fields(self):
+        return list(self.values)
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.tickers)
+
+    def __getitem__(self, field):
+        return self.values[field.lower()]
+
+    def to_arrow(self, field):
+        """One field as an Arrow table: trade_date plus one column per ticker."""
+        matrix = self[field]
+        columns = {"trade_date": pa.array(self.dates, type=pa.date32())}
+        columns.update({ticker: matrix[:, i] for i, ticker in enumerate(self.tickers)})
+        return pa.table(columns)
+
+
+def _check_identifiers(names, what):
+    for name in names:
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Invalid {what}: {name!r}")
+
+
+def _cache_path(cache_dir, source, tickers, fields):
+    """Cache file for a (source, tickers, fields) query; the date range is handled inside it."""
+    key = json.dumps([source, sorted(tickers), sorted(fields)], separators=(",", ":"))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(cache_dir, source, f"{digest}.arrow")
+
+
+def _read_cache(path):
+    """Return (rows, metadata) for a cached query, or (None, None)."""
+    if not os.path.exists(path):
+        return None, None
+    # Read into process memory: the file may be replaced by another request
+    with pa.OSFile(path, "rb") as source:
+        table = pa.ipc.open_file(source).read_all()
+    meta = json.loads(table.schema.metadata[b"panel_cache"])
+    return table.replace_schema_metadata(None), meta
+
+
+def _write_cache(path, table, meta):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = table.replace_schema_metadata({b"panel_cache": json.dumps(meta).encode("utf-8")})
+    # One temp file per writer: concurrent get_panel calls for the same key must not share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # mkstemp creates 0600; other services on the host read the file too
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def data_version(client, source):
+    """LAST_ALTERED (UTC) of the source's mart table; changes whenever dbt rewrites it."""
+    database = SNOWFLAKE["database"]
+    client.cursor.execute(
+        f"""
+        SELECT LAST_ALTERED
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+        """,
+        (MARTS_SCHEMA.upper(), SOURCES[source]["table"]),
+    )
+    row = client.cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    last_altered = row[0]
+    if last_altered.tzinfo is not None:
+        # The ledger stores UTC wall-clock timestamps
+        last_altered = last_altered.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_altered.isoformat()
+
+
+def _reusable_until(client, source, cached_version):
+    """
+    Earliest date whose cached rows may be stale after a rebuild, or None if
+    nothing cached can be trusted.
+
+    Incremental models rewrite every date from the earliest one the ingestion
+    ledger reported as changed, so older cached rows are still current, unless
+    a split re-adjusted some security's whole history in the meantime.
+    """
+    if not SOURCES[source]["history"] or cached_version is None:
+        return None
+    client.cursor.execute(
+        f"""
+        SELECT COUNT(*) FROM {SNOWFLAKE['schema']}.CORPORATE_ACTIONS
+        WHERE ACTION_TYPE = 'SPLIT' AND DBT_PROCESSED_AT > %s::TIMESTAMP_NTZ
+        """,
+        (cached_version,),
+    )
+    row = client.cursor.fetchone()
+    if row and row[0]:
+        return None
+    client.cursor.execute(
+        "SELECT MIN(API_DATE) FROM ADMIN.INGESTION_LEDGER WHERE DBT_PROCESSED_AT > %s::TIMESTAMP_NTZ",
+        (cached_version,),
+    )
+    row = client.cursor.fetchone()
+    # A rebuild without ledger changes (e.g. --full-refresh) may have changed anything
+    return row[0].isoformat() if row and row[0] else None
+
+
+def _fetch(client, source, tickers, fields, start, end):
+    """Run the pushed-down query: only the requested tickers, dates and columns."""
+    spec = SOURCES[source]
+    date_column = spec["date_column"]
+    mart = f"{SNOWFLAKE['database']}.{MARTS_SCHEMA}.{spec['table']}"
+    columns = ", ".join(f"f.{field.upper()}" for field in fields)
+    params = []
+
+    if spec["by_ticker"]:
+        placeholders = ", ".join(["%s"] * len(tickers))
+        # Resolve requested tickers through the security master so a renamed
+        # company's full history is returned under the requested ticker
+        query = f"""
+            SELECT m.TICKER AS TICKER, f.{date_column} AS TRADE_DATE, {columns}
+            FROM {mart} f
+            INNER JOIN (
+                SELECT DISTINCT SECURITY_ID, TICKER
+                FROM {SNOWFLAKE['schema']}.SECURITY_MASTER
+                WHERE TICKER IN ({placeholders})
+            ) m
+                ON f.SECURITY_ID = m.SECURITY_ID
+            WHERE f.{date_column} BETWEEN %s AND %s
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY m.TICKER, f.{date_column} ORDER BY f.SECURITY_ID DESC
+            ) = 1
+        """
+        params.extend(tickers)
+    else:
+        query = f"""
+            SELECT '{MARKET_COLUMN}' AS TICKER, f.{date_column} AS TRADE_DATE, {columns}
+            FROM {mart} f
+            WHERE f.{date_column} BETWEEN %s AND %s
+        """
+    params.extend([start, end])
+
+    with span("panel.fetch", source=source, start=start, end=end) as fetch_span:
+        table = client.fetch_arrow(query, tuple(params))
+        rows = 0 if table is None else table.num_rows
+        fetch_span.set(rows=rows)
+    incr("panel_rows_fetched", rows)
+
+    names = ["ticker", "trade_date"] + [field.lower() for field in fields]
+    if table is None:
+        return pa.table(
+            {name: pa.array([], type=t) for name, t in zip(
+                names, [pa.string(), pa.date32()] + [pa.float64()] * len(fields)
+            )}
+        )
+    table = table.rename_columns(names)
+    # Uniform types so cached and freshly fetched slices concatenate
+    return pa.table(
+        [table.column("ticker").cast(pa.string()), table.column("trade_date").cast(pa.date32())]
+        + [table.column(name).cast(pa.float64()) for name in names[2:]],
+        names=names,
+    )
+
+
+def _between(table, start, end):
+    days = table.column("trade_date").cast(pa.int32())
+    lo = int((np.datetime64(start, "D") - _EPOCH).astype(int))
+    hi = int((np.datetime64(end, "D") - _EPOCH).astype(int))
+    return table.filter(pc.and_(pc.greater_equal(days, lo), pc.less_equal(days, hi)))
+
+
+def _shift(day, days):
+    return str(np.datetime64(day, "D") + np.timedelta64(days, "D"))
+
+
+def pivot_panel(table, tickers, fields):
+    """Pivot long (ticker, trade_date, fields...) rows into dates × tickers matrices."""
+    if table.num_rows == 0:
+        empty = np.empty((0, len(tickers)))
+        return Panel(np.array([], dtype="datetime64[D]"), list(tickers), {f: empty.copy() for f in fields})
+    days = table.column("trade_date").cast(pa.int32()).to_numpy()
+    dates, row_index = np.unique(days, return_inverse=True)
+
+    order = np.argsort(np.asarray(tickers, dtype=object))
+    sorted_tickers = np.asarray(tickers, dtype=object)[order]
+    row_tickers = table.column("ticker").to_numpy(zero_copy_only=False)
+    col_index = order[np.searchsorted(sorted_tickers, row_tickers)]
+
+    values = {}
+    for field in fields:
+        matrix = np.full((len(dates), len(tickers)), np.nan)
+        matrix[row_index, col_index] = table.column(field).to_numpy(zero_copy_only=False)
+        values[field] = matrix
+    return Panel(_EPOCH + dates.astype("timedelta64[D]"), list(tickers), values)
+
+
+def get_panel(tickers, start, end, fields, source="momentum", cache_dir=None, client=None, use_cache=True):
+    """
+    Fetch a wide panel of mart fields for tickers over a date range.
+
+    Filters and the column list are pushed down to Snowflake. Results are
+    cached on disk per (source, tickers, fields) together with the mart's
+    data version and the cached date range:
+
+    - same version, range covered: served from the cache without a query;
+    - same version, range extends past the cache: only the missing head/tail
+      dates are fetched and merged into the cache;
+    - new version: cached dates older than the earliest date dbt reprocessed
+      are kept and only the rest is re-fetched.
+
+    Args:
+        tickers (list[str] | None): Tickers (ignored for "breadth").
+        start (str): First date (YYYY-MM-DD).
+        end (str): Last date (YYYY-MM-DD).
+        fields (list[str]): Numeric mart columns, e.g. ["close", "rsi"].
+        source (str): "momentum", "securities" or "breadth".
+        cache_dir (str | Path | None): Cache root (default PANEL_CACHE_DIR).
+        client: SnowflakeClient to reuse (default: a new panel client).
+        use_cache (bool): Skip the cache entirely when False.
+
+    Returns:
+        Panel
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source {source!r}; expected one of {sorted(SOURCES)}")
+    spec = SOURCES[source]
+    tickers = list(dict.fromkeys(tickers or [])) if spec["by_ticker"] else [MARKET_COLUMN]
+    if not tickers:
+        raise ValueError(f"Source {source!r} needs at least one ticker.")
+    fields = [field.lower() for field in fields]
+    _check_identifiers(fields, "field")
+    start, end = str(start)[:10], str(end)[:10]
+
+    owns_client = client is None
+    if owns_client:
+        from src.snowflake_client import SnowflakeClient
+
+        client = SnowflakeClient(component="panel", stage=source, ensure_objects=False)
+    try:
+        with span("panel.get", source=source, tickers=len(tickers), fields=len(fields)):
+            if not use_cache:
+                return pivot_panel(_fetch(client, source, tickers, fields, start, end), tickers, fields)
+
+            path = _cache_path(cache_dir or PANEL_CACHE_DIR, source, tickers, fields)
+            version = data_version(client, source)
+            cached, meta = _read_cache(path)
+            changed = True
+
+            if cached is not None and meta["version"] != version:
+                keep_before = _reusable_until(client, source, meta["version"])
+                if keep_before is None or keep_before <= meta["start"]:
+                    cached = None
+                else:
+                    cached = _between(cached, meta["start"], _shift(keep_before, -1))
+                    meta = {"version": version, "start": meta["start"], "end": _shift(keep_before, -1)}
+                incr("panel_cache_invalidations")
+
+            if cached is None or end < meta["start"] or start > meta["end"]:
+                # Nothing reusable for this range: fetch it and start a new cache entry
+                rows = _fetch(client, source, tickers, fields, start, end)
+                meta = {"version": version, "start": start, "end": end}
+            else:
+                pieces = [cached]
+                if start < meta["start"]:
+                    pieces.append(_fetch(client, source, tickers, fields, start, _shift(meta["start"], -1)))
+                if end > meta["end"]:
+                    pieces.append(_fetch(client, source, tickers, fields, _shift(meta["end"], 1), end))
+                if len(pieces) == 1 and meta["version"] == version:
+                    incr("panel_cache_hits")
+                    changed = False
+                rows = pa.concat_tables(pieces)
+                meta = {"version": version, "start": min(start, meta["start"]), "end": max(end, meta["end"])}
+
+            if changed:
+                _write_cache(path, rows, meta)
+            return pivot_panel(_between(rows, start, end), tickers, fields)
+    finally:
+        if owns_client:
+            client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch a wide panel from the marts")
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--fields", nargs="+", default=["close"])
+    parser.add_argument("--source", choices=sorted(SOURCES), default="momentum")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    panel = get_panel(args.tickers, args.start, args.end, args.fields, source=args.source,
+                      use_cache=not args.no_cache)
+    print(f"{panel.shape[0]} dates × {panel.shape[1]} tickers, fields: {', '.join(panel.fields)}")
+    for field in panel.fields:
+        print(panel.to_arrow(field).slice(max(panel.shape[0] - 5, 0)).to_pandas().to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
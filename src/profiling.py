@@ -0,0 +1,270 @@
+# src/profiling.py
+# Opt-in CPU sampling and tracemalloc/RSS profiling of ingestion runs, written as per-run artifacts.
+
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from src.config import settings
+from src.instrumentation import add_stage_hook, remove_stage_hook
+
+SAMPLE_INTERVAL_SECONDS = 0.01
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 10
+
+_active_profile = None
+
+
+def _rss_bytes():
+    """Current resident set size (Linux /proc), falling back to the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _max_rss_bytes()
+
+
+def _max_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack at a fixed interval.
+
+    Samples are aggregated in the collapsed-stack format used by
+    flamegraph.pl and speedscope, prefixed with the pipeline stage
+    that was open when the sample was taken.
+    """
+
+    def __init__(self, profile, interval):
+        super().__init__(name="pipeline-profiler", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        target = self.profile.thread_id
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None or self.profile.paused:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stages = [f"[{stage}]" for stage in self.profile.open_stages()]
+            self.samples[";".join(stages + stack[::-1])] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class _StageFrame:
+    """Memory accounting for one open span."""
+
+    def __init__(self, stage, date, current):
+        self.stage = stage
+        self.date = date
+        self.start_traced = current
+        self.peak_traced = current
+        self.start_rss = _rss_bytes()
+        self.started = time.perf_counter()
+
+
+class RunProfile:
+    """
+    CPU and memory profile of a single pipeline run.
+
+    Args:
+        run_id (str): Pipeline execution identifier; names the artifact directory.
+        interval (float): Seconds between stack samples.
+    """
+
+    def __init__(self, run_id, interval=SAMPLE_INTERVAL_SECONDS):
+        self.run_id = run_id
+        self.thread_id = threading.get_ident()
+        self.records = []
+        self.date_growth = []
+        self._last_snapshot = None
+        self._stack = []
+        self._lock = threading.Lock()
+        self._sampler = _StackSampler(self, interval)
+        self._profiler = cProfile.Profile()
+        self._owns_tracemalloc = False
+        self.paused = False
+
+    def open_stages(self):
+        with self._lock:
+            return [frame.stage for frame in self._stack]
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        self._sampler.start()
+        self._profiler.enable()
+        return self
+
+    # Stage hooks, called by instrumentation spans on the profiled thread
+
+    def enter(self, stage, attrs):
+        if threading.get_ident() != self.thread_id:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            # Fold the peak so far into every open span before resetting it
+            for frame in self._stack:
+                frame.peak_traced = max(frame.peak_traced, peak)
+            date = attrs.get("date") or (self._stack[-1].date if self._stack else None)
+            self._stack.append(_StageFrame(stage, date, current))
+        tracemalloc.reset_peak()
+
+    def exit(self, stage, attrs):
+        if threading.get_ident() != self.thread_id:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            if not self._stack or self._stack[-1].stage != stage:
+                return
+            frame = self._stack.pop()
+            frame.peak_traced = max(frame.peak_traced, peak)
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak_traced = max(parent.peak_traced, frame.peak_traced)
+
+        rss = _rss_bytes()
+        self.records.append({
+            "stage": stage,
+            "date": frame.date,
+            "seconds": round(time.perf_counter() - frame.started, 6),
+            "allocated_bytes": current - frame.start_traced,
+            "peak_traced_bytes": frame.peak_traced,
+            "rss_bytes": rss,
+            "rss_delta_bytes": rss - frame.start_rss,
+            "max_rss_bytes": _max_rss_bytes(),
+        })
+        if stage == "pipeline.date":
+            self._snapshot_date(frame.date)
+
+    def _snapshot_date(self, date):
+        """Keep the top allocation growth since the previous date."""
+        # Snapshots are expensive; keep them out of the CPU profiles
+        self._profiler.disable()
+        self.paused = True
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            if self._last_snapshot is not None:
+                growth = snapshot.compare_to(self._last_snapshot, "lineno")[:10]
+                self.date_growth.append((date, [str(stat) for stat in growth]))
+            self._last_snapshot = snapshot
+        finally:
+            self.paused = False
+            self._profiler.enable()
+
+    def stop(self, profile_dir):
+        """Stop collection and write all artifacts; returns the artifact directory."""
+        self._profiler.disable()
+        self._sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        self._last_snapshot = None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        out_dir = os.path.join(profile_dir, self.run_id)
+        os.makedirs(out_dir, exist_ok=True)
+
+        self._profiler.dump_stats(os.path.join(out_dir, "cpu.pstats"))
+
+        with open(os.path.join(out_dir, "cpu.folded"), "w") as f:
+            for stack, count in self._sampler.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(os.path.join(out_dir, "stages.jsonl"), "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+        with open(os.path.join(out_dir, "top_allocations.txt"), "w") as f:
+            f.write(f"# Top {TOP_ALLOCATIONS} live allocations at end of run {self.run_id}\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+            for date, growth in self.date_growth:
+                f.write(f"\n# Growth during {date}\n")
+                f.write("\n".join(growth) + "\n")
+
+        summary = self.summary()
+        with open(os.path.join(out_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+
+        print(json.dumps({"event": "profile_written", "run_id": self.run_id, "path": out_dir}))
+        return out_dir
+
+    def summary(self):
+        """Per-stage totals plus the heaviest dates by peak traced memory."""
+        stages = {}
+        for record in self.records:
+            stats = stages.setdefault(record["stage"], {
+                "count": 0, "total_seconds": 0.0, "allocated_bytes": 0, "peak_traced_bytes": 0,
+            })
+            stats["count"] += 1
+            stats["total_seconds"] = round(stats["total_seconds"] + record["seconds"], 6)
+            stats["allocated_bytes"] += record["allocated_bytes"]
+            stats["peak_traced_bytes"] = max(stats["peak_traced_bytes"], record["peak_traced_bytes"])
+
+        dates = [r for r in self.records if r["stage"] == "pipeline.date"]
+        heaviest = sorted(dates, key=lambda r: r["peak_traced_bytes"], reverse=True)[:10]
+        return {
+            "run_id": self.run_id,
+            "cpu_samples": sum(self._sampler.samples.values()),
+            "max_rss_bytes": _max_rss_bytes(),
+            "stages": stages,
+            "heaviest_dates": heaviest,
+        }
+
+
+def start_profile(run_id, enabled=None):
+    """Begin profiling the calling thread; a no-op unless profiling is enabled."""
+    global _active_profile
+    if not (settings.pipeline.profile_enabled if enabled is None else enabled):
+        return None
+    _active_profile = RunProfile(run_id).start()
+    add_stage_hook(_active_profile)
+    return _active_profile
+
+
+def finish_profile(profile_dir=None):
+    """
+    Stop the active profile and write its artifacts under <profile_dir>/<run_id>/
+    (PIPELINE_PROFILE_DIR unless profile_dir is given).
+
+    Artifacts:
+        cpu.pstats           cProfile stats (pstats, snakeviz, gprof2dot)
+        cpu.folded           Sampled stacks by stage (flamegraph.pl, speedscope)
+        stages.jsonl         Time, tracemalloc and RSS per span and date
+        top_allocations.txt  Largest live allocations and per-date growth
+        summary.json         Per-stage totals and the heaviest dates
+
+    Returns:
+        str | None: Artifact directory, or None if profiling was disabled.
+    """
+    global _active_profile
+    profile, _active_profile = _active_profile, None
+    if profile is None:
+        return None
+    remove_stage_hook(profile)
+    return profile.stop(profile_dir or settings.pipeline.profile_dir)
@@ -0,0 +1,49 @@
+# src/query_tags.py
+# Structured Snowflake QUERY_TAG values so warehouse time can be attributed per component and stage.
+
+import json
+
+# Snowflake rejects QUERY_TAG values longer than this
+MAX_QUERY_TAG_LENGTH = 2000
+
+# Keys every tag may carry, in the order they are rendered
+TAG_KEYS = ("component", "stage", "profile", "run_id", "page", "model")
+
+
+def build_query_tag(component, **fields):
+    """
+    Render a compact JSON query tag.
+
+    Args:
+        component (str): Producer of the queries (ingestion, dbt, dashboard, ...).
+        **fields: Optional stage, profile, run_id, page, model and any extra keys; None values are dropped.
+
+    Returns:
+        str: JSON string such as {"component":"ingestion","stage":"load","run_id":"..."}.
+    """
+    tag = {"component": component}
+    ordered = sorted(fields, key=lambda k: (TAG_KEYS.index(k) if k in TAG_KEYS else len(TAG_KEYS), k))
+    for key in ordered:
+        if fields[key] is not None:
+            tag[key] = str(fields[key])
+    rendered = json.dumps(tag, separators=(",", ":"))
+    return rendered[:MAX_QUERY_TAG_LENGTH]
+
+
+def parse_query_tag(query_tag):
+    """
+    Parse a tag produced by build_query_tag.
+
+    Untagged queries map to component "untagged"; free-text tags set by
+    other tools are kept as the component so they still group together.
+    """
+    if not query_tag:
+        return {"component": "untagged"}
+    try:
+        tag = json.loads(query_tag)
+    except (TypeError, ValueError):
+        return {"component": str(query_tag)}
+    if not isinstance(tag, dict):
+        return {"component": str(query_tag)}
+    tag.setdefault("component", "untagged")
+    return tag
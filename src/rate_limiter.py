@@ -0,0 +1,305 @@
+# src/rate_limiter.py
+# Polygon request quota shared by every worker: Redis token bucket, with a file-locked bucket for single-host runs.
+#
+# Usage:
+#   python -m src.rate_limiter status              # tokens available and backend in use
+#   python -m src.rate_limiter usage --day 2025-09-16
+
+import argparse
+import fcntl
+import json
+import os
+import socket
+import sys
+import time
+
+import pendulum
+from src.config import (
+    POLYGON_RATE_BURST,
+    POLYGON_REQUESTS_PER_MINUTE,
+    RATE_LIMITER_PATH,
+    RATE_LIMITER_REDIS_URL,
+)
+
+# Share of the plan limit actually handed out, so clock skew and requests
+# in flight never push Polygon's own count over the limit
+RATE_HEADROOM = 0.9
+
+REDIS_PREFIX = "polygon:quota"
+BUCKET_KEY = f"{REDIS_PREFIX}:bucket"
+
+# Per-consumer usage is kept this long
+USAGE_RETENTION_DAYS = 14
+
+# Reserve `requested` tokens (the balance may go negative: later callers queue
+# behind earlier ones) and return the seconds the caller must wait before
+# using them. Redis' clock is used so workers on different hosts agree.
+#   KEYS: bucket hash, usage hash, wait hash
+#   ARGV: rate per second, capacity, requested, consumer, usage TTL seconds
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated_at, 0) * rate) - requested
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+local wait = 0
+if tokens < 0 then wait = -tokens / rate end
+redis.call('HINCRBY', KEYS[2], ARGV[4], requested)
+redis.call('HINCRBYFLOAT', KEYS[3], ARGV[4], tostring(wait))
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('EXPIRE', KEYS[3], ARGV[5])
+return tostring(wait)
+"""
+
+# Empty the bucket so no worker gets a token for `seconds` (after a 429).
+#   KEYS: bucket hash; ARGV: rate per second, capacity, seconds
+PENALIZE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or tonumber(ARGV[2])
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(tonumber(ARGV[2]), tokens + math.max(now - updated_at, 0) * rate)
+tokens = math.min(tokens, -tonumber(ARGV[3]) * rate)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+return tostring(tokens)
+"""
+
+
+def default_consumer():
+    """Airflow dag.task of the current task, else host:script."""
+    dag_id, task_id = os.getenv("AIRFLOW_CTX_DAG_ID"), os.getenv("AIRFLOW_CTX_TASK_ID")
+    if dag_id and task_id:
+        return f"{dag_id}.{task_id}"
+    return f"{socket.gethostname()}:{os.path.basename(sys.argv[0]) or 'python'}"
+
+
+def _refill(tokens, updated_at, now, rate, capacity):
+    return min(capacity, tokens + max(now - updated_at, 0.0) * rate)
+
+
+class UnlimitedBucket:
+    """Stand-in when no request limit is configured (POLYGON_REQUESTS_PER_MINUTE=0)."""
+
+    backend = "unlimited"
+
+    def acquire(self, consumer=None, tokens=1):
+        return 0.0
+
+    def penalize(self, seconds):
+        pass
+
+    def usage(self, day=None):
+        return {}
+
+    def available(self):
+        return float("inf")
+
+
+class FileTokenBucket:
+    """
+    Token bucket kept in a JSON file and serialized with an exclusive flock.
+
+    Coordinates every process on one host (including containers sharing the
+    mounted data directory); use RedisTokenBucket across hosts.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Largest burst.
+        path (str | Path): State file; the lock is `<path>.lock`.
+    """
+
+    backend = "file"
+
+    def __init__(self, rate, capacity, path=RATE_LIMITER_PATH):
+        self.rate = rate
+        self.capacity = capacity
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def _update(self, change):
+        """Apply `change(state, now)` to the state under the lock and return its result."""
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path) as f:
+                        state = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    state = {}
+                now = time.time()
+                state["tokens"] = _refill(
+                    state.get("tokens", self.capacity), state.get("updated_at", now), now, self.rate, self.capacity
+                )
+                state["updated_at"] = now
+                result = change(state, now)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, self.path)
+                return result
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _reserve(self, consumer, tokens):
+        def change(state, now):
+            state["tokens"] -= tokens
+            wait = max(-state["tokens"] / self.rate, 0.0)
+            day = pendulum.from_timestamp(now).to_date_string()
+            usage = state.setdefault("usage", {})
+            for old_day in sorted(usage)[:-USAGE_RETENTION_DAYS]:
+                del usage[old_day]
+            entry = usage.setdefault(day, {}).setdefault(consumer, {"requests": 0, "wait_seconds": 0.0})
+            entry["requests"] += tokens
+            entry["wait_seconds"] += wait
+            return wait
+
+        return self._update(change)
+
+    def acquire(self, consumer=None, tokens=1):
+        """Block until `tokens` requests may be sent; returns the seconds waited."""
+        wait = self._reserve(consumer or default_consumer(), tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds):
+        """Hold back every consumer for `seconds` (Polygon answered 429)."""
+        def change(state, now):
+            state["tokens"] = min(state["tokens"], -seconds * self.rate)
+
+        self._update(change)
+
+    def usage(self, day=None):
+        """consumer -> {requests, wait_seconds} for a UTC day (default today)."""
+        day = day or pendulum.now("UTC").to_date_string()
+        return self._update(lambda state, now: dict(state.get("usage", {}).get(day, {})))
+
+    def available(self):
+        return self._update(lambda state, now: state["tokens"])
+
+
+class RedisTokenBucket:
+    """
+    Token bucket in Redis, updated atomically by a Lua script.
+
+    Every worker on every host draws from the same bucket; per-consumer
+    request counts and wait time are kept in daily hashes.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (float): Largest burst.
+        client: redis.Redis connection.
+    """
+
+    backend = "redis"
+
+    def __init__(self, rate, capacity, client):
+        self.rate = rate
+        self.capacity = capacity
+        self.client = client
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._penalize = client.register_script(PENALIZE_SCRIPT)
+
+    def _keys(self, day):
+        return [BUCKET_KEY, f"{REDIS_PREFIX}:usage:{day}", f"{REDIS_PREFIX}:wait:{day}"]
+
+    def acquire(self, consumer=None, tokens=1):
+        """Block until `tokens` requests may be sent; returns the seconds waited."""
+        day = pendulum.now("UTC").to_date_string()
+        wait = float(self._acquire(
+            keys=self._keys(day),
+            args=[self.rate, self.capacity, tokens, consumer or default_consumer(),
+                  USAGE_RETENTION_DAYS * 86400],
+        ))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds):
+        """Hold back every consumer for `seconds` (Polygon answered 429)."""
+        self._penalize(keys=[BUCKET_KEY], args=[self.rate, self.capacity, seconds])
+
+    def usage(self, day=None):
+        """consumer -> {requests, wait_seconds} for a UTC day (default today)."""
+        day = day or pendulum.now("UTC").to_date_string()
+        _, usage_key, wait_key = self._keys(day)
+        requests = self.client.hgetall(usage_key)
+        waits = self.client.hgetall(wait_key)
+        return {
+            consumer.decode(): {"requests": int(count), "wait_seconds": float(waits.get(consumer, 0))}
+            for consumer, count in requests.items()
+        }
+
+    def available(self):
+        tokens, updated_at = self.client.hmget(BUCKET_KEY, "tokens", "updated_at")
+        if tokens is None:
+            return self.capacity
+        now = self.client.time()
+        return _refill(float(tokens), float(updated_at), now[0] + now[1] / 1e6, self.rate, self.capacity)
+
+
+_limiter = None
+
+
+def get_rate_limiter():
+    """
+    The process-wide Polygon bucket.
+
+    Redis when RATE_LIMITER_REDIS_URL is set and reachable, otherwise the
+    file-locked bucket at RATE_LIMITER_PATH.
+    """
+    global _limiter
+    if _limiter is not None:
+        return _limiter
+    if not POLYGON_REQUESTS_PER_MINUTE:
+        _limiter = UnlimitedBucket()
+        return _limiter
+
+    rate = POLYGON_REQUESTS_PER_MINUTE * RATE_HEADROOM / 60.0
+    if RATE_LIMITER_REDIS_URL:
+        try:
+            import redis
+
+            client = redis.Redis.from_url(RATE_LIMITER_REDIS_URL, socket_timeout=5)
+            client.ping()
+            _limiter = RedisTokenBucket(rate, POLYGON_RATE_BURST, client)
+            return _limiter
+        except Exception as e:
+            print(f"Redis rate limiter unavailable ({e}); falling back to the local file bucket.")
+    _limiter = FileTokenBucket(rate, POLYGON_RATE_BURST, RATE_LIMITER_PATH)
+    return _limiter
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the shared Polygon request quota")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="Backend, configured rate and tokens available now")
+    usage = sub.add_parser("usage", help="Requests and wait time per consumer for a day")
+    usage.add_argument("--day", help="UTC day (YYYY-MM-DD, default today)")
+    args = parser.parse_args(argv)
+
+    limiter = get_rate_limiter()
+    if args.command == "status":
+        print(f"Backend: {limiter.backend}")
+        print(f"Plan limit: {POLYGON_REQUESTS_PER_MINUTE or 'unlimited'} requests/min "
+              f"(handing out {RATE_HEADROOM:.0%}), burst {POLYGON_RATE_BURST}")
+        print(f"Tokens available: {limiter.available():.2f}")
+        return 0
+
+    rows = sorted(limiter.usage(args.day).items(), key=lambda item: -item[1]["requests"])
+    if not rows:
+        print("No Polygon requests recorded.")
+    for consumer, entry in rows:
+        print(f"{consumer:<48} {entry['requests']:>6} requests  {entry['wait_seconds']:>8.1f}s waiting")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+# src/security_master.py
+# Security master: stable integer SECURITY_IDs with effective-dated ticker/name history.
+#
+# Usage:
+#   python -m src.security_master show META
+#   python -m src.security_master rename FB META 2022-06-09
+#   python -m src.security_master rename-company META 2022-06-09 "Meta Platforms, Inc."
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pendulum
+from src.instrumentation import incr, span
+
+# Open-ended validity, matching stg_russell3000__constituents
+OPEN_END = "3000-01-01"
+# A ticker's first mapping starts here, so backfilled history resolves to the same security
+FLOOR = "1970-01-01"
+
+MASTER_COLUMNS = ["SECURITY_ID", "TICKER", "NAME", "VALID_FROM", "VALID_TO"]
+
+# Tickers per IN list when re-reading newly registered mappings after a sync
+READBACK_BATCH = 1000
+
+
+def _shift(date_str, days):
+    return (date.fromisoformat(date_str) + timedelta(days=days)).isoformat()
+
+
+class SecurityMaster:
+    """
+    Ticker -> SECURITY_ID mappings with effective dates.
+
+    Each ticker's mappings tile the timeline from FLOOR to OPEN_END without
+    gaps, so every (ticker, date) pair resolves to exactly one security. A
+    rename closes the old ticker's mapping and opens the new ticker's with the
+    same SECURITY_ID, keeping one continuous series.
+
+    Rows are keyed by (TICKER, VALID_FROM), which is also the merge key of the
+    warehouse table; changed keys are tracked until `mark_synced`.
+
+    Args:
+        rows (list[dict]): Mappings keyed by MASTER_COLUMNS (dates as YYYY-MM-DD).
+        allocate_ids (callable | None): count -> that many unused SECURITY_IDs
+            (SnowflakeClient.allocate_security_ids). None numbers new securities
+            from this snapshot's highest id, which is only safe for a single writer.
+    """
+
+    def __init__(self, rows=(), allocate_ids=None):
+        # ticker -> {VALID_FROM: row}
+        self.tickers = {}
+        for r in rows:
+            self.tickers.setdefault(r["TICKER"], {})[r["VALID_FROM"]] = dict(r)
+        self.allocate_ids = allocate_ids
+        self.next_id = max((r["SECURITY_ID"] for r in self.all_rows()), default=0) + 1
+        self.dirty = set()
+        # Keys opened by _register since the last sync
+        self.registered = set()
+        self._index = None
+
+    def all_rows(self):
+        return [r for mappings in self.tickers.values() for r in mappings.values()]
+
+    def _put(self, row):
+        self.tickers.setdefault(row["TICKER"], {})[row["VALID_FROM"]] = row
+        self.dirty.add((row["TICKER"], row["VALID_FROM"]))
+        self._index = None
+
+    def _ticker_rows(self, ticker):
+        return [row for _, row in sorted(self.tickers.get(ticker, {}).items())]
+
+    def _index_for(self, as_of):
+        """
+        Hash index of the mappings in effect on `as_of`.
+
+        Built once per date (vectorized over all mappings) and reused for every
+        lookup until the date or the mappings change.
+        """
+        import pandas as pd
+
+        if self._index is not None and self._index[0] == as_of:
+            return self._index[1], self._index[2]
+        rows = self.all_rows()
+        valid_from = np.array([r["VALID_FROM"] for r in rows], dtype="datetime64[D]")
+        valid_to = np.array([r["VALID_TO"] for r in rows], dtype="datetime64[D]")
+        day = np.datetime64(as_of, "D")
+        active = np.flatnonzero((valid_from <= day) & (day <= valid_to))
+        index = pd.Index([rows[i]["TICKER"] for i in active])
+        ids = np.array([rows[i]["SECURITY_ID"] for i in active], dtype=np.int64)
+        self._index = (as_of, index, ids)
+        return index, ids
+
+    def lookup(self, ticker, as_of):
+        """SECURITY_ID of `ticker` on `as_of`, or None if it has never been seen."""
+        index, ids = self._index_for(str(as_of)[:10])
+        position = index.get_indexer([ticker])[0]
+        return int(ids[position]) if position >= 0 else None
+
+    def assign(self, tickers, as_of):
+        """
+        Map a column of tickers to SECURITY_IDs, registering unseen tickers.
+
+        Args:
+            tickers (array-like): Tickers of one session's rows.
+            as_of (str): Session date (YYYY-MM-DD).
+
+        Returns:
+            np.ndarray: int64 SECURITY_ID per input row.
+        """
+        as_of = str(as_of)[:10]
+        with span("security_master.assign", date=as_of, rows=len(tickers)):
+            index, ids = self._index_for(as_of)
+            positions = index.get_indexer(tickers)
+            unknown = positions < 0
+            if unknown.any():
+                new_tickers = sorted(set(np.asarray(tickers, dtype=object)[unknown].tolist()))
+                self.register(new_tickers, as_of)
+                incr("securities_registered", len(new_tickers))
+                index, ids = self._index_for(as_of)
+                positions = index.get_indexer(tickers)
+        return ids[positions]
+
+    def _allocate(self, count):
+        if self.allocate_ids is not None:
+            return list(self.allocate_ids(count))
+        ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        return ids
+
+    def register(self, tickers, as_of):
+        """Open a new security for each ticker with no mapping on `as_of` (ids drawn in one batch)."""
+        for ticker, security_id in zip(tickers, self._allocate(len(tickers))):
+            self._register(ticker, as_of, security_id)
+
+    def _register(self, ticker, as_of, security_id):
+        history = self._ticker_rows(ticker)
+        earlier = [r for r in history if r["VALID_TO"] < as_of]
+        # Reused tickers start the day after the previous holder's mapping ends
+        valid_from = _shift(earlier[-1]["VALID_TO"], 1) if earlier else FLOOR
+        later = [r for r in history if r["VALID_FROM"] > as_of]
+        valid_to = _shift(later[0]["VALID_FROM"], -1) if later else OPEN_END
+        self._put({
+            "SECURITY_ID": security_id, "TICKER": ticker, "NAME": None,
+            "VALID_FROM": valid_from, "VALID_TO": valid_to,
+        })
+        self.registered.add((ticker, valid_from))
+
+    def _split(self, ticker, effective):
+        """Return the mapping of `ticker` in effect on `effective`, split so it starts there."""
+        current = next(
+            (r for r in self._ticker_rows(ticker) if r["VALID_FROM"] <= effective <= r["VALID_TO"]), None
+        )
+        if current is None or current["VALID_FROM"] == effective:
+            return current
+        self._put({**current, "VALID_TO": _shift(effective, -1)})
+        tail = {**current, "VALID_FROM": effective}
+        self._put(tail)
+        return tail
+
+    def record_rename(self, old_ticker, new_ticker, effective, name=None):
+        """
+        Move a security from `old_ticker` to `new_ticker` from `effective` on.
+
+        If the new ticker was already registered as its own security (its rows
+        arrived before the rename was recorded), its mapping from `effective`
+        is re-pointed to the renamed security.
+
+        Returns:
+            int: The security's SECURITY_ID.
+        """
+        effective = str(effective)[:10]
+        previous_day = _shift(effective, -1)
+        old = next(
+            (r for r in self._ticker_rows(old_ticker) if r["VALID_FROM"] <= previous_day <= r["VALID_TO"]), None
+        )
+        if old is None:
+            raise ValueError(f"{old_ticker} has no mapping on {previous_day}.")
+        if any(r["VALID_FROM"] > effective for r in self._ticker_rows(new_ticker)):
+            raise ValueError(f"{new_ticker} has mappings starting after {effective}; resolve them first.")
+
+        security_id = old["SECURITY_ID"]
+        # The old ticker is free from the effective date; a later listing gets a new security
+        self._put({**old, "VALID_TO": previous_day})
+
+        target = self._split(new_ticker, effective)
+        self._put({
+            **(target or {}),
+            "SECURITY_ID": security_id,
+            "TICKER": new_ticker,
+            "NAME": name if name is not None else old["NAME"],
+            "VALID_FROM": effective,
+            "VALID_TO": target["VALID_TO"] if target else OPEN_END,
+        })
+        return security_id
+
+    def record_name_change(self, ticker, effective, name):
+        """Record a company name change for `ticker` from `effective` on."""
+        row = self._split(ticker, str(effective)[:10])
+        if row is None:
+            raise ValueError(f"{ticker} has no mapping on {effective}.")
+        self._put({**row, "NAME": name})
+        return row["SECURITY_ID"]
+
+    def history(self, security_id):
+        """Every mapping of a security, oldest first."""
+        return sorted(
+            (r for r in self.all_rows() if r["SECURITY_ID"] == security_id), key=lambda r: r["VALID_FROM"]
+        )
+
+    def unsynced_rows(self):
+        """Changed mappings; IS_NEW marks those opened by _register."""
+        return [
+            {**self.tickers[ticker][valid_from], "IS_NEW": (ticker, valid_from) in self.registered}
+            for ticker, valid_from in sorted(self.dirty)
+        ]
+
+    def adopt(self, rows):
+        """
+        Take over the warehouse's SECURITY_ID for keys registered here.
+
+        Another loader may have registered the same new ticker first; its
+        mapping wins and this process's rows must use that id.
+
+        Returns:
+            list[str]: Tickers whose SECURITY_ID changed.
+        """
+        changed = []
+        for row in rows:
+            key = (row["TICKER"], row["VALID_FROM"])
+            local = self.tickers.get(row["TICKER"], {}).get(row["VALID_FROM"])
+            if key in self.registered and local is not None and local["SECURITY_ID"] != row["SECURITY_ID"]:
+                local.update(SECURITY_ID=row["SECURITY_ID"], VALID_TO=row["VALID_TO"], NAME=row["NAME"])
+                changed.append(row["TICKER"])
+        if changed:
+            self._index = None
+        return changed
+
+    def mark_synced(self):
+        self.dirty.clear()
+        self.registered.clear()
+
+
+def open_security_master(client):
+    """
+    Load the security master, bootstrapping it from DAILY_STOCKS when empty.
+
+    On first use every distinct ticker already loaded becomes a security
+    (IDs in order of first appearance) and existing rows get their
+    SECURITY_ID backfilled.
+    """
+    with span("security_master.load"):
+        master = SecurityMaster(client.get_security_master(), allocate_ids=client.allocate_security_ids)
+    if master.tickers:
+        return master
+
+    first_seen = client.get_ticker_first_seen()
+    if not first_seen:
+        return master
+    print(f"Seeding security master with {len(first_seen)} tickers from DAILY_STOCKS.")
+    master.register([ticker for ticker, _ in sorted(first_seen.items(), key=lambda item: (item[1], item[0]))],
+                    OPEN_END)
+    sync_security_master(client, master)
+    client.assign_security_ids(missing_only=True)
+    return master
+
+
+def sync_security_master(client, master):
+    """
+    Upsert changed mappings into SECURITY_MASTER; returns rows synced.
+
+    Newly registered tickers are re-read after the merge: when another
+    loader registered one first, its SECURITY_ID is adopted so both
+    processes key the ticker's rows the same way.
+    """
+    rows = master.unsynced_rows()
+    if rows:
+        client.merge_security_master(rows)
+        new_tickers = sorted({r["TICKER"] for r in rows if r["IS_NEW"]})
+        if new_tickers:
+            current = []
+            for i in range(0, len(new_tickers), READBACK_BATCH):
+                current.extend(client.get_security_master(tickers=new_tickers[i:i + READBACK_BATCH]))
+            adopted = master.adopt(current)
+            if adopted:
+                incr("securities_adopted", len(adopted))
+                print(f"Adopted SECURITY_IDs registered concurrently for {len(adopted)} tickers: {adopted}")
+        master.mark_synced()
+    return len(rows)
+
+
+def _print_history(master, security_id):
+    for r in master.history(security_id):
+        print(f"{r['SECURITY_ID']:>8}  {r['TICKER']:<8} {r['VALID_FROM']} → {r['VALID_TO']}  {r['NAME'] or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and maintain the security master")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Print a ticker's security and its ticker history")
+    show.add_argument("ticker")
+    show.add_argument("--as-of", default=pendulum.today().to_date_string())
+    rename = sub.add_parser("rename", help="Record a ticker change and re-key affected rows")
+    rename.add_argument("old_ticker")
+    rename.add_argument("new_ticker")
+    rename.add_argument("effective", help="First session under the new ticker (YYYY-MM-DD)")
+    rename.add_argument("--name", help="Company name from the effective date")
+    company = sub.add_parser("rename-company", help="Record a company name change")
+    company.add_argument("ticker")
+    company.add_argument("effective", help="YYYY-MM-DD")
+    company.add_argument("name")
+    args = parser.parse_args(argv)
+
+    from src.snowflake_client import SnowflakeClient
+
+    client = SnowflakeClient(component="admin", stage="security_master")
+    try:
+        master = open_security_master(client)
+        if args.command == "show":
+            security_id = master.lookup(args.ticker, args.as_of)
+            if security_id is None:
+                print(f"{args.ticker} is not in the security master on {args.as_of}.")
+                return 1
+            _print_history(master, security_id)
+            return 0
+
+        if args.command == "rename":
+            security_id = master.record_rename(args.old_ticker, args.new_ticker, args.effective, args.name)
+            sync_security_master(client, master)
+            # Rows of either ticker may now belong to a different security
+            client.assign_security_ids(tickers=[args.old_ticker, args.new_ticker])
+        else:
+            security_id = master.record_name_change(args.ticker, args.effective, args.name)
+            sync_security_master(client, master)
+        _print_history(master, security_id)
+        print("Run dbt with --full-refresh on int_russell3000__daily+ to rebuild the affected series.")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,59 @@
 # src/snowflake_client.py
 # Manages Snowflake connections, table creation, data writes, and ingestion checkpoints.
 
-import pandas as pd
+import json
 import pendulum
-from snowflake.connector import connect
-from snowflake.connector.pandas_tools import write_pandas
-from src.config import SNOWFLAKE
+from src.config import SNOWFLAKE, settings
+from src.instrumentation import incr, span
+from src.query_tags import build_query_tag
+from src.workload_profiles import WarehouseSwitcher, profile_for, resolve_profiles
 import os
 
 
 class SnowflakeClient:
     """Handles connection, table setup, data writes, and checkpoints in Snowflake."""
 
-    def __init__(self):
-        """Initialize connection, cursor, and ensure required Snowflake objects exist."""
-        self.conn = self._connect()
-        self.cursor = self.conn.cursor()
-        self._ensure_objects_exist()
+    def __init__(self, component="pipeline", ensure_objects=True, **tag_fields):
+        """
+        Initialize connection, cursor, and ensure required Snowflake objects exist.
+
+        Args:
+            component (str): QUERY_TAG component for every query on this connection.
+            ensure_objects (bool): Run the CREATE/ALTER DDL on connect. Dashboard
+                readers and post-dbt jobs pass False: the ingestion client has
+                already created their tables, and the DDL is about twenty round trips.
+            **tag_fields: Initial stage/run_id tag fields (see set_query_tag).
+        """
+        self.component = component
+        self.tag_fields = tag_fields
+        # The constructor's stage picks the warehouse profile for the whole session;
+        # the tag records which one ran each query
+        self.query_tag = build_query_tag(
+            component, profile=profile_for(component, tag_fields.get("stage")), **tag_fields
+        )
+        with span("snowflake.connect"):
+            self.conn = self._connect()
+            self.cursor = self.conn.cursor()
+        snowflake_settings = settings.snowflake
+        self.warehouses = WarehouseSwitcher(
+            self.cursor,
+            resolve_profiles(snowflake_settings.warehouse_profiles or {}),
+            default_warehouse=SNOWFLAKE["warehouse"],
+            current_warehouse=SNOWFLAKE["warehouse"],
+            manage=snowflake_settings.manage_warehouses,
+        )
+        self.profile = self.warehouses.select(component, tag_fields.get("stage"))
+        if ensure_objects:
+            with span("snowflake.ensure_objects"):
+                self._ensure_objects_exist()
 
     def _connect(self):
         """Establish a secure RSA-based connection to Snowflake."""
         private_key_path = SNOWFLAKE.get("private_key_path")
 
         if private_key_path and os.path.exists(private_key_path):
-            import snowflake.connector
+            # Imported on connect: the connector is the slowest import in the package
+            from snowflake.connector import connect
             import cryptography.hazmat.primitives.serialization as serialization
             from cryptography.hazmat.backends import default_backend
 
@@ -44,6 +74,7 @@ class SnowflakeClient:
                 database=SNOWFLAKE["database"],
                 schema=SNOWFLAKE["schema"],
                 private_key=pkb,
+                session_parameters={"QUERY_TAG": self.query_tag},
             )
         else:
             raise FileNotFoundError(f"Private key not found: {private_key_path}")
@@ -51,6 +82,23 @@ class SnowflakeClient:
         print("Connected to Snowflake successfully.")
         return conn
     
+    def set_query_tag(self, **fields):
+        """
+        Update the session QUERY_TAG (e.g. stage=..., run_id=...).
+
+        The session stays on the warehouse picked at construction: switching
+        per stage would resume a second warehouse for a few checkpoint rows
+        between every load. Only issues ALTER SESSION when the rendered tag
+        actually changes.
+        """
+        tag_fields = {**self.tag_fields, **fields}
+        query_tag = build_query_tag(self.component, profile=self.profile.name, **tag_fields)
+        if query_tag == self.query_tag:
+            return
+        self.cursor.execute("ALTER SESSION SET QUERY_TAG = %s", (query_tag,))
+        self.tag_fields = tag_fields
+        self.query_tag = query_tag
+
     def _ensure_objects_exist(self):
         """Ensure database tables exist in configured schema and admin schema."""
         print("Checking or creating necessary tables...")
@@ -82,6 +130,144 @@ class SnowflakeClient:
             ADD COLUMN IF NOT EXISTS TS TIMESTAMP_NTZ;
         """)
 
+        # Integer security key assigned at ingest (src/security_master.py)
+        self.cursor.execute(f"""
+            ALTER TABLE {SNOWFLAKE['schema']}.DAILY_STOCKS
+            ADD COLUMN IF NOT EXISTS SECURITY_ID INT;
+        """)
+
+        # Ticker/name history per security with effective dates
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.SECURITY_MASTER (
+                SECURITY_ID INT,
+                TICKER STRING,
+                NAME STRING,
+                VALID_FROM DATE,
+                VALID_TO DATE,
+                UPDATED_AT TIMESTAMP_NTZ
+            );
+        """)
+
+        # SECURITY_IDs are drawn from one sequence, so concurrent loaders never
+        # hand the same id to two tickers; it starts above any id already issued
+        self.cursor.execute(f"SELECT COALESCE(MAX(SECURITY_ID), 0) + 1 FROM {SNOWFLAKE['schema']}.SECURITY_MASTER")
+        (first_id,) = self.cursor.fetchone()
+        self.cursor.execute(f"""
+            CREATE SEQUENCE IF NOT EXISTS {SNOWFLAKE['schema']}.SECURITY_ID_SEQ START = {int(first_id)};
+        """)
+
+        # Splits and dividends applied to the unadjusted bars downstream (src/corporate_actions.py)
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.CORPORATE_ACTIONS (
+                ACTION_ID STRING,
+                SECURITY_ID INT,
+                TICKER STRING,
+                ACTION_TYPE STRING,
+                EX_DATE DATE,
+                SPLIT_FROM FLOAT,
+                SPLIT_TO FLOAT,
+                CASH_AMOUNT FLOAT,
+                DIVIDEND_TYPE STRING,
+                LOADED_AT TIMESTAMP_NTZ,
+                RUN_ID STRING,
+                DBT_PROCESSED_AT TIMESTAMP_NTZ
+            );
+        """)
+
+        # NYSE sessions with their week/month boundaries, for the bar rollups (src/trading_calendar.py)
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.TRADING_SESSIONS (
+                SESSION_DATE DATE,
+                WEEK_FIRST_SESSION DATE,
+                WEEK_LAST_SESSION DATE,
+                MONTH_FIRST_SESSION DATE,
+                MONTH_LAST_SESSION DATE,
+                EARLY_CLOSE_MINUTES INT,
+                PUBLISHED_AT TIMESTAMP_NTZ
+            );
+        """)
+
+        # Rows rejected by src/validation.py, with their reason codes
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.DAILY_STOCKS_QUARANTINE (
+                T STRING,
+                V FLOAT,
+                VW FLOAT,
+                O FLOAT,
+                C FLOAT,
+                H FLOAT,
+                L FLOAT,
+                N INT,
+                TS TIMESTAMP_NTZ,
+                DATE DATE,
+                INGESTED_AT TIMESTAMP_NTZ,
+                REASON_CODES STRING,
+                RUN_ID STRING
+            );
+        """)
+
+        # Intraday micro-batches from the streaming mode (src/streaming.py)
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.INTRADAY_STOCKS (
+                T STRING,
+                O FLOAT,
+                H FLOAT,
+                L FLOAT,
+                C FLOAT,
+                V FLOAT,
+                VW FLOAT,
+                BAR_START TIMESTAMP_NTZ,
+                BAR_END TIMESTAMP_NTZ,
+                DATE DATE,
+                INGESTED_AT TIMESTAMP_NTZ
+            );
+        """)
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.INTRADAY_BREADTH (
+                AS_OF TIMESTAMP_NTZ,
+                DATE DATE,
+                STOCKS_TRADED INT,
+                ADVANCES INT,
+                DECLINES INT,
+                UNCHANGED_STOCKS INT,
+                UP_VOLUME FLOAT,
+                DOWN_VOLUME FLOAT,
+                PCT_MARKET_OVER_SMA50 FLOAT,
+                INGESTED_AT TIMESTAMP_NTZ
+            );
+        """)
+
+        # Rolling correlations/betas and sector dispersion (src/cross_asset.py)
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.CROSS_ASSET_STATS (
+                SECURITY_ID INT,
+                TICKER STRING,
+                TRADE_DATE DATE,
+                SECTOR STRING,
+                LOG_RETURN FLOAT,
+                CORR_EW_60 FLOAT,
+                BETA_EW_60 FLOAT,
+                CORR_IW_60 FLOAT,
+                BETA_IW_60 FLOAT,
+                CORR_EW_120 FLOAT,
+                BETA_EW_120 FLOAT,
+                CORR_IW_120 FLOAT,
+                BETA_IW_120 FLOAT,
+                COMPUTED_AT TIMESTAMP_NTZ
+            )
+            CLUSTER BY (TRADE_DATE);
+        """)
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SNOWFLAKE['schema']}.SECTOR_DISPERSION (
+                TRADE_DATE DATE,
+                SECTOR STRING,
+                MEMBERS INT,
+                MEAN_RETURN FLOAT,
+                DISPERSION FLOAT,
+                COMPUTED_AT TIMESTAMP_NTZ
+            );
+        """)
+
         # Checkpoints table (still lives in ADMIN schema)
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS ADMIN.INGESTION_CHECKPOINTS (
@@ -96,27 +282,100 @@ class SnowflakeClient:
             );
         """)
 
+        # Validation results per load (added after the table was first created)
+        self.cursor.execute("""
+            ALTER TABLE ADMIN.INGESTION_CHECKPOINTS
+            ADD COLUMN IF NOT EXISTS ROWS_QUARANTINED INT;
+        """)
+        self.cursor.execute("""
+            ALTER TABLE ADMIN.INGESTION_CHECKPOINTS
+            ADD COLUMN IF NOT EXISTS VALIDATION_COUNTS STRING;
+        """)
+
+        # Mirror of the local ingestion ledger (src/ingestion_ledger.py)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ADMIN.INGESTION_LEDGER (
+                API_DATE DATE,
+                PAYLOAD_HASH STRING,
+                ROW_COUNT INT,
+                LOADED_AT TIMESTAMP_NTZ,
+                RUN_ID STRING,
+                DBT_PROCESSED_AT TIMESTAMP_NTZ
+            );
+        """)
+
+        # Warehouse usage aggregated per QUERY_TAG and day (src/cost_report.py)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ADMIN.WAREHOUSE_COST_BY_TAG (
+                USAGE_DATE DATE,
+                COMPONENT STRING,
+                STAGE STRING,
+                PAGE STRING,
+                MODEL STRING,
+                WAREHOUSE_NAME STRING,
+                QUERY_COUNT INT,
+                TOTAL_ELAPSED_SECONDS FLOAT,
+                EXECUTION_SECONDS FLOAT,
+                BYTES_SCANNED NUMBER(38, 0),
+                CREDITS_ESTIMATED FLOAT,
+                COMPUTED_AT TIMESTAMP_NTZ
+            );
+        """)
+
+        # Workload profile each query ran under (src/workload_profiles.py)
+        self.cursor.execute("""
+            ALTER TABLE ADMIN.WAREHOUSE_COST_BY_TAG
+            ADD COLUMN IF NOT EXISTS PROFILE STRING;
+        """)
+
+        # Per-node dbt timings parsed from run_results.json (src/dbt_telemetry.py)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ADMIN.DBT_MODEL_RUNS (
+                INVOCATION_ID STRING,
+                STAGE STRING,
+                UNIQUE_ID STRING,
+                NAME STRING,
+                RESOURCE_TYPE STRING,
+                MATERIALIZATION STRING,
+                STATUS STRING,
+                EXECUTION_TIME FLOAT,
+                ROWS_AFFECTED INT,
+                QUERY_ID STRING,
+                STARTED_AT TIMESTAMP_NTZ,
+                COMPLETED_AT TIMESTAMP_NTZ,
+                GENERATED_AT TIMESTAMP_NTZ
+            );
+        """)
+
         self.conn.commit()
         print("Verified table existence.")
 
 
-    def write_dataframe(self, df: pd.DataFrame, table_name: str):
+    def write_dataframe(self, df, table_name: str):
         """Write a pandas DataFrame into Snowflake using write_pandas()."""
+        # pandas_tools pulls in pandas and pyarrow; only load paths need it
+        from snowflake.connector.pandas_tools import write_pandas
+
         if df is None or df.empty:
             print("DataFrame is empty; skipping load.")
             return False, 0
 
-        success, nchunks, nrows, _ = write_pandas(
-            conn=self.conn,
-            df=df,
-            table_name=table_name,
-            database=SNOWFLAKE["database"],
-            schema=SNOWFLAKE["schema"],
-            quote_identifiers=False,
-            use_logical_type=True
-        )
+        self.set_query_tag(stage="load")
+        with span("snowflake.write_pandas", table=table_name, rows=len(df)) as write_span:
+            success, nchunks, nrows, _ = write_pandas(
+                conn=self.conn,
+                df=df,
+                table_name=table_name,
+                database=SNOWFLAKE["database"],
+                schema=SNOWFLAKE["schema"],
+                quote_identifiers=False,
+                use_logical_type=True
+            )
+            write_span.set(chunks=nchunks)
 
         if success:
+            incr("rows_written", nrows)
+            incr("bytes_written", int(df.memory_usage(deep=True).sum()))
             print(f"Successfully loaded {nrows} rows into {table_name}.")
             return True, nrows
         else:
@@ -124,25 +383,111 @@ class SnowflakeClient:
             return False, 0
 
     def record_checkpoint(self, run_id, api_date, status, total_tickers=None,
-                          rows_inserted=None, error_message=None):
-        """Insert a checkpoint record into ADMIN.INGESTION_CHECKPOINTS."""
+                          rows_inserted=None, error_message=None,
+                          rows_quarantined=None, validation_counts=None):
+        """
+        Insert a checkpoint record into ADMIN.INGESTION_CHECKPOINTS.
+
+        validation_counts (dict of reason code -> failing rows) is stored as JSON.
+        """
         now = pendulum.now()
         started_at = now if status == "started" else None
         completed_at = now if status in ["completed", "failed"] else None
 
+        if validation_counts is not None:
+            validation_counts = json.dumps(validation_counts, sort_keys=True)
+
         query = f"""
             INSERT INTO ADMIN.INGESTION_CHECKPOINTS (
                 RUN_ID, API_DATE, STATUS, TOTAL_TICKERS,
-                ROWS_INSERTED, STARTED_AT, COMPLETED_AT, ERROR_MESSAGE
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ROWS_INSERTED, STARTED_AT, COMPLETED_AT, ERROR_MESSAGE,
+                ROWS_QUARANTINED, VALIDATION_COUNTS
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
-        self.cursor.execute(query, (
-            run_id, api_date, status, total_tickers,
-            rows_inserted, started_at, completed_at, error_message
-        ))
-        self.conn.commit()
+        self.set_query_tag(stage="checkpoint", run_id=run_id)
+        with span("snowflake.checkpoint", status=status):
+            self.cursor.execute(query, (
+                run_id, api_date, status, total_tickers,
+                rows_inserted, started_at, completed_at, error_message,
+                rows_quarantined, validation_counts
+            ))
+            self.conn.commit()
+        incr("checkpoints_written")
         print(f"Checkpoint recorded for {api_date} — {status}")
 
+    def record_checkpoints(self, run_id, entries):
+        """
+        Insert one checkpoint per date in a single batched statement (bulk imports).
+
+        Args:
+            run_id (str): Pipeline execution identifier.
+            entries (list[dict]): api_date, status, total_tickers, rows_inserted,
+                rows_quarantined, validation_counts and optional error_message.
+        """
+        now = pendulum.now()
+        query = """
+            INSERT INTO ADMIN.INGESTION_CHECKPOINTS (
+                RUN_ID, API_DATE, STATUS, TOTAL_TICKERS,
+                ROWS_INSERTED, STARTED_AT, COMPLETED_AT, ERROR_MESSAGE,
+                ROWS_QUARANTINED, VALIDATION_COUNTS
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        self.set_query_tag(stage="checkpoint", run_id=run_id)
+        with span("snowflake.checkpoint", status="batch", rows=len(entries)):
+            self.cursor.executemany(query, [
+                (
+                    run_id, e["api_date"], e["status"], e.get("total_tickers"),
+                    e.get("rows_inserted"), None, now, e.get("error_message"),
+                    e.get("rows_quarantined"),
+                    json.dumps(e["validation_counts"], sort_keys=True)
+                    if e.get("validation_counts") is not None else None,
+                )
+                for e in entries
+            ])
+            self.conn.commit()
+        incr("checkpoints_written", len(entries))
+        print(f"Recorded {len(entries)} checkpoints for run {run_id}")
+
+    def bulk_load_parquet(self, table_name, local_dir, stage_prefix, file_names):
+        """
+        PUT a directory of Parquet files to a temporary stage and COPY the named ones into a table.
+
+        Args:
+            table_name (str): Target table in the configured schema.
+            local_dir (str | Path): Directory holding the files.
+            stage_prefix (str): Stage path the directory is uploaded to (mirrors the partition).
+            file_names (list[str]): Files in local_dir to load.
+
+        Returns:
+            int: Rows loaded.
+        """
+        stage = "BULK_IMPORT_STAGE"
+        files = ", ".join(f"'{stage_prefix}/{name}'" for name in file_names)
+        self.set_query_tag(stage="bulk_load")
+        with span("snowflake.bulk_load", table=table_name, files=len(file_names)) as load_span:
+            self.cursor.execute(
+                f"CREATE TEMPORARY STAGE IF NOT EXISTS {stage} FILE_FORMAT = (TYPE = PARQUET)"
+            )
+            self.cursor.execute(
+                f"PUT 'file://{os.path.abspath(local_dir)}/*.parquet' @{stage}/{stage_prefix}/ "
+                "PARALLEL = 8 AUTO_COMPRESS = FALSE OVERWRITE = TRUE"
+            )
+            self.cursor.execute(f"""
+                COPY INTO {SNOWFLAKE['schema']}.{table_name}
+                FROM @{stage}
+                FILES = ({files})
+                FILE_FORMAT = (TYPE = PARQUET)
+                MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE
+                PURGE = TRUE
+            """)
+            # One result row per file: (file, status, rows_parsed, rows_loaded, ...)
+            rows_loaded = sum(row[3] for row in self.cursor.fetchall() if len(row) > 3)
+            self.conn.commit()
+            load_span.set(rows=rows_loaded)
+        incr("rows_written", rows_loaded)
+        print(f"Bulk loaded {rows_loaded} rows from {len(file_names)} files into {table_name}.")
+        return rows_loaded
+
     def get_completed_dates(self):
         """Return all API_DATE values where status='completed'."""
         query = """
@@ -151,14 +496,366 @@ class SnowflakeClient:
             WHERE STATUS = 'completed'
         """
         try:
-            self.cursor.execute(query)
-            dates = {row[0].strftime("%Y-%m-%d") for row in self.cursor.fetchall()}
+            with span("snowflake.completed_dates"):
+                self.cursor.execute(query)
+                dates = {row[0].strftime("%Y-%m-%d") for row in self.cursor.fetchall()}
             print(f"Found {len(dates)} completed dates.")
             return dates
         except Exception as e:
             print(f"Error reading checkpoint table: {e}")
             return set()
 
+    def delete_date(self, table_name, api_date):
+        """Remove a date's rows before it is reloaded with revised data."""
+        self.set_query_tag(stage="replace")
+        with span("snowflake.delete_date", table=table_name):
+            self.cursor.execute(
+                f"DELETE FROM {SNOWFLAKE['schema']}.{table_name} WHERE DATE = %s", (api_date,)
+            )
+            deleted = self.cursor.rowcount
+            self.conn.commit()
+        print(f"Deleted {deleted} rows for {api_date} from {table_name}.")
+        return deleted
+
+    def delete_dates(self, table_name, dates):
+        """Remove several dates' rows in one statement before a bulk reload replaces them."""
+        self.set_query_tag(stage="replace")
+        with span("snowflake.delete_dates", table=table_name, dates=len(dates)):
+            self.cursor.execute(
+                f"DELETE FROM {SNOWFLAKE['schema']}.{table_name} "
+                f"WHERE DATE IN ({', '.join(['%s'] * len(dates))})",
+                tuple(dates),
+            )
+            deleted = self.cursor.rowcount
+            self.conn.commit()
+        print(f"Deleted {deleted} rows for {len(dates)} dates from {table_name}.")
+        return deleted
+
+    def get_ledger_rows(self):
+        """Return ADMIN.INGESTION_LEDGER as dicts with ISO date/timestamp strings."""
+        self.cursor.execute("""
+            SELECT API_DATE, PAYLOAD_HASH, ROW_COUNT, LOADED_AT, RUN_ID, DBT_PROCESSED_AT
+            FROM ADMIN.INGESTION_LEDGER
+        """)
+        columns = ["API_DATE", "PAYLOAD_HASH", "ROW_COUNT", "LOADED_AT", "RUN_ID", "DBT_PROCESSED_AT"]
+        rows = []
+        for row in self.cursor.fetchall():
+            record = dict(zip(columns, row))
+            record["API_DATE"] = record["API_DATE"].strftime("%Y-%m-%d")
+            for col in ("LOADED_AT", "DBT_PROCESSED_AT"):
+                if record[col] is not None:
+                    record[col] = record[col].strftime("%Y-%m-%d %H:%M:%S")
+            rows.append(record)
+        return rows
+
+    def merge_ledger_rows(self, rows):
+        """
+        Upsert local ledger rows into ADMIN.INGESTION_LEDGER by API_DATE with one MERGE.
+
+        Rows are staged with write_pandas into a session temp table, so a
+        bootstrap or backfill of thousands of dates is one round trip.
+        """
+        import pandas as pd
+        from snowflake.connector.pandas_tools import write_pandas
+
+        stage = "ADMIN.INGESTION_LEDGER_STAGE"
+        df = pd.DataFrame(rows, columns=["API_DATE", "PAYLOAD_HASH", "ROW_COUNT", "LOADED_AT",
+                                         "RUN_ID", "DBT_PROCESSED_AT"])
+        df["API_DATE"] = pd.to_datetime(df["API_DATE"]).dt.date
+        df["ROW_COUNT"] = df["ROW_COUNT"].astype("Int64")
+        for col in ("LOADED_AT", "DBT_PROCESSED_AT"):
+            df[col] = pd.to_datetime(df[col])
+
+        self.set_query_tag(stage="ledger_sync")
+        with span("snowflake.ledger_sync", rows=len(rows)):
+            self.cursor.execute(f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {stage} (
+                    API_DATE DATE, PAYLOAD_HASH STRING, ROW_COUNT INT,
+                    LOADED_AT TIMESTAMP_NTZ, RUN_ID STRING, DBT_PROCESSED_AT TIMESTAMP_NTZ
+                )
+            """)
+            self.cursor.execute(f"TRUNCATE TABLE {stage}")
+            write_pandas(
+                conn=self.conn,
+                df=df,
+                table_name="INGESTION_LEDGER_STAGE",
+                database=SNOWFLAKE["database"],
+                schema="ADMIN",
+                quote_identifiers=False,
+                use_logical_type=True,
+            )
+            self.cursor.execute(f"""
+                MERGE INTO ADMIN.INGESTION_LEDGER t
+                USING {stage} s
+                ON t.API_DATE = s.API_DATE
+                WHEN MATCHED THEN UPDATE SET
+                    PAYLOAD_HASH = s.PAYLOAD_HASH, ROW_COUNT = s.ROW_COUNT, LOADED_AT = s.LOADED_AT,
+                    RUN_ID = s.RUN_ID, DBT_PROCESSED_AT = s.DBT_PROCESSED_AT
+                WHEN NOT MATCHED THEN INSERT
+                    (API_DATE, PAYLOAD_HASH, ROW_COUNT, LOADED_AT, RUN_ID, DBT_PROCESSED_AT)
+                    VALUES (s.API_DATE, s.PAYLOAD_HASH, s.ROW_COUNT, s.LOADED_AT, s.RUN_ID, s.DBT_PROCESSED_AT)
+            """)
+            self.conn.commit()
+        print(f"Synced {len(rows)} ledger rows to ADMIN.INGESTION_LEDGER.")
+
+    def get_security_master(self, tickers=None):
+        """Return SECURITY_MASTER (optionally only some tickers) as dicts with ISO date strings."""
+        where, params = "", []
+        if tickers:
+            where = f"WHERE TICKER IN ({', '.join(['%s'] * len(tickers))})"
+            params = list(tickers)
+        self.cursor.execute(f"""
+            SELECT SECURITY_ID, TICKER, NAME, VALID_FROM, VALID_TO
+            FROM {SNOWFLAKE['schema']}.SECURITY_MASTER
+            {where}
+        """, params)
+        columns = ["SECURITY_ID", "TICKER", "NAME", "VALID_FROM", "VALID_TO"]
+        rows = []
+        for row in self.cursor.fetchall():
+            record = dict(zip(columns, row))
+            for col in ("VALID_FROM", "VALID_TO"):
+                record[col] = record[col].strftime("%Y-%m-%d")
+            rows.append(record)
+        return rows
+
+    def allocate_security_ids(self, count):
+        """Draw `count` unused SECURITY_IDs from SECURITY_ID_SEQ in one query."""
+        self.cursor.execute(f"""
+            SELECT {SNOWFLAKE['schema']}.SECURITY_ID_SEQ.NEXTVAL
+            FROM TABLE(GENERATOR(ROWCOUNT => %s))
+        """, (int(count),))
+        return sorted(int(security_id) for (security_id,) in self.cursor.fetchall())
+
+    def get_ticker_first_seen(self):
+        """Return {ticker: first DATE in DAILY_STOCKS} (seeds the security master)."""
+        self.cursor.execute(f"""
+            SELECT T, MIN(DATE)
+            FROM {SNOWFLAKE['schema']}.DAILY_STOCKS
+            WHERE T IS NOT NULL
+            GROUP BY T
+        """)
+        return {ticker: first.strftime("%Y-%m-%d") for ticker, first in self.cursor.fetchall()}
+
+    def merge_security_master(self, rows):
+        """
+        Upsert security master mappings by (TICKER, VALID_FROM) with one MERGE.
+
+        Rows are staged with write_pandas into a session temp table. A row
+        flagged IS_NEW (a newly registered ticker) never overwrites a mapping
+        another process inserted first: that process's SECURITY_ID is kept,
+        and the caller adopts it (see sync_security_master). Snowflake runs
+        MERGEs on one table one at a time, so the check cannot race.
+        """
+        import pandas as pd
+        from snowflake.connector.pandas_tools import write_pandas
+
+        stage = f"{SNOWFLAKE['schema']}.SECURITY_MASTER_STAGE"
+        df = pd.DataFrame(rows, columns=["SECURITY_ID", "TICKER", "NAME", "VALID_FROM", "VALID_TO", "IS_NEW"])
+        for col in ("VALID_FROM", "VALID_TO"):
+            df[col] = pd.to_datetime(df[col]).dt.date
+        df["IS_NEW"] = df["IS_NEW"].fillna(False).astype(bool)
+
+        self.set_query_tag(stage="security_master")
+        with span("snowflake.security_master_sync", rows=len(rows)):
+            self.cursor.execute(f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {stage} (
+                    SECURITY_ID INT, TICKER STRING, NAME STRING,
+                    VALID_FROM DATE, VALID_TO DATE, IS_NEW BOOLEAN
+                )
+            """)
+            self.cursor.execute(f"TRUNCATE TABLE {stage}")
+            write_pandas(
+                conn=self.conn,
+                df=df,
+                table_name="SECURITY_MASTER_STAGE",
+                database=SNOWFLAKE["database"],
+                schema=SNOWFLAKE["schema"],
+                quote_identifiers=False,
+                use_logical_type=True,
+            )
+            self.cursor.execute(f"""
+                MERGE INTO {SNOWFLAKE['schema']}.SECURITY_MASTER t
+                USING {stage} s
+                ON t.TICKER = s.TICKER AND t.VALID_FROM = s.VALID_FROM
+                WHEN MATCHED AND NOT s.IS_NEW THEN UPDATE SET
+                    SECURITY_ID = s.SECURITY_ID, NAME = s.NAME, VALID_TO = s.VALID_TO,
+                    UPDATED_AT = CURRENT_TIMESTAMP()::TIMESTAMP_NTZ
+                WHEN NOT MATCHED THEN INSERT
+                    (SECURITY_ID, TICKER, NAME, VALID_FROM, VALID_TO, UPDATED_AT)
+                    VALUES (s.SECURITY_ID, s.TICKER, s.NAME, s.VALID_FROM, s.VALID_TO,
+                            CURRENT_TIMESTAMP()::TIMESTAMP_NTZ)
+            """)
+            self.conn.commit()
+        print(f"Synced {len(rows)} security master rows.")
+
+    def assign_security_ids(self, start=None, end=None, tickers=None, missing_only=False):
+        """
+        Set DAILY_STOCKS.SECURITY_ID from the security master in one set-based UPDATE.
+
+        Used after bulk loads, when bootstrapping the master, and after a
+        rename re-keys a ticker's history.
+
+        Args:
+            start (str | None): First DATE to update.
+            end (str | None): Last DATE to update.
+            tickers (list[str] | None): Limit to these tickers.
+            missing_only (bool): Only fill rows without a SECURITY_ID.
+
+        Returns:
+            int: Rows updated.
+        """
+        filters, params = [], []
+        if start:
+            filters.append("d.DATE >= %s")
+            params.append(start)
+        if end:
+            filters.append("d.DATE <= %s")
+            params.append(end)
+        if tickers:
+            filters.append(f"d.T IN ({', '.join(['%s'] * len(tickers))})")
+            params.extend(tickers)
+        if missing_only:
+            filters.append("d.SECURITY_ID IS NULL")
+        where = "".join(f" AND {f}" for f in filters)
+
+        self.set_query_tag(stage="security_master")
+        with span("snowflake.assign_security_ids") as assign_span:
+            self.cursor.execute(f"""
+                UPDATE {SNOWFLAKE['schema']}.DAILY_STOCKS d
+                SET SECURITY_ID = m.SECURITY_ID
+                FROM {SNOWFLAKE['schema']}.SECURITY_MASTER m
+                WHERE d.T = m.TICKER
+                  AND d.DATE BETWEEN m.VALID_FROM AND m.VALID_TO{where}
+            """, params)
+            updated = self.cursor.rowcount
+            self.conn.commit()
+            assign_span.set(rows=updated)
+        print(f"Assigned SECURITY_ID to {updated} DAILY_STOCKS rows.")
+        return updated
+
+    def merge_corporate_actions(self, rows, run_id):
+        """
+        Upsert splits and dividends by Polygon's ACTION_ID with one MERGE.
+
+        Rows are staged with write_pandas into a session temp table. A new or
+        changed split is left pending (DBT_PROCESSED_AT NULL) until dbt has
+        re-adjusted its security; dividends only feed query-time total-return
+        factors, so they never are. Unchanged rows keep their state.
+        LOADED_AT and DBT_PROCESSED_AT are UTC (SYSDATE), like the ingestion
+        ledger, since src/panel.py compares them with UTC cache stamps.
+        """
+        import pandas as pd
+        from snowflake.connector.pandas_tools import write_pandas
+
+        stage = f"{SNOWFLAKE['schema']}.CORPORATE_ACTIONS_STAGE"
+        df = pd.DataFrame(rows, columns=["ACTION_ID", "SECURITY_ID", "TICKER", "ACTION_TYPE", "EX_DATE",
+                                         "SPLIT_FROM", "SPLIT_TO", "CASH_AMOUNT", "DIVIDEND_TYPE"])
+        # One source row per target row, or the MERGE is nondeterministic; the latest wins
+        df = df.drop_duplicates("ACTION_ID", keep="last")
+        df["SECURITY_ID"] = df["SECURITY_ID"].astype("Int64")
+        df["EX_DATE"] = pd.to_datetime(df["EX_DATE"]).dt.date
+        for col in ("SPLIT_FROM", "SPLIT_TO", "CASH_AMOUNT"):
+            df[col] = df[col].astype(float)
+        df["RUN_ID"] = run_id
+
+        self.set_query_tag(stage="corporate_actions")
+        with span("snowflake.corporate_actions_sync", rows=len(rows)):
+            self.cursor.execute(f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {stage} (
+                    ACTION_ID STRING, SECURITY_ID INT, TICKER STRING, ACTION_TYPE STRING,
+                    EX_DATE DATE, SPLIT_FROM FLOAT, SPLIT_TO FLOAT, CASH_AMOUNT FLOAT,
+                    DIVIDEND_TYPE STRING, RUN_ID STRING
+                )
+            """)
+            self.cursor.execute(f"TRUNCATE TABLE {stage}")
+            write_pandas(
+                conn=self.conn,
+                df=df,
+                table_name="CORPORATE_ACTIONS_STAGE",
+                database=SNOWFLAKE["database"],
+                schema=SNOWFLAKE["schema"],
+                quote_identifiers=False,
+                use_logical_type=True,
+            )
+            self.cursor.execute(f"""
+                MERGE INTO {SNOWFLAKE['schema']}.CORPORATE_ACTIONS t
+                USING {stage} s
+                ON t.ACTION_ID = s.ACTION_ID
+                WHEN MATCHED AND NOT (
+                    EQUAL_NULL(t.SECURITY_ID, s.SECURITY_ID) AND EQUAL_NULL(t.EX_DATE, s.EX_DATE)
+                    AND EQUAL_NULL(t.SPLIT_FROM, s.SPLIT_FROM) AND EQUAL_NULL(t.SPLIT_TO, s.SPLIT_TO)
+                    AND EQUAL_NULL(t.CASH_AMOUNT, s.CASH_AMOUNT)
+                ) THEN UPDATE SET
+                    SECURITY_ID = s.SECURITY_ID, TICKER = s.TICKER, EX_DATE = s.EX_DATE,
+                    SPLIT_FROM = s.SPLIT_FROM, SPLIT_TO = s.SPLIT_TO, CASH_AMOUNT = s.CASH_AMOUNT,
+                    DIVIDEND_TYPE = s.DIVIDEND_TYPE, RUN_ID = s.RUN_ID,
+                    LOADED_AT = SYSDATE(),
+                    DBT_PROCESSED_AT = IFF(s.ACTION_TYPE = 'SPLIT', NULL, SYSDATE())
+                WHEN NOT MATCHED THEN INSERT
+                    (ACTION_ID, SECURITY_ID, TICKER, ACTION_TYPE, EX_DATE, SPLIT_FROM, SPLIT_TO,
+                     CASH_AMOUNT, DIVIDEND_TYPE, LOADED_AT, RUN_ID, DBT_PROCESSED_AT)
+                    VALUES (s.ACTION_ID, s.SECURITY_ID, s.TICKER, s.ACTION_TYPE, s.EX_DATE, s.SPLIT_FROM,
+                            s.SPLIT_TO, s.CASH_AMOUNT, s.DIVIDEND_TYPE, SYSDATE(),
+                            s.RUN_ID,
+                            IFF(s.ACTION_TYPE = 'SPLIT', NULL, SYSDATE()))
+            """)
+            self.conn.commit()
+        print(f"Synced {len(df)} corporate actions.")
+
+    def get_pending_splits(self):
+        """Return (SECURITY_ID, ISO EX_DATE) of splits dbt has not applied yet."""
+        self.cursor.execute(f"""
+            SELECT DISTINCT SECURITY_ID, EX_DATE
+            FROM {SNOWFLAKE['schema']}.CORPORATE_ACTIONS
+            WHERE ACTION_TYPE = 'SPLIT' AND DBT_PROCESSED_AT IS NULL AND SECURITY_ID IS NOT NULL
+        """)
+        return [(security_id, ex_date.strftime("%Y-%m-%d")) for security_id, ex_date in self.cursor.fetchall()]
+
+    def mark_splits_processed(self, security_ids):
+        """Stamp DBT_PROCESSED_AT (UTC) on the pending splits of the given securities."""
+        self.set_query_tag(stage="corporate_actions")
+        self.cursor.execute(f"""
+            UPDATE {SNOWFLAKE['schema']}.CORPORATE_ACTIONS
+            SET DBT_PROCESSED_AT = SYSDATE()
+            WHERE ACTION_TYPE = 'SPLIT' AND DBT_PROCESSED_AT IS NULL
+              AND SECURITY_ID IN ({', '.join(['%s'] * len(security_ids))})
+        """, list(security_ids))
+        self.conn.commit()
+
+    def replace_trading_sessions(self, rows):
+        """Replace TRADING_SESSIONS with the given session rows in one transaction."""
+        query = f"""
+            INSERT INTO {SNOWFLAKE['schema']}.TRADING_SESSIONS
+                (SESSION_DATE, WEEK_FIRST_SESSION, WEEK_LAST_SESSION, MONTH_FIRST_SESSION,
+                 MONTH_LAST_SESSION, EARLY_CLOSE_MINUTES, PUBLISHED_AT)
+            VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP()::TIMESTAMP_NTZ)
+        """
+        self.set_query_tag(stage="trading_sessions")
+        with span("snowflake.trading_sessions", rows=len(rows)):
+            self.cursor.execute(f"DELETE FROM {SNOWFLAKE['schema']}.TRADING_SESSIONS")
+            self.cursor.executemany(query, [
+                (r["SESSION_DATE"], r["WEEK_FIRST_SESSION"], r["WEEK_LAST_SESSION"],
+                 r["MONTH_FIRST_SESSION"], r["MONTH_LAST_SESSION"], r["EARLY_CLOSE_MINUTES"])
+                for r in rows
+            ])
+            self.conn.commit()
+        print(f"Published {len(rows)} trading sessions.")
+
+    def get_trading_session_range(self):
+        """Return the first and last published SESSION_DATE as YYYY-MM-DD (None, None if empty)."""
+        self.cursor.execute(f"""
+            SELECT MIN(SESSION_DATE), MAX(SESSION_DATE) FROM {SNOWFLAKE['schema']}.TRADING_SESSIONS
+        """)
+        first, last = self.cursor.fetchone()
+        if first is None:
+            return None, None
+        return first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")
+
+    def fetch_arrow(self, query, params=None):
+        """Run a query and return the result as a pyarrow Table (None if no rows)."""
+        self.cursor.execute(query, params)
+        return self.cursor.fetch_arrow_all()
+
     def close(self):
         """Close Snowflake connection."""
         try:
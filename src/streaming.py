@@ -0,0 +1,472 @@
+# src/streaming.py
+# Intraday streaming mode: Polygon aggregate events -> per-ticker bars, micro-batched to INTRADAY_STOCKS.
+#
+# Usage:
+#   python -m src.streaming                             # live feed until it closes
+#   python -m src.streaming --max-seconds 600 --record data/stream/session.jsonl
+#   python -m src.streaming --url ws://127.0.0.1:8765   # local replay server (benchmarks/replay_feed.py)
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pendulum
+from src.config import (
+    MARTS_SCHEMA,
+    POLYGON_API_KEY,
+    POLYGON_WS_URL,
+    SNOWFLAKE,
+    STREAM_FLUSH_SECONDS,
+    STREAM_SUBSCRIPTION,
+)
+from src.instrumentation import finish_run, incr, span, start_run
+
+# Per-second ("A") and per-minute ("AM") aggregate events
+AGGREGATE_EVENTS = ("A", "AM")
+
+# Same window the SMA-50 in fct_trading_momentum uses; today's price is the 50th close
+SMA_WINDOW = 50
+
+# Breadth state per ticker, used as bincount bins
+NOT_TRADED, ADVANCING, DECLINING, UNCHANGED = 0, 1, 2, 3
+
+# Calendar days of history fetched to cover the previous 49 trading sessions
+SEED_LOOKBACK_DAYS = 100
+
+
+class IntradaySession:
+    """
+    In-memory state for one trading session of the Russell 3000 universe.
+
+    Bars for the current flush window and the session-level breadth state
+    are held in per-ticker numpy arrays. Each feed message is applied as one
+    vectorized update over the tickers it touches, and the breadth counters
+    are adjusted by the difference between those tickers' old and new states,
+    so the cost does not grow with the universe size.
+
+    Args:
+        trade_date (str): Session date (YYYY-MM-DD).
+        tickers (Sequence[str]): Universe; events for other symbols are ignored.
+        yesterday_close (array-like): Previous session close per ticker (NaN if unknown).
+        close_sum_49 (array-like): Sum of the previous 49 closes per ticker
+            (NaN when fewer exist, which keeps SMA-50 NULL like the mart).
+    """
+
+    def __init__(self, trade_date, tickers, yesterday_close, close_sum_49):
+        n = len(tickers)
+        self.trade_date = trade_date
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers.tolist())}
+        self.yesterday_close = np.asarray(yesterday_close, dtype=np.float64)
+        self.close_sum_49 = np.asarray(close_sum_49, dtype=np.float64)
+
+        # Session state
+        self.last_price = np.full(n, np.nan)
+        self.session_volume = np.zeros(n)
+        self.state = np.zeros(n, dtype=np.int8)
+        self.above_sma50 = np.zeros(n, dtype=bool)
+        self.state_counts = np.zeros(4, dtype=np.int64)
+        self.state_volume = np.zeros(4)
+        self.above_sma50_count = 0
+        self.last_event_ms = 0
+
+        # Bars for the current flush window
+        self.bar_active = np.zeros(n, dtype=bool)
+        self.bar_open = np.zeros(n)
+        self.bar_high = np.full(n, -np.inf)
+        self.bar_low = np.full(n, np.inf)
+        self.bar_close = np.zeros(n)
+        self.bar_volume = np.zeros(n)
+        self.bar_notional = np.zeros(n)
+        self.bar_start = np.zeros(n, dtype=np.int64)
+        self.bar_end = np.zeros(n, dtype=np.int64)
+
+    def apply(self, events):
+        """
+        Fold one feed message (a list of aggregate events) into the session.
+
+        Returns:
+            int: Number of events applied.
+        """
+        index = self.index
+        rows = [
+            (i, e["o"], e["h"], e["l"], e["c"], e["v"], e.get("vw") or e["c"], e["s"], e["e"])
+            for e in events
+            if e.get("ev") in AGGREGATE_EVENTS and (i := index.get(e.get("sym"))) is not None
+        ]
+        incr("stream_events", len(events))
+        if not rows:
+            return 0
+
+        batch = np.array(rows, dtype=np.float64)
+        idx = batch[:, 0].astype(np.intp)
+        opens, highs, lows, closes, volumes, vwaps = batch[:, 1:7].T
+        starts, ends = batch[:, 7].astype(np.int64), batch[:, 8].astype(np.int64)
+
+        # Events arrive in time order: a ticker's first event opens its bar, its last one closes it
+        tickers, first = np.unique(idx, return_index=True)
+        last = len(idx) - 1 - np.unique(idx[::-1], return_index=True)[1]
+
+        opening = ~self.bar_active[tickers]
+        self.bar_open[tickers[opening]] = opens[first[opening]]
+        self.bar_start[tickers[opening]] = starts[first[opening]]
+        self.bar_active[tickers] = True
+        np.maximum.at(self.bar_high, idx, highs)
+        np.minimum.at(self.bar_low, idx, lows)
+        np.add.at(self.bar_volume, idx, volumes)
+        np.add.at(self.bar_notional, idx, vwaps * volumes)
+        self.bar_close[tickers] = closes[last]
+        self.bar_end[tickers] = ends[last]
+
+        old_volume = self.session_volume[tickers]
+        np.add.at(self.session_volume, idx, volumes)
+        self._update_breadth(tickers, closes[last], old_volume)
+
+        self.last_event_ms = max(self.last_event_ms, int(ends.max()))
+        return len(rows)
+
+    def _update_breadth(self, tickers, prices, old_volume):
+        """Move the touched tickers between breadth buckets and adjust the counters."""
+        old_state = self.state[tickers]
+        old_above = self.above_sma50[tickers]
+
+        # Same classification as agg_daily_market_breadth (no prior close counts as unchanged)
+        prev = self.yesterday_close[tickers]
+        new_state = np.where(
+            np.isnan(prev) | (prices == prev),
+            UNCHANGED,
+            np.where(prices > prev, ADVANCING, DECLINING),
+        ).astype(np.int8)
+        # SMA-50 as of now: yesterday's 49 closes plus the latest price (NaN compares False)
+        new_above = prices > (self.close_sum_49[tickers] + prices) / SMA_WINDOW
+
+        new_volume = self.session_volume[tickers]
+        self.state_counts += np.bincount(new_state, minlength=4) - np.bincount(old_state, minlength=4)
+        self.state_volume += (
+            np.bincount(new_state, weights=new_volume, minlength=4)
+            - np.bincount(old_state, weights=old_volume, minlength=4)
+        )
+        self.above_sma50_count += int(new_above.sum()) - int(old_above.sum())
+
+        self.state[tickers] = new_state
+        self.above_sma50[tickers] = new_above
+        self.last_price[tickers] = prices
+
+    def breadth(self):
+        """Current intraday breadth, shaped like an INTRADAY_BREADTH row."""
+        traded = int(self.state_counts[1:].sum())
+        return {
+            "AS_OF": pd.to_datetime(self.last_event_ms, unit="ms"),
+            "DATE": self.trade_date,
+            "STOCKS_TRADED": traded,
+            "ADVANCES": int(self.state_counts[ADVANCING]),
+            "DECLINES": int(self.state_counts[DECLINING]),
+            "UNCHANGED_STOCKS": int(self.state_counts[UNCHANGED]),
+            "UP_VOLUME": float(self.state_volume[ADVANCING]),
+            "DOWN_VOLUME": float(self.state_volume[DECLINING]),
+            "PCT_MARKET_OVER_SMA50": self.above_sma50_count / traded if traded else None,
+        }
+
+    def flush(self):
+        """
+        Drain the bars of every ticker that traded since the last flush.
+
+        Returns:
+            pd.DataFrame: INTRADAY_STOCKS rows (empty if nothing traded).
+        """
+        active = np.flatnonzero(self.bar_active)
+        volume = self.bar_volume[active]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap = np.where(volume > 0, self.bar_notional[active] / volume, self.bar_close[active])
+        bars = pd.DataFrame({
+            "T": self.tickers[active],
+            "O": self.bar_open[active],
+            "H": self.bar_high[active],
+            "L": self.bar_low[active],
+            "C": self.bar_close[active],
+            "V": volume,
+            "VW": vwap,
+            "BAR_START": pd.to_datetime(self.bar_start[active], unit="ms"),
+            "BAR_END": pd.to_datetime(self.bar_end[active], unit="ms"),
+            "DATE": self.trade_date,
+            "INGESTED_AT": pd.Timestamp.utcnow().tz_localize(None),
+        })
+
+        self.bar_active[active] = False
+        self.bar_high[active] = -np.inf
+        self.bar_low[active] = np.inf
+        self.bar_volume[active] = 0.0
+        self.bar_notional[active] = 0.0
+        return bars
+
+
+def session_from_history(trade_date, history):
+    """
+    Build a session seeded from daily closes.
+
+    The universe is every security present on the latest date in `history`,
+    under its latest ticker; closes from before a rename still count.
+
+    Args:
+        trade_date (str): Session being streamed (YYYY-MM-DD).
+        history (pa.Table): security_id, ticker, trade_date, close rows sorted by
+            security_id then trade_date (the momentum store layout), covering at
+            least 49 sessions. Without security_id, rows sorted by ticker.
+
+    Returns:
+        IntradaySession
+    """
+    tickers = history.column("ticker").to_numpy(zero_copy_only=False)
+    dates = history.column("trade_date").to_numpy(zero_copy_only=False)
+    closes = history.column("close").to_numpy(zero_copy_only=False).astype(np.float64)
+    keys = history.column("security_id").to_numpy() if "security_id" in history.column_names else tickers
+
+    ends = np.append(np.flatnonzero(keys[1:] != keys[:-1]), len(keys) - 1)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    current = dates[ends] == dates.max()
+    ends, starts = ends[current], starts[current]
+
+    # Prefix sums give each ticker's trailing 49-close sum in one pass
+    valid = ~np.isnan(closes)
+    close_sums = np.concatenate(([0.0], np.cumsum(np.where(valid, closes, 0.0))))
+    close_counts = np.concatenate(([0], np.cumsum(valid)))
+    window_start = np.maximum(ends - (SMA_WINDOW - 2), 0)
+    complete = (ends - (SMA_WINDOW - 2) >= starts) & (
+        close_counts[ends + 1] - close_counts[window_start] == SMA_WINDOW - 1
+    )
+    close_sum_49 = np.where(complete, close_sums[ends + 1] - close_sums[window_start], np.nan)
+
+    print(f"Seeded {len(ends)} tickers for {trade_date} from closes through {dates.max()}.")
+    return IntradaySession(trade_date, tickers[ends], closes[ends], close_sum_49)
+
+
+def complete_history(trade_date, history):
+    """
+    Make `history` end on the session before `trade_date`.
+
+    The DAG loads session D-1 around noon on D, so at the open the store
+    and the mart usually end at D-2. The missing session's closes are then
+    fetched from Polygon's grouped daily bars and appended to each security
+    whose latest row is on D-2, matched on its latest ticker. Those closes
+    are as traded: a split effective on D-1 is not reflected in the older closes.
+
+    Args:
+        trade_date (str): Session being streamed (YYYY-MM-DD).
+        history (pa.Table): Seed rows as returned by load_history.
+
+    Returns:
+        pa.Table: Rows through the previous session, in the same layout.
+
+    Raises:
+        RuntimeError: History ends more than one session early, or the
+            missing session could not be fetched.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from src.trading_calendar import previous_session
+
+    expected = previous_session(trade_date)
+    # A restart after the DAG has loaded today must not seed from today's own close
+    history = history.filter(pc.less_equal(history.column("trade_date"), pa.scalar(expected)))
+    dates = history.column("trade_date").to_numpy(zero_copy_only=False).astype("datetime64[D]")
+    latest = dates.max() if len(dates) else None
+    if latest == np.datetime64(expected, "D"):
+        return history
+
+    missing_from = previous_session(expected)
+    if latest != np.datetime64(missing_from, "D"):
+        raise RuntimeError(
+            f"Daily closes end on {latest}; seeding {trade_date} needs {expected}. "
+            "Run the daily pipeline (or refresh the momentum store) first."
+        )
+
+    from src.extraction import fetch_grouped_daily
+
+    bars = fetch_grouped_daily(str(expected))
+    if bars is None:
+        raise RuntimeError(f"Could not fetch grouped daily bars for {expected} to complete the seed.")
+    close_by_ticker = dict(zip(bars["T"], bars["c"].astype(np.float64)))
+
+    tickers = history.column("ticker").to_numpy(zero_copy_only=False)
+    keys = history.column("security_id").to_numpy() if "security_id" in history.column_names else tickers
+    ends = np.append(np.flatnonzero(keys[1:] != keys[:-1]), len(keys) - 1)
+    ends = ends[dates[ends] == latest]
+    closes = np.array([close_by_ticker.get(ticker, np.nan) for ticker in tickers[ends]], dtype=np.float64)
+    traded = ends[~np.isnan(closes)]
+
+    appended = {
+        "security_id": history.column("security_id").take(traded) if "security_id" in history.column_names else None,
+        "ticker": history.column("ticker").take(traded),
+        "trade_date": pa.array([expected] * len(traded), type=history.schema.field("trade_date").type),
+        "close": pa.array(closes[~np.isnan(closes)], type=history.schema.field("close").type),
+    }
+    appended = pa.table({name: appended[name] for name in history.column_names})
+    sort_key = "security_id" if "security_id" in history.column_names else "ticker"
+    print(f"Completed the seed with {len(traded)} closes for {expected} from grouped daily bars.")
+    return pa.concat_tables([history, appended]).sort_by([(sort_key, "ascending"), ("trade_date", "ascending")])
+
+
+def load_history(store_dir=None):
+    """Daily closes for seeding: the local momentum store, else the mart in Snowflake."""
+    from src.momentum_store import MOMENTUM_STORE_DIR, read_store
+
+    table = read_store(store_dir or MOMENTUM_STORE_DIR)
+    if table is not None and table.num_rows:
+        return table.select(["security_id", "ticker", "trade_date", "close"])
+
+    from src.snowflake_client import SnowflakeClient
+
+    print("No momentum store found; reading closes from FCT_TRADING_MOMENTUM.")
+    mart = f"{SNOWFLAKE['database']}.{MARTS_SCHEMA}.FCT_TRADING_MOMENTUM"
+    client = SnowflakeClient(component="streaming", stage="seed")
+    try:
+        table = client.fetch_arrow(f"""
+            SELECT SECURITY_ID, TICKER, TRADE_DATE, CLOSE
+            FROM {mart}
+            WHERE TRADE_DATE >= (SELECT DATEADD(day, -{SEED_LOOKBACK_DAYS}, MAX(TRADE_DATE)) FROM {mart})
+            ORDER BY SECURITY_ID, TRADE_DATE
+        """)
+    finally:
+        client.close()
+    if table is None:
+        raise RuntimeError("No daily closes available to seed the intraday session.")
+    return table.rename_columns(["security_id", "ticker", "trade_date", "close"])
+
+
+def websocket_messages(url, api_key, subscription, timeout=STREAM_FLUSH_SECONDS, record_path=None):
+    """
+    Yield decoded messages (lists of events) from a Polygon-style websocket.
+
+    An empty list is yielded whenever the feed is quiet for `timeout` seconds
+    so the caller can still flush on schedule. Raw messages are appended to
+    `record_path` (JSON lines) for later replay.
+    """
+    try:
+        import websocket
+    except ImportError as e:
+        raise ImportError(
+            "Streaming mode needs the optional websocket-client package "
+            "(pip install websocket-client)."
+        ) from e
+
+    ws = websocket.create_connection(url, timeout=timeout)
+    record = open(record_path, "a", encoding="utf-8") if record_path else None
+    try:
+        ws.send(json.dumps({"action": "auth", "params": api_key}))
+        ws.send(json.dumps({"action": "subscribe", "params": subscription}))
+        while True:
+            try:
+                raw = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                yield []
+                continue
+            except websocket.WebSocketConnectionClosedException:
+                return
+            if not raw:
+                return
+            if record:
+                record.write(raw + "\n")
+            events = json.loads(raw)
+            if events and events[0].get("ev") == "status":
+                for event in events:
+                    print(f"Feed status: {event.get('status')} {event.get('message', '')}")
+                continue
+            yield events
+    finally:
+        ws.close()
+        if record:
+            record.close()
+
+
+def flush_session(session, client):
+    """Write the pending bars and a breadth snapshot; returns bars written."""
+    with span("stream.flush") as flush_span:
+        bars = session.flush()
+        flush_span.set(rows=len(bars))
+        if not bars.empty:
+            client.write_dataframe(bars, "INTRADAY_STOCKS")
+        breadth = session.breadth()
+        if breadth["STOCKS_TRADED"]:
+            breadth["INGESTED_AT"] = pd.Timestamp.utcnow().tz_localize(None)
+            client.write_dataframe(pd.DataFrame([breadth]), "INTRADAY_BREADTH")
+    return len(bars)
+
+
+def run_stream(session, messages, client, flush_seconds=STREAM_FLUSH_SECONDS, max_seconds=None):
+    """
+    Consume feed messages into the session, flushing micro-batches every `flush_seconds`.
+
+    Flushes are due when either the feed's event time or the wall clock has
+    advanced by `flush_seconds`, so replays flush the same way a live session
+    does and a quiet live feed still flushes.
+
+    Returns:
+        dict: Events applied, flushes and bars written.
+    """
+    stats = {"events": 0, "flushes": 0, "bars": 0}
+    flush_ms = int(flush_seconds * 1000)
+    started = last_flush = time.monotonic()
+    last_flush_event_ms = 0
+    try:
+        for events in messages:
+            stats["events"] += session.apply(events)
+            now = time.monotonic()
+            if not last_flush_event_ms:
+                last_flush_event_ms = session.last_event_ms
+            if (session.last_event_ms - last_flush_event_ms >= flush_ms
+                    or now - last_flush >= flush_seconds):
+                stats["bars"] += flush_session(session, client)
+                stats["flushes"] += 1
+                last_flush, last_flush_event_ms = now, session.last_event_ms
+            if max_seconds and now - started >= max_seconds:
+                break
+    finally:
+        stats["bars"] += flush_session(session, client)
+        stats["flushes"] += 1
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Intraday streaming ingestion")
+    parser.add_argument("--url", default=POLYGON_WS_URL)
+    parser.add_argument("--subscription", default=STREAM_SUBSCRIPTION)
+    parser.add_argument("--flush-seconds", type=float, default=STREAM_FLUSH_SECONDS)
+    parser.add_argument("--max-seconds", type=float, help="Stop after this long (default: until the feed closes)")
+    parser.add_argument("--record", help="Append raw feed messages to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    from src.snowflake_client import SnowflakeClient
+
+    trade_date = pendulum.now("America/New_York").to_date_string()
+    try:
+        history = complete_history(trade_date, load_history())
+    except RuntimeError as e:
+        print(f"Not starting: {e}")
+        return 1
+    session = session_from_history(trade_date, history)
+    run_id = f"stream_{trade_date}_{int(time.time())}"
+    client = SnowflakeClient(component="streaming", stage="flush", run_id=run_id)
+    start_run(run_id)
+    try:
+        messages = websocket_messages(
+            args.url, POLYGON_API_KEY, args.subscription,
+            timeout=args.flush_seconds, record_path=args.record,
+        )
+        stats = run_stream(session, messages, client, args.flush_seconds, args.max_seconds)
+    except KeyboardInterrupt:
+        stats = None
+    finally:
+        finish_run()
+        client.close()
+
+    if stats:
+        print(f"Applied {stats['events']} events; wrote {stats['bars']} bars in {stats['flushes']} flushes.")
+    print(json.dumps(session.breadth(), default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
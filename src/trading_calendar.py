@@ -0,0 +1,325 @@
+# src/trading_calendar.py
+# Precomputed NYSE trading calendar cached as compact on-disk arrays with O(log n) lookups.
+#
+# Usage:
+#   python -m src.trading_calendar --start 2015-01-01 --end 2027-12-31   # (re)build the cache
+#   python -m src.trading_calendar --start 2015-01-01 --end 2027-12-31 --publish   # ...and TRADING_SESSIONS
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pendulum
+from src.config import TRADING_CALENDAR_PATH
+from src.instrumentation import span
+
+CALENDAR_NAME = "NYSE"
+
+# Coverage of a freshly built cache; queries outside it extend and rebuild the cache
+YEARS_BACK = 10
+YEARS_AHEAD = 2
+
+# TRADING_SESSIONS must run this far past the last loaded day, so the open
+# week and month already know their final session
+PUBLISH_AHEAD_DAYS = 40
+
+_EPOCH = np.datetime64(0, "D")
+
+_calendar = None
+
+
+def _day_number(value):
+    """Days since 1970-01-01 for a date, datetime (pendulum or stdlib) or YYYY-MM-DD string."""
+    if hasattr(value, "date") and callable(value.date):
+        value = value.date()
+    return int(np.datetime64(str(value)[:10], "D").astype(np.int64))
+
+
+def _to_dates(day_numbers):
+    return (_EPOCH + np.asarray(day_numbers, dtype="timedelta64[D]")).tolist()
+
+
+class TradingCalendar:
+    """
+    Sessions, early closes and holidays as sorted int32 day numbers.
+
+    Every lookup is a binary search (np.searchsorted) over these arrays, so
+    nothing here touches pandas or pandas_market_calendars.
+
+    Args:
+        sessions (np.ndarray): Trading days.
+        early_closes (np.ndarray): Sessions closing before 16:00 ET.
+        early_close_minutes (np.ndarray): Close time of each early close (minutes after midnight ET).
+        holidays (np.ndarray): Weekdays without a session.
+        coverage (tuple[int, int]): First and last day number the arrays describe.
+        name (str): Exchange calendar name.
+    """
+
+    def __init__(self, sessions, early_closes, early_close_minutes, holidays, coverage, name=CALENDAR_NAME):
+        self.sessions = np.asarray(sessions, dtype=np.int32)
+        self.early_closes = np.asarray(early_closes, dtype=np.int32)
+        self.early_close_minutes = np.asarray(early_close_minutes, dtype=np.int16)
+        self.holidays = np.asarray(holidays, dtype=np.int32)
+        self.coverage = (int(coverage[0]), int(coverage[1]))
+        self.name = name
+
+    @classmethod
+    def load(cls, path=TRADING_CALENDAR_PATH):
+        with np.load(path) as data:
+            return cls(
+                data["sessions"],
+                data["early_closes"],
+                data["early_close_minutes"],
+                data["holidays"],
+                tuple(data["coverage"]),
+                str(data["name"]),
+            )
+
+    def save(self, path=TRADING_CALENDAR_PATH):
+        """
+        Write the arrays atomically so concurrent tasks never read a partial file.
+
+        Each writer uses its own temp file, so two tasks building the cache at
+        once never interleave writes; the last complete file wins.
+        """
+        path = str(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    sessions=self.sessions,
+                    early_closes=self.early_closes,
+                    early_close_minutes=self.early_close_minutes,
+                    holidays=self.holidays,
+                    coverage=np.array(self.coverage, dtype=np.int32),
+                    name=np.array(self.name),
+                )
+            # mkstemp creates 0600; other services on the host read the file too
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def covers(self, start, end=None):
+        end = start if end is None else end
+        return self.coverage[0] <= _day_number(start) and _day_number(end) <= self.coverage[1]
+
+    def sessions_in_range(self, start, end):
+        """Trading days between start and end (inclusive) as datetime.date objects."""
+        lo = np.searchsorted(self.sessions, _day_number(start), side="left")
+        hi = np.searchsorted(self.sessions, _day_number(end), side="right")
+        return _to_dates(self.sessions[lo:hi])
+
+    def previous_session(self, day):
+        """Last trading day strictly before `day`."""
+        i = np.searchsorted(self.sessions, _day_number(day), side="left") - 1
+        if i < 0:
+            raise ValueError(f"No session before {day} in the cached calendar.")
+        return _to_dates(self.sessions[i:i + 1])[0]
+
+    def is_session(self, day):
+        d = _day_number(day)
+        i = np.searchsorted(self.sessions, d)
+        return bool(i < len(self.sessions) and self.sessions[i] == d)
+
+    def early_close(self, day):
+        """Close time (HH:MM ET) if `day` is an early close, else None."""
+        d = _day_number(day)
+        i = np.searchsorted(self.early_closes, d)
+        if i < len(self.early_closes) and self.early_closes[i] == d:
+            minutes = int(self.early_close_minutes[i])
+            return f"{minutes // 60:02d}:{minutes % 60:02d}"
+        return None
+
+    def holidays_in_range(self, start, end):
+        """Weekday market holidays between start and end (inclusive)."""
+        lo = np.searchsorted(self.holidays, _day_number(start), side="left")
+        hi = np.searchsorted(self.holidays, _day_number(end), side="right")
+        return _to_dates(self.holidays[lo:hi])
+
+    def session_periods(self):
+        """
+        First and last session of each session's week (Monday-Sunday) and calendar month.
+
+        Sessions whose week or month the cache only partly covers are dropped,
+        so every boundary returned is final.
+
+        Returns:
+            dict: "session", "week_first", "week_last", "month_first" and
+            "month_last" day-number arrays, aligned on "session".
+        """
+        sessions = self.sessions.astype(np.int64)
+        # Day 0 (1970-01-01) is a Thursday
+        week_start = (sessions + 3) // 7 * 7 - 3
+        months = sessions.astype("datetime64[D]").astype("datetime64[M]")
+        month_start = months.astype("datetime64[D]").astype(np.int64)
+        month_end = (months + 1).astype("datetime64[D]").astype(np.int64) - 1
+
+        first, last = self.coverage
+        whole = (week_start >= first) & (week_start + 6 <= last) & (month_start >= first) & (month_end <= last)
+        sessions, week_start, month_start = sessions[whole], week_start[whole], month_start[whole]
+
+        periods = {"session": sessions}
+        for name, key in (("week", week_start), ("month", month_start)):
+            starts = np.flatnonzero(np.diff(key, prepend=key[:1] - 1))
+            counts = np.diff(np.append(starts, len(key)))
+            periods[f"{name}_first"] = np.repeat(sessions[starts], counts)
+            periods[f"{name}_last"] = np.repeat(sessions[starts + counts - 1], counts)
+        return {name: values.astype(np.int32) for name, values in periods.items()}
+
+
+def build_calendar(start, end, name=CALENDAR_NAME):
+    """
+    Compute the calendar arrays with pandas_market_calendars.
+
+    This is the only code path that imports pandas_market_calendars; it runs
+    when the cache is first created or must be extended.
+    """
+    import pandas_market_calendars as mcal
+
+    calendar = mcal.get_calendar(name)
+    schedule = calendar.schedule(start_date=str(start)[:10], end_date=str(end)[:10])
+    sessions = schedule.index.values.astype("datetime64[D]").astype(np.int32)
+
+    early = calendar.early_closes(schedule)
+    early_close_at = early["market_close"].dt.tz_convert(calendar.tz)
+    early_close_minutes = (early_close_at.dt.hour * 60 + early_close_at.dt.minute).to_numpy(np.int16)
+
+    first, last = _day_number(start), _day_number(end)
+    weekdays = np.arange(first, last + 1, dtype=np.int32)
+    weekdays = weekdays[np.is_busday(weekdays.astype("datetime64[D]"))]
+
+    return TradingCalendar(
+        sessions,
+        early.index.values.astype("datetime64[D]").astype(np.int32),
+        early_close_minutes,
+        np.setdiff1d(weekdays, sessions),
+        (first, last),
+        name,
+    )
+
+
+def get_calendar(start=None, end=None, path=TRADING_CALENDAR_PATH):
+    """
+    Return the cached calendar, building or extending it so it covers start..end.
+
+    The cache is loaded once per process; the on-disk file is shared by every
+    task on the worker.
+    """
+    global _calendar
+    if _calendar is None and os.path.exists(path):
+        with span("calendar.load"):
+            _calendar = TradingCalendar.load(path)
+
+    today = pendulum.today("America/New_York").date()
+    start = start or today
+    end = end or start
+    if _calendar is None or not _calendar.covers(start, end):
+        first = min(_day_number(start), _day_number(today.subtract(years=YEARS_BACK)))
+        last = max(_day_number(end), _day_number(today.add(years=YEARS_AHEAD)))
+        if _calendar is not None:
+            first, last = min(first, _calendar.coverage[0]), max(last, _calendar.coverage[1])
+        first_date, last_date = _to_dates([first, last])
+        print(f"Building {CALENDAR_NAME} calendar cache for {first_date} → {last_date}.")
+        with span("calendar.build"):
+            _calendar = build_calendar(first_date, last_date)
+            _calendar.save(path)
+    return _calendar
+
+
+def get_trading_days(start_date, end_date):
+    """Return all trading days between two dates (inclusive) as datetime.date objects."""
+    return get_calendar(start_date, end_date).sessions_in_range(start_date, end_date)
+
+
+def previous_session(day):
+    """Return the last trading day strictly before `day`."""
+    return get_calendar(day).previous_session(day)
+
+
+def publish_sessions(client, calendar=None):
+    """
+    Replace TRADING_SESSIONS with every session of the calendar.
+
+    dbt takes week and month boundaries from this table instead of
+    DATE_TRUNC, so a holiday-shortened period ends on its real last session
+    and a rollup bar knows when its period is complete.
+
+    Args:
+        client: SnowflakeClient used for the write.
+        calendar (TradingCalendar | None): Calendar to publish (default: the cached one).
+
+    Returns:
+        int: Sessions published.
+    """
+    calendar = calendar or get_calendar()
+    periods = calendar.session_periods()
+    early = dict(zip(calendar.early_closes.tolist(), calendar.early_close_minutes.tolist()))
+    columns = {
+        name: [d.isoformat() for d in _to_dates(values)] for name, values in periods.items()
+    }
+    rows = [
+        {
+            "SESSION_DATE": session,
+            "WEEK_FIRST_SESSION": columns["week_first"][i],
+            "WEEK_LAST_SESSION": columns["week_last"][i],
+            "MONTH_FIRST_SESSION": columns["month_first"][i],
+            "MONTH_LAST_SESSION": columns["month_last"][i],
+            "EARLY_CLOSE_MINUTES": early.get(int(periods["session"][i])),
+        }
+        for i, session in enumerate(columns["session"])
+    ]
+    client.replace_trading_sessions(rows)
+    return len(rows)
+
+
+def ensure_sessions_published(client, start, end):
+    """
+    Republish TRADING_SESSIONS unless it already spans start..end + PUBLISH_AHEAD_DAYS.
+
+    Returns:
+        bool: True if the table was rewritten.
+    """
+    first, last = client.get_trading_session_range()
+    need_first = _day_number(start)
+    need_last = _day_number(end) + PUBLISH_AHEAD_DAYS
+    if first is not None and _day_number(first) <= need_first and _day_number(last) >= need_last:
+        return False
+    # Cover a full month past the requirement: partly covered months are not published
+    need_last_date = _to_dates([need_last + 31])[0]
+    publish_sessions(client, get_calendar(start, need_last_date))
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the trading calendar cache")
+    parser.add_argument("--start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--path", default=str(TRADING_CALENDAR_PATH))
+    parser.add_argument("--publish", action="store_true", help="Also replace the TRADING_SESSIONS table")
+    args = parser.parse_args(argv)
+
+    calendar = build_calendar(args.start, args.end)
+    calendar.save(args.path)
+    print(
+        f"Wrote {len(calendar.sessions)} sessions, {len(calendar.early_closes)} early closes "
+        f"and {len(calendar.holidays)} holidays to {args.path} ({os.path.getsize(args.path)} bytes)."
+    )
+    if args.publish:
+        from src.snowflake_client import SnowflakeClient
+
+        client = SnowflakeClient(component="admin", stage="trading_sessions")
+        try:
+            publish_sessions(client, calendar)
+        finally:
+            client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# src/validation.py
+# Declarative, vectorized validation of normalized DAILY_STOCKS batches with per-rule reason codes.
+
+import numpy as np
+import pandas as pd
+from src.instrumentation import incr
+
+# Column holding the comma-separated reason codes on quarantined rows
+REASON_COLUMN = "REASON_CODES"
+
+
+def _not_positive(values):
+    # NaN compares False, so missing prices fail too
+    return ~(values > 0)
+
+
+# (reason code, description, check) — each check receives the column arrays
+# and returns a boolean mask of rows that FAIL the rule.
+RULES = [
+    (
+        "MISSING_TICKER",
+        "Ticker symbol is null or empty",
+        lambda a: pd.isna(a["T"]) | (a["T"] == ""),
+    ),
+    (
+        "NON_POSITIVE_PRICE",
+        "Open, high, low or close is missing or <= 0",
+        lambda a: _not_positive(a["O"]) | _not_positive(a["H"])
+        | _not_positive(a["L"]) | _not_positive(a["C"]),
+    ),
+    (
+        "HIGH_BELOW_LOW",
+        "High is below low",
+        lambda a: a["H"] < a["L"],
+    ),
+    (
+        "CLOSE_OUTSIDE_RANGE",
+        "Close is above high or below low",
+        lambda a: (a["C"] > a["H"]) | (a["C"] < a["L"]),
+    ),
+    (
+        "ZERO_VOLUME",
+        "Volume is missing or <= 0",
+        lambda a: _not_positive(a["V"]),
+    ),
+    (
+        # Keeps the first bar per ticker and quarantines the rest
+        "DUPLICATE_TICKER",
+        "Ticker already appeared earlier in the batch",
+        lambda a: a["_duplicate"],
+    ),
+]
+
+RULE_CODES = [code for code, _, _ in RULES]
+
+
+def validate_batch(df: pd.DataFrame):
+    """
+    Apply RULES to a normalized DAILY_STOCKS batch.
+
+    Each rule is one vectorized pass over the column arrays; failures are
+    folded into a per-row bitmask so rows failing several rules are listed
+    once with all their reason codes.
+
+    Args:
+        df (pd.DataFrame): Output of normalize_grouped_daily.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, dict]: Clean rows, quarantined rows
+        (with REASON_CODES), and {reason code: failing row count}.
+    """
+    n = len(df)
+    arrays = {
+        "T": df["T"].to_numpy(dtype=object),
+        "_duplicate": df["T"].duplicated(keep="first").to_numpy(),
+    }
+    for col in ("O", "H", "L", "C", "V"):
+        arrays[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+
+    reasons = np.zeros(n, dtype=np.uint32)
+    counts = {}
+    with np.errstate(invalid="ignore"):
+        for bit, (code, _, check) in enumerate(RULES):
+            failed = np.asarray(check(arrays), dtype=bool)
+            counts[code] = int(failed.sum())
+            reasons |= failed.astype(np.uint32) << bit
+
+    bad = reasons != 0
+    clean = df[~bad]
+    quarantined = df[bad].copy()
+    if len(quarantined):
+        # Few distinct masks occur, so build each label once
+        labels = {
+            mask: ",".join(code for bit, code in enumerate(RULE_CODES) if mask >> bit & 1)
+            for mask in np.unique(reasons[bad]).tolist()
+        }
+        quarantined[REASON_COLUMN] = [labels[mask] for mask in reasons[bad].tolist()]
+    else:
+        quarantined[REASON_COLUMN] = pd.Series(dtype="object")
+
+    incr("rows_quarantined", len(quarantined))
+    return clean, quarantined, counts
@@ -0,0 +1,212 @@
+# src/workload_profiles.py
+# Maps each pipeline stage to a warehouse profile (warehouse, size, auto-suspend) and moves a session onto it.
+#
+# Usage:
+#   python -m src.workload_profiles                      # resolved profiles and the stages routed to each
+#   python -m src.workload_profiles warehouse full_refresh   # warehouse name (e.g. for DBT_WAREHOUSE)
+#   python -m src.workload_profiles apply                # create missing warehouses, set AUTO_SUSPEND
+
+import argparse
+import sys
+from dataclasses import dataclass, replace
+
+from src.instrumentation import incr
+
+# Sizes accepted by CREATE WAREHOUSE ... WAREHOUSE_SIZE
+SIZES = ("XSMALL", "SMALL", "MEDIUM", "LARGE", "XLARGE", "XXLARGE", "XXXLARGE")
+
+
+@dataclass(frozen=True)
+class WorkloadProfile:
+    """
+    Where one kind of work runs.
+
+    Args:
+        name (str): Profile name, recorded as `profile` in the QUERY_TAG.
+        warehouse (str | None): Dedicated warehouse; None runs on SNOWFLAKE_WAREHOUSE.
+        size (str): WAREHOUSE_SIZE a dedicated warehouse is created with.
+        auto_suspend (int): AUTO_SUSPEND seconds for a dedicated warehouse.
+    """
+
+    name: str
+    warehouse: str = None
+    size: str = "XSMALL"
+    auto_suspend: int = 60
+
+
+# Short suspends for bursty work; the dashboard keeps its warehouse (and its
+# local disk cache) up between page loads
+DEFAULT_PROFILES = {
+    profile.name: profile
+    for profile in (
+        WorkloadProfile("checkpoint", size="XSMALL", auto_suspend=60),
+        WorkloadProfile("daily_load", size="XSMALL", auto_suspend=60),
+        WorkloadProfile("bulk_load", size="LARGE", auto_suspend=60),
+        WorkloadProfile("incremental", size="SMALL", auto_suspend=60),
+        WorkloadProfile("full_refresh", size="LARGE", auto_suspend=60),
+        WorkloadProfile("dashboard", size="XSMALL", auto_suspend=600),
+    )
+}
+
+# (component, stage) -> profile; a None stage covers the component's other stages
+STAGE_PROFILES = {
+    ("ingestion", "completed_dates"): "checkpoint",
+    ("ingestion", "checkpoint"): "checkpoint",
+    ("ingestion", "ledger_sync"): "checkpoint",
+    ("ingestion", "security_master"): "checkpoint",
+    ("ingestion", "corporate_actions"): "checkpoint",
+    ("ingestion", "trading_sessions"): "checkpoint",
+    ("ingestion", "bulk_import"): "bulk_load",
+    ("ingestion", "bulk_load"): "bulk_load",
+    ("ingestion", None): "daily_load",
+    ("streaming", None): "daily_load",
+    ("dbt", "full_refresh"): "full_refresh",
+    ("dbt", "full_test_sweep"): "full_refresh",
+    ("dbt", None): "incremental",
+    ("cross_asset", "rebuild"): "full_refresh",
+    ("cross_asset", None): "incremental",
+    ("momentum_store", None): "incremental",
+    ("dashboard_bundle", None): "dashboard",
+    ("dashboard", None): "dashboard",
+    ("panel", None): "dashboard",
+    ("admin", None): "checkpoint",
+    ("dbt_telemetry", None): "checkpoint",
+}
+
+# Components with no entry above
+DEFAULT_PROFILE = "incremental"
+
+
+def profile_for(component, stage=None):
+    """Name of the profile a component's stage runs under."""
+    return STAGE_PROFILES.get(
+        (component, stage), STAGE_PROFILES.get((component, None), DEFAULT_PROFILE)
+    )
+
+
+def resolve_profiles(overrides=None):
+    """
+    Default profiles with SNOWFLAKE_WAREHOUSE_PROFILES overrides applied.
+
+    Args:
+        overrides (dict | None): name -> {"warehouse", "size", "auto_suspend"}
+            (default: the SNOWFLAKE_WAREHOUSE_PROFILES setting). Unknown names
+            add profiles, which STAGE_PROFILES can then route to.
+
+    Returns:
+        dict: name -> WorkloadProfile.
+    """
+    if overrides is None:
+        from src.config import settings
+
+        overrides = settings.snowflake.warehouse_profiles or {}
+    profiles = dict(DEFAULT_PROFILES)
+    for name, values in overrides.items():
+        profile = replace(profiles.get(name, WorkloadProfile(name)), **values)
+        size = profile.size.upper().replace("-", "")
+        if size not in SIZES:
+            raise ValueError(f"Profile {name}: unknown warehouse size {profile.size!r}.")
+        profiles[name] = replace(profile, size=size, auto_suspend=int(profile.auto_suspend))
+    return profiles
+
+
+def ensure_warehouse(cursor, profile):
+    """Create the profile's warehouse if missing and apply its AUTO_SUSPEND."""
+    cursor.execute(
+        f"""
+        CREATE WAREHOUSE IF NOT EXISTS IDENTIFIER(%s)
+        WITH WAREHOUSE_SIZE = '{profile.size}' AUTO_SUSPEND = {profile.auto_suspend}
+             AUTO_RESUME = TRUE INITIALLY_SUSPENDED = TRUE
+        """,
+        (profile.warehouse,),
+    )
+    cursor.execute(
+        f"ALTER WAREHOUSE IDENTIFIER(%s) SET AUTO_SUSPEND = {profile.auto_suspend}",
+        (profile.warehouse,),
+    )
+
+
+class WarehouseSwitcher:
+    """
+    Keeps one session on the warehouse of its current profile.
+
+    USE WAREHOUSE is only issued when the warehouse actually changes, and
+    dedicated warehouses are prepared once per session when managed. Only
+    `cursor.execute` is used, so a mock cursor records every statement.
+
+    Args:
+        cursor: DB-API cursor of the session.
+        profiles (dict): name -> WorkloadProfile (see resolve_profiles).
+        default_warehouse (str): Warehouse for profiles without their own.
+        current_warehouse (str | None): Warehouse the session is on now.
+        manage (bool): Create/alter dedicated warehouses before first use.
+    """
+
+    def __init__(self, cursor, profiles, default_warehouse, current_warehouse=None, manage=False):
+        self.cursor = cursor
+        self.profiles = profiles
+        self.default_warehouse = default_warehouse
+        self.current_warehouse = current_warehouse
+        self.manage = manage
+        self.profile = None
+        self._prepared = set()
+
+    def select(self, component, stage=None):
+        """Switch to the profile for (component, stage) and return it."""
+        profile = self.profiles[profile_for(component, stage)]
+        warehouse = profile.warehouse or self.default_warehouse
+        if self.manage and profile.warehouse and profile.warehouse not in self._prepared:
+            ensure_warehouse(self.cursor, profile)
+            self._prepared.add(profile.warehouse)
+        if warehouse and warehouse != self.current_warehouse:
+            self.cursor.execute("USE WAREHOUSE IDENTIFIER(%s)", (warehouse,))
+            self.current_warehouse = warehouse
+            incr("warehouse_switches")
+        self.profile = profile
+        return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and apply stage → warehouse profiles")
+    sub = parser.add_subparsers(dest="command")
+    name = sub.add_parser("warehouse", help="Print the warehouse a profile runs on")
+    name.add_argument("profile")
+    sub.add_parser("apply", help="Create missing dedicated warehouses and set their AUTO_SUSPEND")
+    args = parser.parse_args(argv)
+
+    from src.config import SNOWFLAKE
+
+    profiles = resolve_profiles()
+    if args.command == "warehouse":
+        if args.profile not in profiles:
+            print(f"Unknown profile {args.profile}; choose from {', '.join(sorted(profiles))}.")
+            return 1
+        print(profiles[args.profile].warehouse or SNOWFLAKE["warehouse"])
+        return 0
+
+    if args.command == "apply":
+        from src.snowflake_client import SnowflakeClient
+
+        client = SnowflakeClient(component="admin", stage="workload_profiles")
+        try:
+            for profile in profiles.values():
+                if profile.warehouse:
+                    ensure_warehouse(client.cursor, profile)
+                    print(f"{profile.warehouse}: {profile.size}, AUTO_SUSPEND {profile.auto_suspend}s")
+        finally:
+            client.close()
+        return 0
+
+    for profile in profiles.values():
+        stages = sorted(
+            f"{component}.{stage or '*'}" for (component, stage), target in STAGE_PROFILES.items()
+            if target == profile.name
+        )
+        warehouse = profile.warehouse or f"{SNOWFLAKE['warehouse']} (shared)"
+        sizing = f"{profile.size}, AUTO_SUSPEND {profile.auto_suspend}s" if profile.warehouse else "as configured"
+        print(f"{profile.name:<13} {warehouse:<28} {sizing:<28} {', '.join(stages)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())